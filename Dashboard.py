@@ -1,85 +1,91 @@
 
 import json
-import numpy as np
+import os
 import pandas as pd
-import plotly.express as px
-import pydeck as pdk
 import streamlit as st
-from pandasai import SmartDatalake
 from pandasai.llm import OpenAI
 
 st.set_page_config(page_title="Australia's Shift to Hydrogen Powered Freight", layout="wide")
-from pages.Assumptions import ASSUMPTIONS
-
-LIMITS = {
-        'tonne.km/hr': np.log2(1_000_000),
-        'gco2/tonne.km': 100,
-        'km/h': 1000,
-    }
+from freight import airports, congestion, gpt, graph, hourly, instrument, layers, model, profiles, projection, spatial
+from freight.assumptions import NETWORKS
+from freight.shared import readonly
 
 def load_json(filename: str):
     with open(filename) as f:
         return json.load(f)
 
-
-def calculate_freight_network_score(metric_list: list[float]) -> float:
-
-    if len(metric_list) < 1:
-        raise Exception("Empty metric list: no metrics to calculate")
-
-    return np.mean(metric_list)
-
-
-def get_network_tonne_km(network_type, tonne_scaling_factor):
-    baseline = np.log2(float(ASSUMPTIONS['tonne.km/hr'][network_type])) * tonne_scaling_factor
-    return (np.clip(baseline, 0, LIMITS['tonne.km/hr'])) / LIMITS['tonne.km/hr']
-
-def get_network_gco2(gc02, gco2_scaling_factor):
-    adj_gco2 = gc02 * gco2_scaling_factor
-    return 1- (np.clip(adj_gco2, 0, LIMITS['gco2/tonne.km'])) / LIMITS['gco2/tonne.km']
-
-def get_network_score(network_type: str, gco2, gco2_scaling_factor, tonne_scaling_factor) -> list[int]:
-    score_1 = get_network_tonne_km(network_type, tonne_scaling_factor)
-    score_2 = get_network_gco2(gco2, gco2_scaling_factor)
-
-    return calculate_freight_network_score(metric_list=[score_1, score_2])
-
-def get_network_color(network_type: str, gco2, gco2_scaling_factor, tonne_scaling_factor) -> list[int]:
-
-    normalised_score = get_network_score(network_type, gco2, gco2_scaling_factor, tonne_scaling_factor)
-
-    red = int((1 - normalised_score) * 255)
-    green = int(normalised_score * 255)
-
-    return [red, green, 0]
-
-@st.cache_data
-def load_rail_geojson():
-    return load_json('./data/simplified/rail_map_simplified.geojson')
-    
-@st.cache_data
-def load_nltn_road_data():
-    return load_json('./data/simplified/nltn_road_simplified.geojson')
-
-@st.cache_data
-def load_key_rail_freight_route():
-    return load_json('./data/simplified/key_rail_freight_route_simplified.geojson')
-    
-@st.cache_data
-def load_key_road_freight_route():
-    return load_json('./data/simplified/key_road_freight_route_simplified.geojson')
-
-@st.cache_data
+@instrument.tracked_cache(st.cache_data)
+def tileset_max_zoom(name: str):
+    """Returns the max zoom of a tileset built by freight.tiles, or None if it hasn't been built."""
+    manifest = f'./static/tiles/{name}/manifest.json'
+    if not os.path.exists(manifest):
+        return None
+    return load_json(manifest)['maxzoom']
+
+@instrument.tracked_cache(st.cache_resource)
+def spatial_index():
+    """STRtrees over every facility, and over each map layer once it's first needed, shared by the process."""
+    return spatial.SpatialIndex.build(layers.geojson_sources())
+
+def keyed_spatial_index():
+    """The spatial index as a model.graph input, keyed by the files it reads."""
+    index = spatial_index()
+    return graph.Keyed(('spatial_index', tuple(sorted(index.sources.items())), index.max_bytes), index)
+
+@instrument.tracked_cache(st.cache_resource)
+def congestion_db():
+    """One read-only DuckDB connection shared by every session."""
+    return congestion.connect()
+
+@instrument.tracked_cache(st.cache_data)
+def congestion_values(table: str, column: str):
+    return congestion.distinct(congestion_db(), table, column)
+
+@instrument.tracked_cache(st.cache_data)
+def congestion_count(table: str, route: tuple, city: tuple, hour: tuple):
+    return congestion.count(congestion_db(), table, route, city, hour)
+
+@instrument.tracked_cache(st.cache_data)
+def congestion_page(table: str, route: tuple, city: tuple, hour: tuple, page: int):
+    return congestion.query(congestion_db(), table, route, city, hour,
+                            limit=congestion.PAGE_SIZE, offset=page * congestion.PAGE_SIZE)
+
+@instrument.tracked_cache(st.cache_resource)
+def congestion_frames():
+    """The small congestion tables in full, once per process and read-only, for Freight-GPT and the profiles."""
+    con = congestion_db()
+    tables = congestion.tables(con)
+    return readonly({table: congestion.query(con, table, limit=None) for table in gpt.DATALAKE_TABLES if table in tables})
+
+@instrument.tracked_cache(st.cache_resource)
+def route_profiles():
+    """Dense per-route hourly travel times, built once per process."""
+    return profiles.HourlyProfiles.from_frame(congestion_frames()['route_times'])
+
+@instrument.tracked_cache(st.cache_resource)
+def hourly_congestion_colors():
+    """Every route's colour at every hour, built once per process and keyed by content for model.graph."""
+    colors = hourly.congestion_colors(route_profiles())
+    return graph.Keyed(graph.fingerprint(colors), colors)
+
+@instrument.tracked_cache(st.cache_resource)
+def freight_gpt():
+    """One LLM client, datalake and answer cache per process, rather than per rerun."""
+    return gpt.FreightGPT(congestion_frames(), OpenAI(st.secrets["OPEN_AI_API_KEY"]))
+
+@instrument.tracked_cache(st.cache_resource)
 def airport_data():
-    return pd.read_json("data/raw/airport_coordinates.json")
+    """Airport arcs with their cargo tonnes, built from the raw airport and cargo data."""
+    return readonly(airports.load_arcs())
 
-@st.cache_data
-def metric_tonne_km_data():
-    return pd.read_json('data/raw/metric_tonnekm.json')
+@instrument.tracked_cache(st.cache_resource)
+def airport_arcs():
+    """Airport arcs indexed by origin airport, read-only and keyed by content for model.graph."""
+    arcs = readonly(spatial.arcs_by_origin(airport_data()))
+    return graph.Keyed(graph.fingerprint(arcs), arcs)
 
-@st.cache_data
-def hydrogen_emission_data():
-    return pd.read_json("data/raw/hydrogen_emission_pct.json")
+debug_panel = st.sidebar.checkbox("Show profiling panel", value=False)
+rerun = instrument.start(detailed=debug_panel)
 
 st.title("🚀 Australia's Shift to Hydrogen Powered Freight")
 st.divider()
@@ -95,22 +101,26 @@ col1, col2 = st.columns([3, 2], gap='medium')  # Adjust the column widths as nee
 # Display the Pydeck map in the first column
 target_layer_names = col1.multiselect(
     label='What layers would you like to show', 
-    options=['Air', 'Roads (Local)', 'Roads (Interstate)', 'Rail', 'Roads (NLTN)'], 
-    default=['Air', 'Roads (Local)', 'Rail', 'Roads (Interstate)'],
+    options=layers.labels(),
+    default=layers.default_labels(),
 )
 
-airport_df = airport_data()
-selected_airport = col1.selectbox("Select Airport", list(airport_df["from_name"].unique()) + ["None"], index=6)
-
-
-# Define the initial view state centered on Australia
-initial_view = pdk.ViewState(
-    latitude=-25.2744,
-    longitude=133.7751,
-    zoom=3,
-    pitch=45,
-    bearing=0,
-)
+arcs_by_origin = airport_arcs()
+selected_airport = col1.selectbox("Select Airport", list(arcs_by_origin.value) + ["None"], index=6)
+region = col1.selectbox("Region", list(spatial.REGIONS))
+region_bbox = spatial.REGIONS[region]
+
+# Define the initial view state centered on Australia, or the selected region
+if region == 'Australia':
+    initial_view = dict(
+        latitude=-25.2744,
+        longitude=133.7751,
+        zoom=3,
+        pitch=45,
+        bearing=0,
+    )
+else:
+    initial_view = dict(**spatial.region_view(region_bbox), pitch=45, bearing=0)
 
 gco2_scaling_factor = st.slider("GCO2 Scaling Factor", 0.0, 2.0, step=0.1, value=1.0)
 st.caption("Scales GCO2 Production rates across all networks. For example, 0.6 corresponds to a 40% reduction in overall GC02 for non-hydrogen fuel sources.")
@@ -122,12 +132,7 @@ with col2:
     t1, t2, t3, t4 = st.tabs(['Hydrogen Adoption', 'Hydrogen Generation', 'Fleet Demand', 'Commodity Demand'])
     t1.write('###### The percentage of the fleet that is hydrogen powered')
     t1_year = t1.selectbox('Year', ('2016', '2036', '2056'), key='t1_year')
-    if t1_year == '2016':
-        t1_slider_values = (0, 0, 0, 0, 0, 0)
-    if t1_year == '2036':
-        t1_slider_values = (0, 0, 0, 0, 0, 0)
-    if t1_year == '2056':
-        t1_slider_values = (0, 0, 0, 0, 0, 0)
+    t1_slider_values = projection.ADOPTION_PRESETS[int(t1_year)]
     t1_air_slider = t1.slider("✈️ Air", 0, 100, t1_slider_values[0], format="%d%%")
     t1_rail_slider = t1.slider("🚅 Rail", 0, 100, t1_slider_values[1], format="%d%%")
     t1_haul_truck_slider = t1.slider("🚚 Long-haul Truck", 0, 100, t1_slider_values[2], format="%d%%")
@@ -135,37 +140,21 @@ with col2:
 
     t2.write('###### Hydrogen generated by source')
     t2_year = t2.selectbox('Year', ('2023', '2036', '2056'), key='t2_year')
-    if t2_year == '2023':
-        t2_slider_values = (23, 76, 2, 0)
-    if t2_year == '2036':
-        t2_slider_values = (0, 0, 0, 0)
-    if t2_year == '2056':
-        t2_slider_values = (0, 0, 0, 0)
+    t2_slider_values = projection.GENERATION_PRESETS[int(t2_year)]
     t2_a, t2_b = t2.columns([2, 3])
     t2_labels = ('Fossil Fuels', 'Natural Gas', 'Electrolysis', 'Biomass and Capture')
     t2_slider_fossil_fuels = t2_a.slider(t2_labels[0], 0, 100, t2_slider_values[0], format="")
     t2_slider_gas = t2_a.slider(t2_labels[1], 0, 100, t2_slider_values[1], format="")
     t2_slider_electrolysis = t2_a.slider(t2_labels[2], 0, 100, t2_slider_values[2], format="")
     t2_slider_biomass = t2_a.slider(t2_labels[3], 0, 100, t2_slider_values[3], format="")
-    sizes = [t2_slider_fossil_fuels, t2_slider_gas, t2_slider_electrolysis, t2_slider_biomass]
-    sizes_total = max(sum(sizes), 1)
-    sizes_norm = [s/sizes_total for s in sizes]
-    fig = px.pie(None, values=sizes_norm, names=t2_labels, hole=0.3)
-    fig.update_layout(margin=dict(l=20, r=20, t=30, b=0), showlegend=False)
-    t2_b.plotly_chart(fig, use_container_width=True)
-
-    hydrogen_mult_dividor = 27  # if all fossil fuels
-    hydrogen_mult_numerator = sizes_norm[0] * 27 + sizes_norm[1] * 12 + sizes_norm[2] * 0 + sizes_norm[3] * -2
-    hydrogen_mult = hydrogen_mult_numerator / hydrogen_mult_dividor
+    sizes = (t2_slider_fossil_fuels, t2_slider_gas, t2_slider_electrolysis, t2_slider_biomass)
+    with instrument.section('pie'):
+        fig = model.graph.value('generation_pie', generation=sizes, generation_labels=t2_labels)
+        t2_b.plotly_chart(fig, use_container_width=True)
 
     t3.write('###### Predicted increase in vehicle demand')
     t3_year = t3.selectbox('Year', ('2016', '2036', '2056'), key='t3_year')
-    if t3_year == '2016':
-        t3_slider_values = (100, 100, 100, 100, 0, 0)
-    if t3_year == '2036':
-        t3_slider_values = (100, 100, 100, 100, 0, 0)
-    if t3_year == '2056':
-        t3_slider_values = (100, 100, 100, 100, 0, 0)
+    t3_slider_values = projection.FLEET_PRESETS[int(t3_year)]
     t3_air_slider = t3.slider("✈️ Air", 0, 100, t3_slider_values[0], format="%d%%", key='t3_air_slider')
     t3_rail_slider = t3.slider("🚅 Rail", 0, 100, t3_slider_values[1], format="%d%%", key='t3_rail_slider')
     t3_haul_truck_slider = t3.slider("🚚 Long-haul Truck", 0, 100, t3_slider_values[2], format="%d%%", key='t3_haul_truck_slider')
@@ -173,12 +162,7 @@ with col2:
 
     t4.write('###### Predicted increase in commodity demand')
     t4_option = t4.selectbox('Year', ('2016', '2036', '2056'), key='t4_option')
-    if t4_option == '2016':
-        t4_slider_values = (0, 0, 0, 0, 0, 0)
-    if t4_option == '2036':
-        t4_slider_values = (41, 66, 20, 29, 30, 43)
-    if t4_option == '2056':
-        t4_slider_values = (96, 161, 53, 54, 60, 78)
+    t4_slider_values = projection.COMMODITY_PRESETS[int(t4_option)]
     t4_manufactures_slider = t4.slider("General manufactures", 0, 200, t4_slider_values[0], format="%d%%")
     t4_consumables_slider = t4.slider("Household consumables", 0, 200, t4_slider_values[1], format="%d%%")
     t4_construction_slider = t4.slider("Construction materials", 0, 200, t4_slider_values[2], format="%d%%")
@@ -186,16 +170,20 @@ with col2:
     t4_vehicles_slider = t4.slider("Vehicles", 0, 200, t4_slider_values[4], format="%d%%")
     t4_waste_slider = t4.slider("Waste", 0, 200, t4_slider_values[5], format="%d%%")
 
-gco2 = ASSUMPTIONS['gco2/tonne.km']
-gco2_baseline_air = int(gco2['air'])
-gco2_baseline_rail = int(gco2['rail'])
-gco2_baseline_road_interstate = int(gco2['road_interstate'])
-gco2_baseline_road_local = int(gco2['road_urban'])
-
-gco2_air = int(((100 - t1_air_slider) * gco2_baseline_air) + (t1_air_slider * gco2_baseline_air * hydrogen_mult))/100
-gco2_rail = int(((100 - t1_rail_slider) * gco2_baseline_rail) + (t1_rail_slider * gco2_baseline_rail * hydrogen_mult))/100
-gco2_road_interstate = int(((100 - t1_haul_truck_slider) * gco2_baseline_road_interstate) + (t1_haul_truck_slider * gco2_baseline_road_interstate * hydrogen_mult))/100
-gco2_road_local = int(((100 - t1_urban_truck_slider) * gco2_baseline_road_local) + (t1_urban_truck_slider * gco2_baseline_road_local * hydrogen_mult))/100
+# Each output below is a memoized node of model.graph, recomputed only when its own inputs change.
+scenario_inputs = dict(
+    adoption=(t1_air_slider, t1_rail_slider, t1_haul_truck_slider, t1_urban_truck_slider),
+    generation=sizes,
+    gco2_scaling_factor=gco2_scaling_factor,
+    tonne_scaling_factor=tonne_scaling_factor,
+)
+# The Assumptions page evaluates its uncertainty at this scenario.
+st.session_state['scenario_inputs'] = scenario_inputs
+with instrument.section('scenario'):
+    result = model.graph.compute(['gco2', 'tonne_km_score', 'gco2_score'], **scenario_inputs)
+    gco2_air, gco2_rail, gco2_road_interstate, gco2_road_local = result['gco2']
+    network_tonne_km = dict(zip(NETWORKS, result['tonne_km_score']))
+    network_gco2_score = dict(zip(NETWORKS, result['gco2_score']))
 
 gc1.metric(label="Air", value=round(gco2_air, 2), delta=round(gco2_air-602, 2), delta_color="inverse")
 gc2.metric(label="Rail", value=round(gco2_rail, 2), delta=round(gco2_rail-22, 2), delta_color="inverse")
@@ -203,71 +191,97 @@ gc3.metric(label="Roads (Interstate)", value=round(gco2_road_interstate, 2), del
 gc4.metric(label="Roads (Local)", value=round(gco2_road_local, 2), delta=round(gco2_road_local-50, 2), delta_color="inverse")
 
 # Add layers individually, as setting visibility doesn't actually remove data and improve performance.
-layers = []
-if 'Roads (Local)' in target_layer_names:
-    layers.append(pdk.Layer(
-        type="MVTLayer",
-        data="./app/static/{z}/{x}/{y}.pbf",
-        line_width_min_pixels=1,
-        get_line_color=get_network_color('road_urban', gco2_road_local, gco2_scaling_factor, tonne_scaling_factor),
-        max_zoom=10,
-    ))
-
-if 'Air' in target_layer_names:
-    layers.append(pdk.Layer(
-        "ArcLayer",
-        airport_df[airport_df["from_name"] == selected_airport],
-        pickable=True,
-        get_stroke_width=12,
-        get_source_position="from",
-        get_target_position="to",
-        get_source_color=list(np.array(get_network_color('air', gco2_air, gco2_scaling_factor, tonne_scaling_factor))*0.6),
-        get_target_color=get_network_color('air', gco2_air, gco2_scaling_factor, tonne_scaling_factor),
-        auto_highlight=True,
-    ))
-
-if 'Rail' in target_layer_names:
-    layers.append(pdk.Layer(
-        type="GeoJsonLayer",
-        data=load_key_rail_freight_route(),
-        get_line_color=get_network_color('rail', gco2_rail, gco2_scaling_factor, tonne_scaling_factor),
-        line_width_min_pixels=1,
-    ))
-
-if 'Roads (Interstate)' in target_layer_names:
-    layers.append(pdk.Layer(
-        type="GeoJsonLayer",
-        data=load_key_road_freight_route(),
-        get_line_color=get_network_color('road_interstate', gco2_road_interstate, gco2_scaling_factor, tonne_scaling_factor),
-        line_width_min_pixels=1,
-    ))
-
-if 'Roads (NLTN)' in target_layer_names:
-    layers.append(pdk.Layer(
-        type="GeoJsonLayer",
-        data=load_nltn_road_data(),
-        get_line_color=get_network_color('road_urban', gco2_road_interstate, gco2_scaling_factor, tonne_scaling_factor),
-        line_width_min_pixels=1,
-    ))
+tile_zooms = {tileset: tileset_max_zoom(tileset) for tileset in model.TILESETS}
+with instrument.section('layers'):
+    deck_layers = model.map_layers(
+        target_layer_names,
+        tile_zooms=tile_zooms,
+        spatial_index=keyed_spatial_index(),
+        arcs_by_origin=arcs_by_origin,
+        airport=selected_airport,
+        bbox=region_bbox,
+        **scenario_inputs,
+    )
+
+for layer_id, _, data in deck_layers:
+    instrument.record_payload(layer_id, data)
 
 # Create a Pydeck map
-map_layer = pdk.Deck(
-    map_style="mapbox://styles/mapbox/dark-v9",
-    initial_view_state=initial_view,
-    layers=layers
-)
-col1.pydeck_chart(map_layer)
+with instrument.section('deck'):
+    col1.pydeck_chart(model.deck(initial_view, deck_layers))
+
+if col1.toggle("Animate local road congestion by hour"):
+    # The hour slider and play button run in the browser, so scrubbing doesn't rerun this script.
+    with instrument.section('hourly_map'):
+        hourly_map = model.graph.value(
+            'hourly_map',
+            tile_zooms=tile_zooms,
+            spatial_index=keyed_spatial_index(),
+            bbox=region_bbox,
+            hourly_colors=hourly_congestion_colors(),
+            view=initial_view,
+        )
+    instrument.record_payload('hourly_map', hourly_map)
+    col1.iframe(hourly_map, height=500)
+    col1.caption("Median travel time at each departure hour relative to the route's best hour: green at the best "
+                 f"hour, red at {hourly.RATIO_LIMIT}x or more.")
+
+with col1.expander("Find freight facilities near a point"):
+    n1, n2, n3 = st.columns(3)
+    near_lat = n1.number_input("Latitude", -45.0, -9.0, -37.67, format="%.4f")
+    near_lng = n2.number_input("Longitude", 112.0, 155.0, 144.84, format="%.4f")
+    near_radius = n3.slider("Radius (km)", 5, 500, 50)
+    st.dataframe(spatial_index().nearest(near_lng, near_lat, near_radius), use_container_width=True, hide_index=True)
 
 st.divider()
 
 st.subheader("Score Metrics")
 c1, c2, c3, c4 = st.columns(4)
-c1.metric(label="Air", value=int(100*get_network_tonne_km('air', tonne_scaling_factor)), delta=int(100*get_network_gco2(gco2_air, gco2_scaling_factor)))
-c2.metric(label="Rail", value=int(100*get_network_tonne_km('rail', tonne_scaling_factor)), delta=int(100*get_network_gco2(gco2_rail, gco2_scaling_factor)))
-c3.metric(label="Roads (Interstate)", value=int(100*get_network_tonne_km('road_interstate', tonne_scaling_factor)), delta=int(100*get_network_gco2(gco2_road_interstate, gco2_scaling_factor)))
-c4.metric(label="Roads (Local)", value=int(100*get_network_tonne_km('road_urban', tonne_scaling_factor)), delta=int(100*get_network_gco2(gco2_road_local, gco2_scaling_factor)))
+c1.metric(label="Air", value=int(100*network_tonne_km['air']), delta=int(100*network_gco2_score['air']))
+c2.metric(label="Rail", value=int(100*network_tonne_km['rail']), delta=int(100*network_gco2_score['rail']))
+c3.metric(label="Roads (Interstate)", value=int(100*network_tonne_km['road_interstate']), delta=int(100*network_gco2_score['road_interstate']))
+c4.metric(label="Roads (Local)", value=int(100*network_tonne_km['road_urban']), delta=int(100*network_gco2_score['road_urban']))
 st.caption("Number in bold refers to score for TonneKM / H. Number below in green refers to GCO2/Tonne Score")
 
+st.divider()
+st.subheader("Projected emissions, 2016 to 2056")
+st.caption("Each tab's sliders set its selected year; the other years use their presets and are interpolated in between.")
+with instrument.section('projection'):
+    projection_inputs = dict(
+        adoption_knots=projection.knots(projection.ADOPTION_PRESETS, t1_year, scenario_inputs['adoption'], width=4),
+        generation_knots=projection.knots(projection.GENERATION_PRESETS, t2_year, sizes),
+        fleet_knots=projection.knots(
+            projection.FLEET_PRESETS, t3_year,
+            (t3_air_slider, t3_rail_slider, t3_haul_truck_slider, t3_urban_truck_slider), width=4,
+        ),
+        commodity_knots=projection.knots(projection.COMMODITY_PRESETS, t4_option, (
+            t4_manufactures_slider, t4_consumables_slider, t4_construction_slider,
+            t4_fuel_slider, t4_vehicles_slider, t4_waste_slider,
+        )),
+        gco2_scaling_factor=gco2_scaling_factor,
+        tonne_scaling_factor=tonne_scaling_factor,
+    )
+    projected = model.graph.compute(['projection', 'projection_charts'], **projection_inputs)
+    projected_indices = projection.indices(projected['projection'])
+    freight_change = projected_indices['Freight task (tonne-km)'][-1] - 100
+    emissions_change = projected_indices['Emissions (t CO2)'][-1] - 100
+    intensity_change = projected_indices['Emissions intensity (gCO2/tonne-km)'][-1] - 100
+
+    p1, p2, p3 = st.columns(3)
+    p1.metric(label="Freight task, 2056 vs 2016", value=f"{freight_change:+.0f}%")
+    p2.metric(label="Emissions, 2056 vs 2016", value=f"{emissions_change:+.0f}%")
+    p3.metric(label="Emissions intensity, 2056 vs 2016", value=f"{intensity_change:+.0f}%")
+    if emissions_change < 0:
+        st.success("Reductions are outpacing demand growth: total emissions fall while the freight task changes by "
+                   f"{freight_change:+.0f}%.")
+    else:
+        st.warning("Demand growth is outpacing reductions: total emissions rise by "
+                   f"{emissions_change:+.0f}% against a {freight_change:+.0f}% change in the freight task.")
+    indices_chart, emissions_chart = projected['projection_charts']
+    pc1, pc2 = st.columns(2)
+    pc1.plotly_chart(indices_chart, use_container_width=True)
+    pc2.plotly_chart(emissions_chart, use_container_width=True)
+
 
 
 #%% Section 4: Generative AI 
@@ -278,42 +292,68 @@ Got a question about your desired route? Use our Freight-GPT customised chatbot
 """)
 
 
-OPEN_AI_API_LEY = st.secrets["OPEN_AI_API_KEY"]
-llm = OpenAI(OPEN_AI_API_LEY)
-
-route_metrics_df = pd.read_csv('data/raw/congestion_2020/route_metrics_2020.csv')
-citywide_indices_df = pd.read_csv('data/raw/congestion_2020/citywide_indices_2020.csv')
-route_times_df = pd.read_csv('data/raw/congestion_2020/route_times_2020.csv')
-segment_summary_df = pd.read_csv(
-    'data/raw/congestion_2020/segment_summary_2020.csv',
-    names=['road_id', 'hour_of_the_day', 'n_obvs', 'speed_limit', 'UQ', 'median', 'LQ', 'road_distance', 'route_name'],
-    skiprows=1
-)
-
-t1, t2, t3, t4 = st.tabs(['Route Metrics', 'Citywide Indices', 'Route Times', 'Segment Summary'])
-
-t1.dataframe(route_metrics_df, use_container_width=True)
-
-t2.dataframe(citywide_indices_df, use_container_width=True)
-
-t3.dataframe(route_times_df, use_container_width=True)
-
-t4.dataframe(segment_summary_df, use_container_width=True)
-
-dl = SmartDatalake([
-    citywide_indices_df, 
-    route_metrics_df,
-    route_times_df,
-    segment_summary_df,
-], config={"llm": llm, "enable_cache": False}, )
+CONGESTION_TABS = {
+    'route_metrics': 'Route Metrics',
+    'citywide_indices': 'Citywide Indices',
+    'route_times': 'Route Times',
+    'segment_summary': 'Segment Summary',
+}
+
+def congestion_tab(tab, table: str):
+    """Shows one filtered page of a congestion table, queried from DuckDB."""
+    f1, f2, f3 = tab.columns([3, 2, 1])
+    routes = f1.multiselect('Route', congestion_values(table, 'route_name'), key=f'{table}_route')
+    cities = f2.multiselect('City', congestion_values(table, 'city'), key=f'{table}_city')
+    hours = f2.multiselect('Hour', congestion_values(table, 'hour'), key=f'{table}_hour')
+    total = congestion_count(table, tuple(routes), tuple(cities), tuple(hours))
+    pages = max((total - 1) // congestion.PAGE_SIZE + 1, 1)
+    if st.session_state.get(f'{table}_page', 1) > pages:
+        st.session_state[f'{table}_page'] = 1
+    page = f3.number_input('Page', 1, pages, 1, key=f'{table}_page')
+    tab.dataframe(congestion_page(table, tuple(routes), tuple(cities), tuple(hours), page - 1), use_container_width=True)
+    tab.caption(f"{total} rows, page {page} of {pages}")
+    if table == 'route_times' and routes:
+        tab.write('###### Best and worst departure hours (median travel time, seconds)')
+        tab.dataframe(route_profiles().summary(routes), use_container_width=True, hide_index=True)
+
+congestion_tables = [table for table in CONGESTION_TABS if table in congestion.tables(congestion_db())]
+for tab, table in zip(st.tabs([CONGESTION_TABS[table] for table in congestion_tables]), congestion_tables):
+    with instrument.section(f'congestion:{table}'):
+        congestion_tab(tab, table)
 
 prompt = st.text_input("Prompt:", placeholder="I'm driving along route 32 - Derrimut to Montrose, what is the max median travel time?")
 
-if st.button("Send") or prompt:
+send = st.button("Send")
+if prompt:
     st.write(f"### Your question")
     st.write(prompt)
     st.write(f"### Freight-GPT says")
-    with st.spinner('Analysing the data...'):
-        response = dl.chat(prompt)
-        st.write(response)
-
+    # Reruns from other widgets show the last answer; a prompt is only asked when it changes or on Send.
+    asked = st.session_state.get('freight_gpt_answer')
+    if send or asked is None or asked[0] != prompt:
+        with st.spinner('Analysing the data...'):
+            with instrument.section('freight_gpt'):
+                asked = (prompt, *freight_gpt().ask(prompt))
+            instrument.count(f'freight_gpt:{asked[2]}')
+        st.session_state['freight_gpt_answer'] = asked
+    _, response, source = asked
+    st.write(response)
+    st.caption({
+        'cache': 'Answered from cache', 'data': 'Answered directly from the data', 'llm': 'Answered by the LLM',
+        'error': 'The LLM could not answer this; press Send to try again',
+    }[source])
+
+perf = instrument.finish(rerun)
+if debug_panel:
+    st.sidebar.subheader("Profiling")
+    st.sidebar.metric("Rerun", f"{perf['total_ms']:.0f} ms")
+    st.sidebar.write("###### Sections (ms)")
+    st.sidebar.dataframe(pd.Series(perf['sections'], name='ms').sort_values(ascending=False), use_container_width=True)
+    st.sidebar.write("###### Cached loaders")
+    st.sidebar.dataframe(pd.DataFrame.from_dict(perf['cache'], orient='index'), use_container_width=True)
+    if perf['layer_bytes']:
+        st.sidebar.write("###### Map layer payloads (bytes)")
+        st.sidebar.dataframe(pd.Series(perf['layer_bytes'], name='bytes'), use_container_width=True)
+    if perf['counters']:
+        st.sidebar.write("###### Counters")
+        st.sidebar.dataframe(pd.Series(perf['counters'], name='count'), use_container_width=True)
@@ -0,0 +1 @@
+"""Streamlit-free model and data code shared by the dashboard, pages and scripts."""
@@ -0,0 +1,199 @@
+"""Airport origin-destination arcs, built from the raw airport locations and BITRE cargo data.
+
+The airports on the map are keyed by ICAO code, and their coordinates are looked up in a
+dict of every airport in ``au-airport-locations.csv``. ``domestic_cargo_data.csv`` has
+the monthly tonnes handled at each capital-city airport and on the whole domestic
+network; the rest of the network total is shared equally among the other airports. The
+data has no tonnes per pair, so half of each airport's tonnes leave it, split across the
+destinations in proportion to their own tonnes (a gravity model).
+
+``build`` writes the airports, and the pairs as positions in the airport table with their
+tonnes, as Arrow IPC files in ``data/compiled/airport_arcs``, with the signature of each
+source. The airports are only resolved again when the locations file changes, and the
+pairs only recomputed when either file does, so a new release of the cargo data is a
+quick rebuild:
+
+    python -m freight.airports
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from freight.artifacts import (
+    AIRPORTS_CSV, ARTIFACTS_DIR, matches, read_arrow, read_meta, source_signature, write_arrow, write_meta,
+)
+
+CARGO_CSV = 'data/raw/domestic_cargo_data.csv'
+NAME = 'airport_arcs'
+MONTHS = 12
+NETWORK_TOTAL = 'Total domestic network'
+
+# Map label -> ICAO code of the airports with arcs, in the order they're listed.
+AIRPORTS = {
+    'Avalon Airport': 'YMAV',
+    'Melbourne International Airport': 'YMML',
+    'Hobart International Airport': 'YMHB',
+    'Launceston Airport': 'YMLT',
+    'Perth Airport': 'YPPH',
+    'Darwin International Airport': 'YPDN',
+    'Adelaide Airport': 'YPAD',
+    'Sydney International Airport': 'YSSY',
+    'Newcastle Airport': 'YWLM',
+    'Cairns Airport': 'YBCS',
+    'Brisbane Airport': 'YBBN',
+    'Gold Coast Airport': 'YBCG',
+    'Charlton-Wellcamp': 'YBWW',
+    'Canberra International Airport': 'YSCB',
+}
+# Cargo data column -> ICAO code of the city's airport.
+CARGO_AIRPORTS = {'Adelaide': 'YPAD', 'Brisbane': 'YBBN', 'Melbourne': 'YMML', 'Perth': 'YPPH', 'Sydney': 'YSSY'}
+
+
+def read_locations(path: str = AIRPORTS_CSV) -> dict[str, tuple[float, float]]:
+    """ICAO code -> (lng, lat) of every airport in the locations file."""
+    df = pd.read_csv(path, usecols=['ident', 'longitude_deg', 'latitude_deg'])
+    return dict(zip(df['ident'], zip(df['longitude_deg'], df['latitude_deg'])))
+
+
+def resolve_airports(locations: dict, airports: dict = AIRPORTS) -> pd.DataFrame:
+    """Name, ICAO code, lng and lat of each airport in ``airports``."""
+    missing = [code for code in airports.values() if code not in locations]
+    if missing:
+        raise KeyError(f"Airports missing from the locations file: {', '.join(missing)}")
+    lng, lat = zip(*(locations[code] for code in airports.values()))
+    return pd.DataFrame({'name': list(airports), 'icao': list(airports.values()), 'lng': lng, 'lat': lat})
+
+
+def read_cargo(path: str = CARGO_CSV, months: int = MONTHS) -> tuple[pd.Series, list[str]]:
+    """Tonnes per column over the latest ``months`` months, and the first and last month as 'YYYY-MM'.
+
+    Every column but the network total must be a city in ``CARGO_AIRPORTS``, so a new
+    city's tonnes aren't silently shared among the other airports.
+    """
+    df = pd.read_csv(path, encoding='utf-8-sig').sort_values(['Year', 'Month']).tail(months)
+    period = [f'{year}-{month:02d}' for year, month in df[['Year', 'Month']].iloc[[0, -1]].itertuples(index=False)]
+    cargo = df.drop(columns=['_id', 'Year', 'Month']).sum()
+    unknown = [column for column in cargo.index if column not in CARGO_AIRPORTS and column != NETWORK_TOTAL]
+    if unknown:
+        raise KeyError(f"Cities in the cargo data with no airport in CARGO_AIRPORTS: {', '.join(unknown)}")
+    return cargo, period
+
+
+def airport_tonnes(airports: pd.DataFrame, cargo: pd.Series) -> np.ndarray:
+    """Tonnes handled at each airport, with the network total less the capitals shared among the rest."""
+    by_code = {code: cargo[column] for column, code in CARGO_AIRPORTS.items()}
+    listed = airports['icao'].isin(by_code).to_numpy()
+    rest = max(cargo[NETWORK_TOTAL] - sum(by_code.values()), 0) / max((~listed).sum(), 1)
+    return np.where(listed, airports['icao'].map(by_code), rest).astype(float)
+
+
+def gravity_flows(tonnes: np.ndarray) -> np.ndarray:
+    """(n, n) tonnes from each airport to each other one; the diagonal is zero."""
+    tonnes = np.asarray(tonnes, dtype=float)
+    others = np.maximum(tonnes.sum() - tonnes, 1e-9)
+    flows = np.outer(tonnes / 2 / others, tonnes)
+    np.fill_diagonal(flows, 0)
+    return flows
+
+
+def pair_table(tonnes: np.ndarray) -> pd.DataFrame:
+    """One row per ordered pair of airports, as positions in the airport table, grouped by origin.
+
+    ``weight`` is the square root of the pair's tonnes relative to the largest pair, from 0
+    to 1, so the arc's width and opacity grow with the area of the flow.
+    """
+    flows = gravity_flows(tonnes)
+    origin, destination = np.nonzero(~np.eye(len(flows), dtype=bool))
+    pairs = pd.DataFrame({
+        'origin': origin.astype(np.int16),
+        'destination': destination.astype(np.int16),
+        'tonnes': flows[origin, destination].astype(np.float32),
+    })
+    pairs['weight'] = np.sqrt(pairs['tonnes'] / max(pairs['tonnes'].max(), 1e-9)).astype(np.float32)
+    return pairs
+
+
+def arc_table(airports: pd.DataFrame, pairs: pd.DataFrame) -> pd.DataFrame:
+    """The pairs with the names and [lng, lat] of both ends, as the map's arc layer reads them."""
+    names, lng, lat = (airports[column].to_numpy() for column in ('name', 'lng', 'lat'))
+    i, j = pairs['origin'].to_numpy(), pairs['destination'].to_numpy()
+    return pd.DataFrame({
+        'from_name': names[i], 'to_name': names[j],
+        'from_lng': lng[i], 'from_lat': lat[i], 'to_lng': lng[j], 'to_lat': lat[j],
+        'tonnes': pairs['tonnes'].to_numpy(), 'weight': pairs['weight'].to_numpy(),
+    })
+
+
+def _matches(signature: dict | None, source: str) -> bool:
+    return signature is not None and signature['path'] == source and matches(signature, source)
+
+
+def stale_stages(meta: dict | None, locations_csv: str = AIRPORTS_CSV, cargo_csv: str = CARGO_CSV,
+                 months: int = MONTHS) -> list[str]:
+    """The stages ('airports', 'pairs') that are out of date with the sources; new airports mean new pairs."""
+    if meta is None or meta.get('airports') != AIRPORTS or not _matches(meta.get('locations'), locations_csv):
+        return ['airports', 'pairs']
+    if meta.get('months') != months or not _matches(meta.get('cargo'), cargo_csv):
+        return ['pairs']
+    return []
+
+
+def build(artifacts_dir: str = ARTIFACTS_DIR, locations_csv: str = AIRPORTS_CSV, cargo_csv: str = CARGO_CSV,
+          months: int = MONTHS, force: bool = False) -> list[str]:
+    """Rebuilds the stale stages of the arc table. Returns the stages that were rebuilt."""
+    directory = os.path.join(artifacts_dir, NAME)
+    meta = None if force else read_meta(NAME, artifacts_dir)
+    stages = stale_stages(meta, locations_csv, cargo_csv, months)
+    if not stages:
+        return []
+    os.makedirs(directory, exist_ok=True)
+    if 'airports' in stages:
+        airports = resolve_airports(read_locations(locations_csv))
+        write_arrow(pa.Table.from_pandas(airports, preserve_index=False), os.path.join(directory, 'airports.arrow'))
+        meta = {'kind': 'airport_arcs', 'airports': AIRPORTS, 'locations': source_signature(locations_csv)}
+    else:
+        airports = read_arrow(os.path.join(directory, 'airports.arrow')).to_pandas()
+
+    cargo, period = read_cargo(cargo_csv, months)
+    pairs = pair_table(airport_tonnes(airports, cargo))
+    write_arrow(pa.Table.from_pandas(pairs, preserve_index=False), os.path.join(directory, 'pairs.arrow'))
+    meta.update(cargo=source_signature(cargo_csv), months=months, period=period, pairs=len(pairs))
+    write_meta(directory, meta)
+    return stages
+
+
+def load_arcs(artifacts_dir: str = ARTIFACTS_DIR) -> pd.DataFrame:
+    """The arc table, from the artifact if it matches both sources, else computed from them."""
+    directory = os.path.join(artifacts_dir, NAME)
+    if not stale_stages(read_meta(NAME, artifacts_dir)):
+        airports = read_arrow(os.path.join(directory, 'airports.arrow')).to_pandas()
+        return arc_table(airports, read_arrow(os.path.join(directory, 'pairs.arrow')).to_pandas())
+    return compute_arcs()
+
+
+def compute_arcs(locations_csv: str = AIRPORTS_CSV, cargo_csv: str = CARGO_CSV, months: int = MONTHS) -> pd.DataFrame:
+    """The arc table, straight from the sources."""
+    airports = resolve_airports(read_locations(locations_csv))
+    return arc_table(airports, pair_table(airport_tonnes(airports, read_cargo(cargo_csv, months)[0])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the airport arc table from the raw airport and cargo data.")
+    parser.add_argument("-o", "--output-dir", type=str, default=ARTIFACTS_DIR)
+    parser.add_argument("--months", type=int, default=MONTHS, help="Latest months of cargo data to total")
+    parser.add_argument("--force", action="store_true", help="Rebuild every stage, even if it's fresh")
+    args = parser.parse_args(argv)
+
+    built = build(args.output_dir, months=args.months, force=args.force)
+    meta = read_meta(NAME, args.output_dir)
+    print(f"Rebuilt {', '.join(built) or 'nothing (all fresh)'}: {meta['pairs']} arcs, "
+          f"tonnes from {meta['period'][0]} to {meta['period'][1]}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
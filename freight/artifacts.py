@@ -0,0 +1,248 @@
+"""Precompiled, memory-mappable copies of the dashboard's JSON inputs.
+
+``build`` compiles each source into ``data/compiled``:
+
+- tables become Arrow IPC files, read back through a memory map;
+- GeoJSON becomes a flat float64 coordinate buffer plus offset arrays (shapely's ragged
+  array layout) saved as ``.npy`` files and opened with ``mmap_mode='r'``, with feature
+  properties in an Arrow IPC file.
+
+Each artifact records the size, mtime and SHA-1 of its source. Loaders use an artifact
+only if it matches the source (by mtime and size, or failing that by hash) and otherwise
+read the raw file, so a missing or stale build is never worse than no build:
+
+    python -m freight.artifacts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import shapely
+
+from freight.geo import load_features, load_json
+
+ARTIFACTS_DIR = 'data/compiled'
+META = 'meta.json'
+
+# (source, size, mtime_ns, artifact sha1) already checked against the source's hash in this process.
+_verified = set()
+
+
+# Artifact name -> (source, reader returning a DataFrame)
+TABLES = {
+    'metric_tonnekm': ('data/raw/metric_tonnekm.json', pd.read_json),
+    'hydrogen_emission_pct': ('data/raw/hydrogen_emission_pct.json', pd.read_json),
+}
+
+GEOJSON = [
+    'data/simplified/geometries_2020.geojson',
+    'data/simplified/key_rail_freight_route_simplified.geojson',
+    'data/simplified/key_road_freight_route_simplified.geojson',
+    'data/simplified/nltn_road_simplified.geojson',
+    'data/simplified/rail_map_simplified.geojson',
+    'data/raw/secondary_freight.geojson',
+    'data/raw/road_train_ass.geojson',
+    'data/raw/intermodal_terminals.geojson',
+    'data/raw/seaports.geojson',
+    'data/raw/airports.geojson',
+]
+
+# Raw sources read as they are: the facilities searched by spatial.SpatialIndex, and
+# the airport locations, also resolved by freight.airports.
+FACILITY_GEOJSON = {
+    'seaport': 'data/raw/seaports.geojson',
+    'intermodal_terminal': 'data/raw/intermodal_terminals.geojson',
+}
+AIRPORTS_CSV = 'data/raw/au-airport-locations.csv'
+
+
+def _sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': _sha1(path)}
+
+
+def _artifact_dir(name: str, artifacts_dir: str) -> str:
+    return os.path.join(artifacts_dir, name)
+
+
+def _geojson_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def read_meta(name: str, artifacts_dir: str = ARTIFACTS_DIR) -> dict | None:
+    path = os.path.join(_artifact_dir(name, artifacts_dir), META)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def is_fresh(meta: dict | None, source: str) -> bool:
+    """True if the artifact was built from the current contents of ``source``."""
+    return meta is not None and matches(meta['source'], source)
+
+
+def matches(signature: dict, source: str) -> bool:
+    """True if ``source`` still has the contents ``signature`` (from ``source_signature``) was taken of."""
+    if not os.path.exists(source):
+        return False
+    stat = os.stat(source)
+    if stat.st_size != signature['size']:
+        return False
+    if stat.st_mtime_ns == signature['mtime_ns']:
+        return True
+    # mtimes change on checkout or copy, so fall back to the hash, once per process.
+    key = (source, stat.st_size, stat.st_mtime_ns, signature['sha1'])
+    if key not in _verified and _sha1(source) == signature['sha1']:
+        _verified.add(key)
+    return key in _verified
+
+
+def write_meta(directory: str, meta: dict):
+    with open(os.path.join(directory, META), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def write_arrow(table: pa.Table, path: str):
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_arrow(path: str) -> pa.Table:
+    """Reads an Arrow IPC file through a memory map; column buffers are not copied."""
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def compile_table(name: str, artifacts_dir: str = ARTIFACTS_DIR):
+    source, reader = TABLES[name]
+    directory = _artifact_dir(name, artifacts_dir)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    write_arrow(pa.Table.from_pandas(reader(source), preserve_index=True), os.path.join(directory, 'table.arrow'))
+    write_meta(directory, {'kind': 'table', 'source': source_signature(source)})
+
+
+def compile_geojson(source: str, artifacts_dir: str = ARTIFACTS_DIR):
+    geoms, properties = load_features(source)
+    geometry_type, coords, offsets = shapely.to_ragged_array(geoms)
+    directory = _artifact_dir(_geojson_name(source), artifacts_dir)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    np.save(os.path.join(directory, 'coords.npy'), np.ascontiguousarray(coords, dtype=np.float64))
+    for i, offset in enumerate(offsets):
+        np.save(os.path.join(directory, f'offsets_{i}.npy'), np.asarray(offset, dtype=np.int64))
+    write_arrow(pa.table({'properties': [json.dumps(p) for p in properties]}), os.path.join(directory, 'properties.arrow'))
+    write_meta(directory, {
+        'kind': 'geojson',
+        'collection': load_json(source)['type'],
+        'geometry_type': geometry_type.name,
+        'offsets': len(offsets),
+        'features': len(geoms),
+        'source': source_signature(source),
+    })
+
+
+def build(artifacts_dir: str = ARTIFACTS_DIR, force: bool = False) -> list[str]:
+    """Compiles every stale or missing artifact. Returns the names that were (re)built."""
+    built = []
+    for name, (source, _) in TABLES.items():
+        if force or not is_fresh(read_meta(name, artifacts_dir), source):
+            compile_table(name, artifacts_dir)
+            built.append(name)
+    for source in GEOJSON:
+        name = _geojson_name(source)
+        if force or not is_fresh(read_meta(name, artifacts_dir), source):
+            compile_geojson(source, artifacts_dir)
+            built.append(name)
+    return built
+
+
+def load_arrow_table(name: str, artifacts_dir: str = ARTIFACTS_DIR) -> pa.Table | None:
+    """Returns the memory-mapped Arrow table for ``name``, or None if it's missing or stale."""
+    source, _ = TABLES[name]
+    if not is_fresh(read_meta(name, artifacts_dir), source):
+        return None
+    return read_arrow(os.path.join(_artifact_dir(name, artifacts_dir), 'table.arrow'))
+
+
+def load_table(name: str, artifacts_dir: str = ARTIFACTS_DIR) -> pd.DataFrame:
+    """Returns table ``name`` as a DataFrame, from its artifact if fresh, else from the source."""
+    table = load_arrow_table(name, artifacts_dir)
+    if table is None:
+        source, reader = TABLES[name]
+        return reader(source)
+    return table.to_pandas()
+
+
+def load_geometry(source: str, artifacts_dir: str = ARTIFACTS_DIR) -> dict | None:
+    """Returns the memory-mapped ragged arrays for a GeoJSON source, or None if missing or stale.
+
+    The result has ``coords`` (n, 2), ``offsets`` (tuple of int arrays, as in
+    ``shapely.from_ragged_array``), ``properties`` (Arrow string column) and the meta fields.
+    """
+    name = _geojson_name(source)
+    meta = read_meta(name, artifacts_dir)
+    if not is_fresh(meta, source):
+        return None
+    directory = _artifact_dir(name, artifacts_dir)
+    return {
+        **meta,
+        'coords': np.load(os.path.join(directory, 'coords.npy'), mmap_mode='r'),
+        'offsets': tuple(np.load(os.path.join(directory, f'offsets_{i}.npy'), mmap_mode='r') for i in range(meta['offsets'])),
+        'properties': read_arrow(os.path.join(directory, 'properties.arrow')).column('properties'),
+    }
+
+
+def _from_ragged(geometry: dict) -> np.ndarray:
+    return shapely.from_ragged_array(shapely.GeometryType[geometry['geometry_type']], geometry['coords'], geometry['offsets'])
+
+
+def geometries(source: str, artifacts_dir: str = ARTIFACTS_DIR) -> np.ndarray:
+    """Returns the source's shapely geometries, built straight from the flat buffers when possible."""
+    geometry = load_geometry(source, artifacts_dir)
+    if geometry is None:
+        return load_features(source)[0]
+    return _from_ragged(geometry)
+
+
+def features(source: str, artifacts_dir: str = ARTIFACTS_DIR) -> tuple[np.ndarray, list[str]]:
+    """Returns the source's geometries and each feature's properties as JSON text.
+
+    From a fresh artifact, the geometries come straight from the flat buffers and the
+    properties are the Arrow column as stored, so no per-feature dicts are built.
+    """
+    geometry = load_geometry(source, artifacts_dir)
+    if geometry is None:
+        geoms, properties = load_features(source)
+        return geoms, [json.dumps(p) for p in properties]
+    return _from_ragged(geometry), geometry['properties'].to_pylist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile dashboard inputs into memory-mappable artifacts.")
+    parser.add_argument("-o", "--output-dir", type=str, default=ARTIFACTS_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebuild every artifact, even if it's fresh")
+    args = parser.parse_args(argv)
+
+    built = build(args.output_dir, args.force)
+    print(f"Built {len(built)} artifact(s): {', '.join(built) or 'all fresh'}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
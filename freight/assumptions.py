@@ -0,0 +1,32 @@
+import numpy as np
+
+# GCO2: https://www.ecta.com/wp-content/uploads/2021/03/ECTA-CEFIC-GUIDELINE-FOR-MEASURING-AND-MANAGING-CO2-ISSUE-1.pdf
+
+ASSUMPTIONS = {
+    "tonne.km/hr": {
+      "air": "100000",
+      "rail": "300000",
+      "road_interstate": "1500",
+      "road_urban": "180"
+    },
+    "gco2/tonne.km": {
+      "air": "602",
+      "rail": "22",
+      "road_interstate": "62",
+      "road_urban": "50"
+    }
+}
+
+LIMITS = {
+        'tonne.km/hr': np.log2(1_000_000),
+        'gco2/tonne.km': 100,
+        'km/h': 1000,
+    }
+
+NETWORKS = ('air', 'rail', 'road_interstate', 'road_urban')
+
+# Relative emissions intensity of hydrogen made by each generation source. Only the ratios
+# matter: scenario.hydrogen_mult divides the mix's weighted intensity by fossil_fuels' to
+# get the multiplier applied to a network's gCO2/tonne.km for its hydrogen-powered share.
+GENERATION_SOURCES = ('fossil_fuels', 'natural_gas', 'electrolysis', 'biomass')
+GENERATION_GCO2 = (27, 12, 0, -2)
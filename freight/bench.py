@@ -0,0 +1,323 @@
+"""Benchmarks for the dashboard and the data scripts, compared against a stored baseline.
+
+Each case runs in a fresh interpreter, so caches start cold and its peak RSS is its own:
+
+- ``dashboard``: cold start of ``Dashboard.py`` under Streamlit's headless ``AppTest``
+  (with the OpenAI client replaced by ``FakeLLM``), the cold time of every cached loader
+  it calls (from ``freight.instrument``), and rerun latency for slider, multiselect and
+  selectbox changes. The congestion database is built first, so a fresh checkout doesn't
+  time the CSV import.
+- ``loaders``: each dashboard input read from its compiled artifact and from the raw file,
+  plus the spatial index, DuckDB connection and hourly profiles.
+- ``scripts``: ``linestring_to_geojson.py`` and ``simplify_geojson.py`` on synthetic routes,
+  ``BASE_ROUTES`` routes of ``ROUTE_POINTS`` points scaled 10x, 100x and 1000x. Each
+  scale gets its own interpreter, so ``scripts.<scale>x.peak_rss_mb`` is that scale's.
+
+Metric names end in ``_s`` or ``_mb`` (lower is better) or ``_per_s`` (higher is better).
+A metric regresses if it is worse than the baseline by more than its threshold (and, for
+timings, by at least ``MIN_CHANGE_S``). Thresholds live in the baseline file. Run from
+the repository root:
+
+    python -m freight.bench -o bench.json            # exits 1 on a regression
+    python -m freight.bench --update-baseline        # after a deliberate change
+"""
+
+import argparse
+import csv
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = 'benchmarks/baseline.json'
+DEFAULT_THRESHOLD = 0.25
+REPEATS = 5
+
+BASE_ROUTES = 20
+ROUTE_POINTS = 64
+SCALES = (10, 100, 1000)
+
+# Timings closer to the baseline than this are never regressions, however small the baseline.
+MIN_CHANGE_S = 0.005
+
+# (metric name, widget type, label, values to cycle through) for the rerun latency measurements.
+INTERACTIONS = [
+    ('gco2_slider', 'slider', 'GCO2 Scaling Factor', [0.5, 1.5]),
+    ('tonne_km_slider', 'slider', 'Tonne KM/H Scaling Factor', [0.5, 1.5]),
+    ('layers_multiselect', 'multiselect', 'What layers would you like to show', [['Air', 'Rail'], ['Air', 'Roads (Local)', 'Rail', 'Roads (Interstate)']]),
+    ('region_selectbox', 'selectbox', 'Region', ['Victoria', 'Australia']),
+]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1 << 20) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def median_time(fn, repeats: int = REPEATS) -> float:
+    return float(np.median([timed(fn)[0] for _ in range(repeats)]))
+
+
+def widget(at, kind: str, label: str):
+    return next(w for w in getattr(at, kind) if w.label == label)
+
+
+def fake_openai(api_key=None, **kwargs):
+    """Stands in for ``pandasai.llm.OpenAI``, answering every prompt locally and instantly."""
+    from pandasai.llm.fake import FakeLLM
+    return FakeLLM(output="result = {'type': 'string', 'value': 'Stand-in answer'}")
+
+
+def bench_dashboard(repeats: int = REPEATS) -> dict:
+    import pandasai.llm
+    from streamlit.testing.v1 import AppTest
+
+    from freight import congestion
+
+    # Dashboard.py connects read-only; build (or check) the database outside the timings.
+    congestion.connect().close()
+    # Dashboard.py does `from pandasai.llm import OpenAI`, so this keeps the benchmark offline.
+    pandasai.llm.OpenAI = fake_openai
+    log = tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False).name
+    os.environ['FREIGHT_PERF_LOG'] = log
+
+    at = AppTest.from_file(os.path.join(ROOT, 'Dashboard.py'), default_timeout=300)
+    at.secrets['OPEN_AI_API_KEY'] = 'sk-benchmark'
+    cold_start, _ = timed(at.run)
+    if at.exception:
+        raise RuntimeError(f'Dashboard.py raised: {at.exception[0].message}')
+    metrics = {'dashboard.cold_start_s': cold_start}
+
+    from freight.instrument import read_log
+    first_run = read_log(log)[0]
+    os.unlink(log)
+    for name, ms in first_run['sections'].items():
+        if name.startswith('load:'):
+            metrics[f'dashboard.cold.{name[5:]}_s'] = ms / 1000
+
+    for name, kind, label, values in INTERACTIONS:
+        times = []
+        for i in range(repeats * len(values)):
+            widget(at, kind, label).set_value(values[i % len(values)])
+            times.append(timed(at.run)[0])
+        metrics[f'dashboard.rerun.{name}.p50_s'] = float(np.percentile(times, 50))
+        metrics[f'dashboard.rerun.{name}.p95_s'] = float(np.percentile(times, 95))
+    return metrics
+
+
+def bench_loaders(repeats: int = REPEATS) -> dict:
+    from freight import airports, artifacts, congestion, layers, profiles, spatial
+    from freight.geo import load_features
+
+    metrics = {}
+    for name, (source, reader) in artifacts.TABLES.items():
+        metrics[f'loaders.{name}.compiled_s'] = median_time(lambda: artifacts.load_table(name), repeats)
+        metrics[f'loaders.{name}.raw_s'] = median_time(lambda: reader(source), repeats)
+    metrics['loaders.airport_arcs.compiled_s'] = median_time(airports.load_arcs, repeats)
+    metrics['loaders.airport_arcs.raw_s'] = median_time(airports.compute_arcs, repeats)
+    for source in artifacts.GEOJSON:
+        name = os.path.splitext(os.path.basename(source))[0]
+        metrics[f'loaders.{name}.compiled_s'] = median_time(lambda: artifacts.features(source), repeats)
+        metrics[f'loaders.{name}.raw_s'] = median_time(lambda: load_features(source), repeats)
+
+    con = congestion.connect()
+    metrics['loaders.spatial_index_s'] = median_time(lambda: spatial.SpatialIndex.build(layers.geojson_sources()), repeats)
+    metrics['loaders.congestion_connect_s'] = median_time(congestion.connect, repeats)
+    metrics['loaders.route_profiles_s'] = median_time(lambda: profiles.HourlyProfiles.from_congestion(con), repeats)
+    return metrics
+
+
+def load_script(name: str):
+    """Imports ``scripts/<name>.py`` as a module without running its command line."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, 'scripts', f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_synthetic_routes(path: str, routes: int, points: int = ROUTE_POINTS, seed: int = 0):
+    """Writes a geometries_2020.csv lookalike of random-walk LINESTRINGs around Melbourne."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['route_name', 'route_geom'])
+        for i in range(routes):
+            start = np.array([144.96, -37.81]) + rng.uniform(-0.5, 0.5, 2)
+            coords = start + np.cumsum(rng.normal(0, 0.002, (points, 2)), axis=0)
+            writer.writerow([f'{i} - Synthetic route', 'LINESTRING (' + ', '.join(f'{x:.6f} {y:.6f}' for x, y in coords) + ')'])
+
+
+def bench_scripts(scales=SCALES) -> dict:
+    linestring_to_geojson = load_script('linestring_to_geojson')
+    simplify_geojson = load_script('simplify_geojson')
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            routes = BASE_ROUTES * scale
+            csv_path = os.path.join(tmp, f'routes_{scale}x.csv')
+            geojson_path = os.path.join(tmp, f'routes_{scale}x.geojson')
+            write_synthetic_routes(csv_path, routes)
+
+            def convert():
+                with open(geojson_path, 'w') as out:
+                    linestring_to_geojson.write_geojson(linestring_to_geojson.iter_features(linestring_to_geojson.read_rows(csv_path)), out)
+
+            seconds, _ = timed(convert)
+            metrics[f'scripts.linestring_to_geojson.{scale}x_s'] = seconds
+            metrics[f'scripts.linestring_to_geojson.{scale}x.routes_per_s'] = routes / seconds
+            metrics[f'scripts.linestring_to_geojson.{scale}x.mb_per_s'] = os.path.getsize(csv_path) / (1 << 20) / seconds
+
+            seconds, _ = timed(simplify_geojson.build_levels, geojson_path, os.path.join(tmp, f'levels_{scale}x'))
+            metrics[f'scripts.simplify_geojson.{scale}x_s'] = seconds
+            metrics[f'scripts.simplify_geojson.{scale}x.routes_per_s'] = routes / seconds
+            metrics[f'scripts.simplify_geojson.{scale}x.mb_per_s'] = os.path.getsize(geojson_path) / (1 << 20) / seconds
+    return metrics
+
+
+CASES = {
+    'dashboard': bench_dashboard,
+    'loaders': bench_loaders,
+    'scripts': bench_scripts,
+}
+
+
+def _run_case(name: str, kwargs: dict, rss_metric: str) -> dict:
+    os.chdir(ROOT)
+    metrics = CASES[name](**kwargs)
+    metrics[rss_metric] = peak_rss_mb()
+    return metrics
+
+
+def run_case(name: str, rss_metric: str | None = None, **kwargs) -> dict:
+    """Runs one case in a freshly spawned interpreter and returns its metrics.
+
+    Its peak RSS is reported as ``rss_metric``, by default ``<name>.peak_rss_mb``.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_run_case, name, kwargs, rss_metric or f'{name}.peak_rss_mb').result()
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith('_per_s')
+
+
+def compare(metrics: dict, baseline: dict, default_threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Rows of (metric, baseline, current, change, threshold, regressed) for metrics in both."""
+    thresholds = baseline.get('thresholds', {})
+    rows = []
+    for metric, value in metrics.items():
+        base = baseline['metrics'].get(metric)
+        if base is None or base == 0:
+            continue
+        threshold = thresholds.get(metric, thresholds.get('default', default_threshold))
+        change = value / base - 1
+        worse = -change if higher_is_better(metric) else change
+        if metric.endswith('_s') and value - base < MIN_CHANGE_S:
+            worse = 0
+        rows.append({
+            'metric': metric,
+            'baseline': base,
+            'current': value,
+            'change': change,
+            'threshold': threshold,
+            'regressed': worse > threshold,
+        })
+    return rows
+
+
+def print_comparison(rows: list[dict], out=sys.stderr):
+    width = max((len(r['metric']) for r in rows), default=6)
+    print(f"{'metric':<{width}}{'baseline':>12}{'current':>12}{'change':>9}", file=out)
+    for r in rows:
+        flag = '  REGRESSED' if r['regressed'] else ''
+        print(f"{r['metric']:<{width}}{r['baseline']:>12.4g}{r['current']:>12.4g}{r['change']:>+9.1%}{flag}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard and data scripts against a baseline.")
+    parser.add_argument("--cases", type=str, default=','.join(CASES), help="Comma separated cases to run")
+    parser.add_argument("--scales", type=str, default=','.join(map(str, SCALES)), help="Script input scales")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Repeats per timing, where repeated")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Write results as JSON (default: stdout)")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown, unless the baseline sets one")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    metrics = {}
+    for name in args.cases.split(','):
+        if name == 'scripts':
+            # ru_maxrss only grows, so one process per scale keeps each scale's peak apart.
+            for scale in (int(s) for s in args.scales.split(',')):
+                print(f"Running {name} at {scale}x...", file=sys.stderr)
+                metrics.update(run_case(name, f'{name}.{scale}x.peak_rss_mb', scales=[scale]))
+        else:
+            print(f"Running {name}...", file=sys.stderr)
+            metrics.update(run_case(name, repeats=args.repeats))
+    results = {'environment': environment(), 'metrics': metrics}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.update_baseline:
+        thresholds = {'default': args.threshold}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                thresholds = json.load(f).get('thresholds', thresholds)
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({**results, 'thresholds': thresholds}, f, indent=2)
+        print(f"Updated {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        rows = compare(metrics, json.load(f), args.threshold)
+    print_comparison(rows)
+    regressions = [r['metric'] for r in rows if r['regressed']]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""DuckDB store for the BITRE freight congestion tables.
+
+``ingest`` loads the congestion CSVs into typed tables (durations in seconds, hours as
+integers), sorted by route and hour so filtered reads only touch the row groups they need.
+The dashboard reads them back through ``query`` with route/city/hour filters and
+LIMIT/OFFSET pagination instead of whole-file reads. ``ingest`` records the signature of
+each CSV it read, and ``connect`` (re)builds the database on first run or when any CSV has
+changed since; rebuild it by hand with:
+
+    python -m freight.congestion
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import threading
+
+import duckdb
+import pandas as pd
+
+from freight.artifacts import matches, source_signature
+
+DB_PATH = 'data/govhack.db'
+CONGESTION_DIR = 'data/raw/congestion_2020'
+PAGE_SIZE = 100
+# Table of (filename, source signature as JSON) for every CSV the tables were read from.
+SOURCES_TABLE = 'congestion_sources'
+
+
+def _seconds(column: str) -> str:
+    return f'CAST(epoch(CAST("{column}" AS INTERVAL)) AS INTEGER)'
+
+
+# Table name -> (CSV file, column names to read it with or None for its header,
+# SELECT list over the all-VARCHAR CSV, ORDER BY).
+TABLES = {
+    'route_metrics': ('route_metrics_2020.csv', None, f'''
+        route_name,
+        {_seconds('min median travel time')} AS min_median_travel_time,
+        {_seconds('max median travel time')} AS max_median_travel_time,
+        CAST("Peak time to best ratio" AS DOUBLE) AS peak_time_to_best_ratio,
+        {_seconds('min iq travel time')} AS min_iq_travel_time,
+        {_seconds('max iq travel time')} AS max_iq_travel_time,
+        CAST("Peak iq to best ratio" AS DOUBLE) AS peak_iq_to_best_ratio,
+        CAST("all times" AS BOOLEAN) AS all_times,
+        CAST("min median travel hour" AS TINYINT) AS min_median_travel_hour,
+        CAST("max median travel hour" AS TINYINT) AS max_median_travel_hour,
+        CAST("min iq travel hour" AS TINYINT) AS min_iq_travel_hour,
+        CAST("max iq travel hour" AS TINYINT) AS max_iq_travel_hour,
+        CAST("total obvs" AS BIGINT) AS total_obvs,
+        CAST("Mean excess time ratio" AS DOUBLE) AS mean_excess_time_ratio,
+        CAST("Mean excess time ratio - weighted" AS DOUBLE) AS mean_excess_time_ratio_weighted,
+        CAST("Mean excess iq ratio" AS DOUBLE) AS mean_excess_iq_ratio,
+        CAST("Mean excess iq ratio - weighted" AS DOUBLE) AS mean_excess_iq_ratio_weighted,
+        CAST(distance AS DOUBLE) AS distance
+    ''', 'route_name'),
+    'citywide_indices': ('citywide_indices_2020.csv', None, '''
+        city,
+        CAST(mean_odw AS DOUBLE) AS mean_odw,
+        CAST(mean_iq_odw AS DOUBLE) AS mean_iq_odw,
+        CAST(mean_odw_hw AS DOUBLE) AS mean_odw_hw,
+        CAST(mean_iq_odw_hw AS DOUBLE) AS mean_iq_odw_hw,
+        CAST(year AS SMALLINT) AS year
+    ''', 'city, year'),
+    # LQ/med/UQ are already in seconds; the *_char columns only repeat them as text.
+    'route_times': ('route_times_2020.csv', None, '''
+        route_name,
+        CAST(hour AS TINYINT) AS hour,
+        CAST(LQ_est AS DOUBLE) AS lq_est,
+        CAST(med_est AS DOUBLE) AS med_est,
+        CAST(UQ_est AS DOUBLE) AS uq_est,
+        CAST(n_obvs AS INTEGER) AS n_obvs
+    ''', 'route_name, hour'),
+    # Read by position, as the published header doesn't match the documented fields.
+    'segment_summary': ('segment_summary_2020.csv',
+        ['road_id', 'hour', 'n_obvs', 'speed_limit', 'uq', 'median', 'lq', 'road_distance', 'route_name'], '''
+        route_name,
+        CAST(road_id AS BIGINT) AS road_id,
+        CAST(hour AS TINYINT) AS hour,
+        CAST(n_obvs AS INTEGER) AS n_obvs,
+        CAST(speed_limit AS DOUBLE) AS speed_limit,
+        CAST(uq AS DOUBLE) AS uq,
+        CAST(median AS DOUBLE) AS median,
+        CAST(lq AS DOUBLE) AS lq,
+        CAST(road_distance AS DOUBLE) AS road_distance
+    ''', 'route_name, hour, road_id'),
+}
+
+# Columns each filter applies to, where the table has them.
+FILTERS = {'route': 'route_name', 'city': 'city', 'hour': 'hour'}
+
+
+def ingest(con: duckdb.DuckDBPyConnection, csv_dir: str = CONGESTION_DIR) -> list[str]:
+    """(Re)creates the congestion tables from ``csv_dir``. Missing CSVs are skipped.
+
+    Returns the names of the tables created.
+    """
+    created, signatures = [], []
+    for table, (filename, names, columns, order_by) in TABLES.items():
+        path = os.path.join(csv_dir, filename)
+        if not os.path.exists(path):
+            continue
+        names_option = f', names = {names}' if names else ''
+        con.execute(f'''
+            CREATE OR REPLACE TABLE {table} AS
+            SELECT {columns} FROM read_csv_auto(?, header = true, all_varchar = true{names_option})
+            ORDER BY {order_by}
+        ''', [path])
+        created.append(table)
+        signatures.append((filename, json.dumps(source_signature(path))))
+    con.execute(f'CREATE OR REPLACE TABLE {SOURCES_TABLE} (filename VARCHAR, signature VARCHAR)')
+    if signatures:
+        con.executemany(f'INSERT INTO {SOURCES_TABLE} VALUES (?, ?)', signatures)
+    return created
+
+
+def is_fresh(con: duckdb.DuckDBPyConnection, csv_dir: str = CONGESTION_DIR) -> bool:
+    """True if the tables were ingested from the CSVs now in ``csv_dir``, none added or removed."""
+    if SOURCES_TABLE not in {row[0] for row in con.execute('SHOW TABLES').fetchall()}:
+        return False
+    recorded = dict(con.execute(f'SELECT filename, signature FROM {SOURCES_TABLE}').fetchall())
+    present = {filename for filename, *_ in TABLES.values() if os.path.exists(os.path.join(csv_dir, filename))}
+    return set(recorded) == present and all(
+        matches(json.loads(signature), os.path.join(csv_dir, filename)) for filename, signature in recorded.items()
+    )
+
+
+def build(db_path: str = DB_PATH, csv_dir: str = CONGESTION_DIR) -> list[str]:
+    """Rebuilds the database file from scratch, so it always matches the installed DuckDB.
+
+    The tables are written to a file of this thread's own and moved over ``db_path`` once
+    complete, so processes and threads building at the same time never see or delete a half-built file.
+    """
+    tmp_path = f'{db_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    for path in (tmp_path, tmp_path + '.wal'):
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        with duckdb.connect(tmp_path) as con:
+            created = ingest(con, csv_dir)
+        # A log left by a crashed writer would otherwise be replayed into the new file.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(db_path + '.wal')
+        os.replace(tmp_path, db_path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+    return created
+
+
+def _open(db_path: str, csv_dir: str) -> duckdb.DuckDBPyConnection | None:
+    try:
+        con = duckdb.connect(db_path, read_only=True)
+    except duckdb.Error:
+        return None
+    if set(tables(con)) >= {'route_metrics', 'citywide_indices', 'route_times'} and is_fresh(con, csv_dir):
+        return con
+    con.close()
+    return None
+
+
+def connect(db_path: str = DB_PATH, csv_dir: str = CONGESTION_DIR) -> duckdb.DuckDBPyConnection:
+    """Opens the congestion database read-only.
+
+    The database isn't committed: if the file is missing, unreadable by this DuckDB
+    version, hasn't been ingested or was built from other CSVs than those in ``csv_dir``,
+    it's rebuilt from them. If it can't be written (a read-only checkout, for instance),
+    the CSVs are loaded into an in-memory database instead.
+    """
+    con = _open(db_path, csv_dir) if os.path.exists(db_path) else None
+    if con is None:
+        try:
+            build(db_path, csv_dir)
+            con = _open(db_path, csv_dir)
+        except (duckdb.Error, OSError):
+            con = None
+    if con is not None:
+        return con
+    con = duckdb.connect()
+    ingest(con, csv_dir)
+    return con
+
+
+@contextlib.contextmanager
+def cursor(con: duckdb.DuckDBPyConnection):
+    """A new cursor on ``con``, closed on exit, as the connection keeps every open cursor alive."""
+    cur = con.cursor()
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+
+def tables(con: duckdb.DuckDBPyConnection) -> list[str]:
+    with cursor(con) as cur:
+        return [row[0] for row in cur.execute('SHOW TABLES').fetchall() if row[0] in TABLES]
+
+
+def columns(con: duckdb.DuckDBPyConnection, table: str) -> list[str]:
+    with cursor(con) as cur:
+        return [row[0] for row in cur.execute(f'DESCRIBE {table}').fetchall()]
+
+
+def _where(con, table: str, filters: dict) -> tuple[str, list]:
+    if table not in TABLES:
+        raise ValueError(f"Unknown congestion table: {table}")
+    table_columns = columns(con, table)
+    clauses, params = [], []
+    for name, value in filters.items():
+        column = FILTERS[name]
+        if value is None or column not in table_columns:
+            continue
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        if not values:
+            continue
+        clauses.append(f'{column} IN ({", ".join("?" * len(values))})')
+        params += values
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def query(con: duckdb.DuckDBPyConnection, table: str, route=None, city=None, hour=None,
+          limit: int | None = PAGE_SIZE, offset: int = 0) -> pd.DataFrame:
+    """Returns one page of ``table``, filtered by route name(s), city(s) and hour(s).
+
+    Filters that don't apply to the table are ignored. ``limit=None`` returns every row.
+    Each call uses its own cursor so a shared connection is safe across sessions.
+    """
+    where, params = _where(con, table, {'route': route, 'city': city, 'hour': hour})
+    order_by = TABLES[table][3]
+    sql = f'SELECT * FROM {table}{where} ORDER BY {order_by}'
+    if limit is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        params += [limit, offset]
+    with cursor(con) as cur:
+        return cur.execute(sql, params).df()
+
+
+def count(con: duckdb.DuckDBPyConnection, table: str, route=None, city=None, hour=None) -> int:
+    where, params = _where(con, table, {'route': route, 'city': city, 'hour': hour})
+    with cursor(con) as cur:
+        return cur.execute(f'SELECT count(*) FROM {table}{where}', params).fetchone()[0]
+
+
+def distinct(con: duckdb.DuckDBPyConnection, table: str, column: str) -> list:
+    """Returns the sorted distinct values of a column, for filter widgets."""
+    if column not in columns(con, table):
+        return []
+    with cursor(con) as cur:
+        return [row[0] for row in cur.execute(f'SELECT DISTINCT {column} FROM {table} ORDER BY 1').fetchall()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the congestion CSVs into DuckDB.")
+    parser.add_argument("--db", type=str, default=DB_PATH, help="Database file to (re)create")
+    parser.add_argument("--csv-dir", type=str, default=CONGESTION_DIR, help="Directory of congestion CSVs")
+    args = parser.parse_args(argv)
+
+    with_counts = []
+    created = build(args.db, args.csv_dir)
+    with duckdb.connect(args.db, read_only=True) as con:
+        for table in created:
+            with_counts.append(f"{table}: {con.execute(f'SELECT count(*) FROM {table}').fetchone()[0]} rows")
+    print("\n".join(with_counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""GeoJSON loading and Web Mercator helpers shared by the tiling and indexing code."""
+
+import json
+
+import numpy as np
+import shapely
+
+EARTH_RADIUS = 6378137.0
+ORIGIN_SHIFT = np.pi * EARTH_RADIUS  # half the width of the Web Mercator plane, in metres
+MAX_LATITUDE = 85.0511287798
+
+# (min zoom, max zoom, simplify tolerance, minimum extent) in degrees of each level of
+# detail, coarsest first. Geometries with no side as long as the minimum extent are
+# dropped. The coarsest keeps the original single-level settings; the others are roughly
+# one screen pixel at the band's highest zoom (360 / 256 / 2**zoom).
+DETAIL_LEVELS = [
+    (0, 4, 1, 0.1),
+    (5, 7, 0.01, 0.01),
+    (8, 10, 0.001, 0.001),
+]
+
+
+def load_json(filename: str):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def load_features(filename: str) -> tuple[np.ndarray, list[dict]]:
+    """Returns an array of geometries and a matching list of property dicts.
+
+    Accepts a FeatureCollection, a GeometryCollection or a single geometry.
+    """
+    data = load_json(filename)
+    if data["type"] == "FeatureCollection":
+        features = [f for f in data["features"] if f.get("geometry")]
+        geometries = [f["geometry"] for f in features]
+        properties = [f.get("properties") or {} for f in features]
+    elif data["type"] == "GeometryCollection":
+        geometries = data["geometries"]
+        properties = [{} for _ in geometries]
+    else:
+        geometries = [data]
+        properties = [{}]
+    return shapely.from_geojson([json.dumps(g) for g in geometries]), properties
+
+
+def lnglat_to_mercator(coords: np.ndarray) -> np.ndarray:
+    """Projects an (n, 2) array of lng/lat degrees to Web Mercator metres."""
+    lng = coords[:, 0]
+    lat = np.clip(coords[:, 1], -MAX_LATITUDE, MAX_LATITUDE)
+    x = np.radians(lng) * EARTH_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * EARTH_RADIUS
+    return np.column_stack([x, y])
+
+
+def to_mercator(geoms: np.ndarray) -> np.ndarray:
+    return shapely.transform(geoms, lnglat_to_mercator)
+
+
+def tile_size(zoom: int) -> float:
+    """Width of a tile at ``zoom`` in Web Mercator metres."""
+    return 2 * ORIGIN_SHIFT / 2 ** zoom
+
+
+def tile_bounds(zoom: int, x, y, buffer: float = 0.0):
+    """Returns (minx, miny, maxx, maxy) in Web Mercator metres for XYZ tiles.
+
+    ``buffer`` is a fraction of the tile width added on every side. ``x`` and ``y`` may be arrays.
+    """
+    size = tile_size(zoom)
+    minx = -ORIGIN_SHIFT + np.asarray(x) * size
+    maxy = ORIGIN_SHIFT - np.asarray(y) * size
+    pad = size * buffer
+    return minx - pad, maxy - size - pad, minx + size + pad, maxy + pad
+
+
+def tiles_covering(zoom: int, bounds: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the inclusive XYZ tile ranges (x0, y0, x1, y1) covering Web Mercator ``bounds`` (n, 4)."""
+    size = tile_size(zoom)
+    last = 2 ** zoom - 1
+    x0 = np.clip(np.floor((bounds[:, 0] + ORIGIN_SHIFT) / size), 0, last).astype(np.int64)
+    x1 = np.clip(np.floor((bounds[:, 2] + ORIGIN_SHIFT) / size), 0, last).astype(np.int64)
+    y0 = np.clip(np.floor((ORIGIN_SHIFT - bounds[:, 3]) / size), 0, last).astype(np.int64)
+    y1 = np.clip(np.floor((ORIGIN_SHIFT - bounds[:, 1]) / size), 0, last).astype(np.int64)
+    return x0, y0, x1, y1
@@ -0,0 +1,224 @@
+"""Freight-GPT question answering with a persistent answer cache.
+
+Answers are looked up in three steps, cheapest first:
+
+1. ``AnswerCache``: a SQLite file keyed on the normalised prompt plus a fingerprint of
+   the dataframes, with least-recently-used and time-to-live eviction.
+2. ``answer_directly``: common question shapes about a named route (e.g. the max median
+   travel time) are answered from the route metrics table without calling the LLM.
+3. The pandasai ``SmartDatalake``, built once on first use. It's shared by every session,
+   so questions are asked one at a time with its conversation memory cleared, and failed
+   answers aren't cached.
+
+Any object accepted by pandasai as an LLM can be passed in, so a local stand-in such as
+``pandasai.llm.fake.FakeLLM`` can replace OpenAI in tests and load runs.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+from pandasai import SmartDatalake
+
+# Congestion tables the datalake is given, in full. They're a few thousand rows between
+# them (route_times is shared with the hourly profiles); the per-segment summary is far
+# larger and stays in DuckDB, read a page at a time.
+DATALAKE_TABLES = ('route_metrics', 'citywide_indices', 'route_times')
+CACHE_PATH = 'data/freight_gpt_cache.sqlite'
+CACHE_MAX_ENTRIES = 1000
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+# (pattern, route_metrics column, whether the column is a duration in seconds, description)
+DIRECT_QUESTIONS = [
+    (r'\b(max|maximum|highest|longest|worst) median travel time', 'max_median_travel_time', True, 'max median travel time'),
+    (r'\b(min|minimum|lowest|shortest|best) median travel time', 'min_median_travel_time', True, 'min median travel time'),
+    (r'\b(max|maximum|highest|widest) iq travel time', 'max_iq_travel_time', True, 'max interquartile travel time'),
+    (r'\b(min|minimum|lowest|narrowest) iq travel time', 'min_iq_travel_time', True, 'min interquartile travel time'),
+    (r'\bpeak time to best ratio', 'peak_time_to_best_ratio', False, 'peak time to best ratio'),
+]
+# Words a direct question may have besides the route name and the question itself. Any
+# other word (e.g. 'at 8am', 'in winter') qualifies the question, so it goes to the LLM.
+DIRECT_FILLER = {
+    'what', "what's", 'whats', 'is', 'was', 'are', 'the', 'a', 'for', 'of', 'on', 'along', 'route',
+    'tell', 'me', 'give', 'show', 'find', 'please', 'can', 'you',
+}
+# Hour column reported alongside a duration, where there is one.
+DIRECT_HOURS = {
+    'max_median_travel_time': 'max_median_travel_hour',
+    'min_median_travel_time': 'min_median_travel_hour',
+    'max_iq_travel_time': 'max_iq_travel_hour',
+    'min_iq_travel_time': 'min_iq_travel_hour',
+}
+
+
+def normalise_prompt(prompt: str) -> str:
+    """Lower-cases, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r'\s+', ' ', prompt).strip().rstrip('?.! ').lower()
+
+
+def frames_fingerprint(dfs: list[pd.DataFrame]) -> str:
+    """Hashes the columns and contents of every dataframe, so cached answers expire with the data."""
+    h = hashlib.sha1()
+    for df in dfs:
+        h.update(repr(list(df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def format_duration(seconds) -> str:
+    seconds = int(round(seconds))
+    return f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+
+
+def find_route(prompt: str, route_names) -> str | None:
+    """Returns the longest route name mentioned in the prompt, if exactly one matches best."""
+    prompt = normalise_prompt(prompt)
+    matches = [r for r in route_names if r.lower() in prompt]
+    if not matches:
+        return None
+    longest = max(len(r) for r in matches)
+    best = [r for r in matches if len(r) == longest]
+    return best[0] if len(best) == 1 else None
+
+
+def answer_directly(prompt: str, route_metrics: pd.DataFrame) -> str | None:
+    """Answers known question shapes about a single route, or returns None.
+
+    Only prompts made up of the question, the route name and ``DIRECT_FILLER`` are
+    answered, so the overall value isn't given for a narrower question.
+    """
+    normalised = normalise_prompt(prompt)
+    for pattern, column, is_duration, description in DIRECT_QUESTIONS:
+        if not re.search(pattern, normalised):
+            continue
+        route = find_route(normalised, route_metrics['route_name'])
+        if route is None:
+            return None
+        rest = re.sub(pattern, ' ', normalised.replace(route.lower(), ' '))
+        if set(re.findall(r"[\w']+", rest)) - DIRECT_FILLER:
+            return None
+        row = route_metrics.loc[route_metrics['route_name'] == route].iloc[0]
+        if not is_duration:
+            return f'The {description} for {route} is {row[column]:g}.'
+        answer = f'The {description} for {route} is {format_duration(row[column])}'
+        hour_column = DIRECT_HOURS.get(column)
+        if hour_column is not None:
+            answer += f', at {int(row[hour_column]):02d}:00'
+        return answer + '.'
+    return None
+
+
+class AnswerCache:
+    """Persistent prompt -> answer cache with LRU and TTL eviction, safe to share across threads."""
+
+    def __init__(self, path: str | None = None, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        # FREIGHT_GPT_CACHE redirects the default file, e.g. to ':memory:' for load tests.
+        path = path or os.environ.get('FREIGHT_GPT_CACHE', CACHE_PATH)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.execute('''
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self._con.commit()
+
+    @staticmethod
+    def key(prompt: str, fingerprint: str) -> str:
+        return hashlib.sha1(f'{fingerprint}\n{normalise_prompt(prompt)}'.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._con.execute('SELECT answer, created FROM answers WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._con.execute('DELETE FROM answers WHERE key = ?', (key,))
+                self._con.commit()
+                return None
+            self._con.execute('UPDATE answers SET last_used = ? WHERE key = ?', (now, key))
+            self._con.commit()
+            return row[0]
+
+    def put(self, key: str, answer: str):
+        now = time.time()
+        with self._lock:
+            self._con.execute('INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)', (key, answer, now, now))
+            self._con.execute('DELETE FROM answers WHERE created < ?', (now - self.ttl,))
+            self._con.execute('''
+                DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            self._con.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._con.execute('SELECT count(*) FROM answers').fetchone()[0]
+
+
+class FreightGPT:
+    """Answers prompts about the congestion tables, using the LLM only when it has to.
+
+    ``frames`` maps table name to dataframe; ``route_metrics`` enables the direct answers.
+    """
+
+    def __init__(self, frames: dict[str, pd.DataFrame], llm, cache: AnswerCache | None = None):
+        self.frames = frames
+        self.llm = llm
+        self.cache = cache if cache is not None else AnswerCache()
+        self.fingerprint = frames_fingerprint(list(frames.values()))
+        self._datalake = None
+        self._datalake_lock = threading.Lock()
+        self._chat_lock = threading.Lock()
+
+    @property
+    def datalake(self) -> SmartDatalake:
+        with self._datalake_lock:
+            if self._datalake is None:
+                self._datalake = SmartDatalake(list(self.frames.values()), config={"llm": self.llm, "enable_cache": False})
+            return self._datalake
+
+    def chat(self, prompt: str) -> tuple[str, bool]:
+        """Asks the LLM. Returns (answer, whether it failed).
+
+        pandasai returns an apology rather than raising when a question fails, and keeps
+        the conversation and last error on the datalake, so one prompt runs at a time and
+        each starts from an empty conversation.
+        """
+        datalake = self.datalake
+        with self._chat_lock:
+            datalake.clear_memory()
+            datalake.last_error = None
+            answer = str(datalake.chat(prompt))
+            return answer, datalake.last_error is not None
+
+    def ask(self, prompt: str) -> tuple[str, str]:
+        """Returns (answer, source), where source is 'cache', 'data', 'llm' or 'error'."""
+        key = AnswerCache.key(prompt, self.fingerprint)
+        answer = self.cache.get(key)
+        if answer is not None:
+            return answer, 'cache'
+
+        answer, source = None, 'data'
+        if 'route_metrics' in self.frames:
+            answer = answer_directly(prompt, self.frames['route_metrics'])
+        if answer is None:
+            answer, failed = self.chat(prompt)
+            if failed:
+                return answer, 'error'
+            source = 'llm'
+        self.cache.put(key, answer)
+        return answer, source
@@ -0,0 +1,212 @@
+"""A small graph of memoized computations.
+
+Each node is a function whose arguments are named inputs or other nodes. ``compute``
+evaluates only the nodes it's asked for and their dependencies, and a node reruns only if
+the values it depends on changed:
+
+    graph = Graph()
+
+    @graph.node
+    def h2_mult(generation):
+        ...
+
+    @graph.node
+    def gco2(adoption, h2_mult):
+        ...
+
+    graph.compute(['gco2'], adoption=(10, 0, 0, 0), generation=(23, 76, 2, 0))
+
+Inputs and small node outputs (numbers, strings, short arrays and tuples or dicts of
+them) are compared by value, so an upstream change that doesn't change a node's output
+stops there. Larger outputs are identified by the inputs they were computed from. Any
+other input (e.g. a cached spatial index or a large table) must be passed as
+``Keyed(key, value)``, where ``key`` is a plain value that changes whenever ``value``
+does, such as a ``fingerprint`` of it; nodes receive ``value``. Results are kept in a
+per-node LRU shared by every caller in the process, and each recomputation is counted in
+the current ``freight.instrument`` rerun as ``graph:<node>``.
+"""
+
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from freight import instrument
+
+DEFAULT_MAXSIZE = 128
+# Outputs with more elements than this are identified by their inputs rather than their value.
+MAX_VALUE_KEY = 64
+
+
+class _Unkeyable(Exception):
+    pass
+
+
+def value_key(value, limit: int = MAX_VALUE_KEY):
+    """A hashable key equal for equal values. Raises _Unkeyable if ``value`` isn't small and plain."""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        if value.dtype == object or value.size > limit:
+            raise _Unkeyable
+        return ('ndarray', value.shape, value.dtype.str, value.tobytes())
+    if isinstance(value, (tuple, list)):
+        if len(value) > limit:
+            raise _Unkeyable
+        return (type(value).__name__,) + tuple(value_key(v, limit) for v in value)
+    if isinstance(value, dict):
+        if len(value) > limit:
+            raise _Unkeyable
+        return ('dict',) + tuple(sorted((value_key(k, limit), value_key(v, limit)) for k, v in value.items()))
+    raise _Unkeyable
+
+
+class Keyed(NamedTuple):
+    """An input that's compared by ``key`` rather than by value."""
+    key: Any
+    value: Any
+
+
+def fingerprint(value) -> str:
+    """A content hash of arrays, frames, strings and numbers, or tuples, lists and dicts of them."""
+    h = hashlib.sha1()
+
+    def update(v):
+        if isinstance(v, pd.DataFrame):
+            h.update(repr(list(v.columns)).encode())
+            h.update(pd.util.hash_pandas_object(v, index=True).values.tobytes())
+        elif isinstance(v, np.ndarray) and v.dtype != object:
+            h.update(f'{v.dtype.str}{v.shape}'.encode())
+            h.update(np.ascontiguousarray(v).tobytes())
+        elif isinstance(v, (tuple, list, np.ndarray)):
+            h.update(f'{type(v).__name__}{len(v)}'.encode())
+            for item in v:
+                update(item)
+        elif isinstance(v, dict):
+            h.update(f'dict{len(v)}'.encode())
+            for k in sorted(v, key=repr):
+                update(k)
+                update(v[k])
+        elif v is None or isinstance(v, (bool, int, float, str, bytes, np.generic)):
+            h.update(repr(v).encode())
+        else:
+            raise TypeError(f"Can't fingerprint {type(v).__name__}")
+
+    update(value)
+    return h.hexdigest()
+
+
+def input_key(name: str, value):
+    """(value passed to nodes, key) of an input."""
+    if isinstance(value, Keyed):
+        return value.value, ('keyed', value_key(value.key))
+    try:
+        return value, value_key(value)
+    except _Unkeyable:
+        raise TypeError(
+            f"Input '{name}' ({type(value).__name__}) isn't a small plain value; pass it as Keyed(key, value)"
+        ) from None
+
+
+class Node:
+
+    def __init__(self, name: str, fn, deps: tuple[str, ...], maxsize: int = DEFAULT_MAXSIZE):
+        self.name = name
+        self.fn = fn
+        self.deps = deps
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # dependency keys -> (value, output key)
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        with self._lock:
+            found = self._cache.get(key)
+            if found is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return found
+
+    def store(self, key, entry):
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class Graph:
+
+    def __init__(self):
+        self.nodes: dict[str, Node] = {}
+
+    def add(self, name: str, fn, deps=None, maxsize: int = DEFAULT_MAXSIZE) -> Node:
+        """Adds a node. ``deps`` defaults to the names of ``fn``'s parameters, in order."""
+        if deps is None:
+            deps = tuple(inspect.signature(fn).parameters)
+        self.nodes[name] = Node(name, fn, tuple(deps), maxsize)
+        return self.nodes[name]
+
+    def node(self, fn=None, *, name: str | None = None, maxsize: int = DEFAULT_MAXSIZE):
+        """Decorator form of ``add``; the node is named after the function by default."""
+        def register(fn):
+            self.add(name or fn.__name__, fn, maxsize=maxsize)
+            return fn
+        return register if fn is None else register(fn)
+
+    def _resolve(self, name: str, inputs: dict, resolved: dict):
+        """Returns (value, key) of ``name``, recomputing it only if its dependencies changed."""
+        if name in resolved:
+            return resolved[name]
+        if name in inputs:
+            resolved[name] = input_key(name, inputs[name])
+            return resolved[name]
+        if name not in self.nodes:
+            raise KeyError(f"'{name}' is neither a node nor one of the inputs")
+
+        node = self.nodes[name]
+        deps = [self._resolve(dep, inputs, resolved) for dep in node.deps]
+        key = tuple(k for _, k in deps)
+        entry = node.lookup(key)
+        if entry is None:
+            value = node.fn(*(v for v, _ in deps))
+            try:
+                output_key = ('value', value_key(value))
+            except _Unkeyable:
+                output_key = ('node', name, key)
+            entry = value, output_key
+            node.store(key, entry)
+            instrument.count(f'graph:{name}')
+        resolved[name] = entry
+        return entry
+
+    def compute(self, outputs, **inputs) -> dict:
+        """Returns {name: value} for each of ``outputs``, given the named inputs."""
+        resolved = {}
+        return {name: self._resolve(name, inputs, resolved)[0] for name in outputs}
+
+    def value(self, name: str, **inputs):
+        return self.compute([name], **inputs)[name]
+
+    def stats(self) -> dict:
+        """{node: {'hits': n, 'misses': n, 'cached': n}} since the process started."""
+        return {
+            name: {'hits': node.hits, 'misses': node.misses, 'cached': len(node._cache)}
+            for name, node in self.nodes.items()
+        }
+
+    def clear(self):
+        for node in self.nodes.values():
+            node.clear()
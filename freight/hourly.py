@@ -0,0 +1,168 @@
+"""Local roads coloured by congestion at each hour of the day, animated in the browser.
+
+``color_table`` packs every route's colour for all 24 hours into one (routes x 24 x 4)
+RGBA array, from its travel time at that hour relative to its best hour. ``map_html`` ships
+that table once, with the road geometry (or its vector tile URL), to a standalone deck.gl
+map whose hour slider and play button only swap the layer's colour attribute in the
+browser: changing the hour reruns neither the script nor resends the geometry.
+"""
+
+import base64
+import json
+from string import Template
+
+import numpy as np
+from pydeck.frontend_semver import DECKGL_SEMVER
+
+from freight.profiles import HOURS, HourlyProfiles
+from freight.scenario import score_color
+
+# Travel time relative to the best hour that is coloured fully red (about the 99th percentile).
+RATIO_LIMIT = 1.5
+MISSING_COLOR = (128, 128, 128, 80)
+BASEMAP_URL = 'https://basemaps.cartocdn.com/dark_all/{z}/{x}/{y}.png'
+DECKGL_URL = f'https://cdn.jsdelivr.net/npm/deck.gl@{DECKGL_SEMVER}/dist.min.js'
+
+
+def color_table(ratios: np.ndarray, limit: float = RATIO_LIMIT) -> np.ndarray:
+    """(n_routes, 24, 4) uint8 RGBA from (n_routes, 24) travel times relative to the best hour.
+
+    Green at the best hour to red at ``limit`` times it, on the dashboard's score colours.
+    """
+    score = 1 - np.clip((ratios - 1) / (limit - 1), 0, 1)
+    table = np.empty(ratios.shape + (4,), dtype=np.uint8)
+    table[..., :3] = score_color(np.nan_to_num(score))
+    table[..., 3] = 255
+    table[np.isnan(ratios)] = MISSING_COLOR
+    return table
+
+
+def congestion_colors(profiles: HourlyProfiles, stat: str = 'med') -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Route names, their (n_routes, 24) relative travel times and the matching colour table."""
+    ratios = profiles.relative_to_best(stat=stat)
+    return list(profiles.routes), ratios, color_table(ratios)
+
+
+_TEMPLATE = Template('''<!DOCTYPE html>
+<html>
+<head>
+<script src="$deckgl_url"></script>
+<style>
+  body { margin: 0; font-family: sans-serif; color: #fafafa; background: #0e1117; }
+  #map { position: relative; width: 100%; height: ${map_height}px; }
+  #controls { display: flex; align-items: center; gap: 12px; padding: 8px 4px; }
+  #controls input { flex: 1; }
+  #controls button { width: 3em; }
+</style>
+</head>
+<body>
+<div id="map"></div>
+<div id="controls">
+  <button id="play">&#9654;</button>
+  <input id="hour" type="range" min="0" max="23" step="1" value="$hour">
+  <span id="label"></span>
+</div>
+<script>
+const DATA = $data;
+const MAX_ZOOM = $max_zoom;
+const ROUTES = $routes;
+const RATIOS = $ratios;
+const COLORS = Uint8Array.from(atob("$colors"), function (c) { return c.charCodeAt(0); });
+const MISSING = $missing;
+const HOURS = $hours;
+let hour = $hour;
+let timer = null;
+
+function color(feature) {
+  const row = ROUTES[feature.properties.route_name];
+  if (row === undefined) return MISSING;
+  const i = (row * HOURS + hour) * 4;
+  return COLORS.subarray(i, i + 4);
+}
+
+function tooltip(info) {
+  const route = info.object && info.object.properties.route_name;
+  if (route === undefined || ROUTES[route] === undefined) return null;
+  const ratio = RATIOS[ROUTES[route]][hour];
+  return route + "\\n" + hour + ":00, " + (ratio === null ? "no estimate" : ratio.toFixed(2) + "x the best hour");
+}
+
+const basemap = new deck.TileLayer({
+  id: "basemap",
+  data: "$basemap_url",
+  maxZoom: 19,
+  renderSubLayers: function (props) {
+    const b = props.tile.bbox;
+    return new deck.BitmapLayer(props, {data: null, image: props.data, bounds: [b.west, b.south, b.east, b.north]});
+  },
+});
+
+function roads() {
+  // Only the colour attribute is recomputed when the hour changes; the geometry stays on the GPU.
+  const props = {
+    id: "geometries_2020",
+    getLineColor: color,
+    updateTriggers: {getLineColor: hour},
+    lineWidthMinPixels: 2,
+    pickable: true,
+    autoHighlight: true,
+  };
+  if (typeof DATA === "string") return new deck.MVTLayer(Object.assign(props, {data: DATA, maxZoom: MAX_ZOOM}));
+  return new deck.GeoJsonLayer(Object.assign(props, {data: DATA}));
+}
+
+const map = new deck.DeckGL({
+  container: "map",
+  initialViewState: $view,
+  controller: true,
+  getTooltip: tooltip,
+  layers: [basemap, roads()],
+});
+
+function setHour(value) {
+  hour = value;
+  document.getElementById("hour").value = hour;
+  document.getElementById("label").textContent = String(hour).padStart(2, "0") + ":00";
+  map.setProps({layers: [basemap, roads()]});
+}
+
+document.getElementById("hour").addEventListener("input", function (e) { setHour(Number(e.target.value)); });
+document.getElementById("play").addEventListener("click", function (e) {
+  if (timer === null) {
+    timer = setInterval(function () { setHour((hour + 1) % HOURS); }, $interval_ms);
+    e.target.innerHTML = "&#10073;&#10073;";
+  } else {
+    clearInterval(timer);
+    timer = null;
+    e.target.innerHTML = "&#9654;";
+  }
+});
+setHour(hour);
+</script>
+</body>
+</html>
+''')
+
+
+def map_html(data: str, view: dict, routes: list[str], ratios: np.ndarray, colors: np.ndarray,
+             max_zoom: int | None = None, hour: int = 8, map_height: int = 450, interval_ms: int = 700) -> str:
+    """A standalone page of the hourly map.
+
+    ``data`` is the layer's data as JSON: a vector tile URL template, or a FeatureCollection
+    whose features carry a ``route_name`` property.
+    """
+    return _TEMPLATE.substitute(
+        deckgl_url=DECKGL_URL,
+        basemap_url=BASEMAP_URL,
+        data=data,
+        max_zoom=json.dumps(max_zoom),
+        routes=json.dumps({route: i for i, route in enumerate(routes)}),
+        ratios=json.dumps(np.where(np.isnan(ratios), None, ratios.round(2)).tolist()),
+        colors=base64.b64encode(np.ascontiguousarray(colors, dtype=np.uint8).tobytes()).decode(),
+        missing=json.dumps(list(MISSING_COLOR)),
+        hours=HOURS,
+        hour=int(hour),
+        view=json.dumps({key: view[key] for key in ('latitude', 'longitude', 'zoom', 'pitch', 'bearing') if key in view}),
+        map_height=map_height,
+        interval_ms=interval_ms,
+    )
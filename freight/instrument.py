@@ -0,0 +1,189 @@
+"""Lightweight timing and counters for dashboard reruns.
+
+A rerun starts with ``start()`` and ends with ``finish()``. In between, ``section`` times
+named blocks, ``tracked_cache`` counts calls and misses of cached loaders, and
+``record_payload`` stores the serialised size of each map layer. ``finish`` returns the
+rerun as a dict and, if ``FREIGHT_PERF_LOG`` is set to a file path (or ``-`` for stderr),
+appends it to that log as one JSON line. Aggregate a log with:
+
+    python -m freight.instrument perf.jsonl
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+LOG_ENV = 'FREIGHT_PERF_LOG'
+
+_current = contextvars.ContextVar('freight_rerun', default=None)
+_logger = logging.getLogger('freight.perf')
+_logger_lock = threading.Lock()
+
+
+class Rerun:
+    """Measurements for one script run. ``detailed`` enables the costlier payload sizing."""
+
+    def __init__(self, name: str, detailed: bool = False):
+        self.name = name
+        self.detailed = detailed
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.sections = defaultdict(float)
+        self.cache = defaultdict(lambda: {'calls': 0, 'misses': 0})
+        self.layer_bytes = {}
+        self.counters = defaultdict(int)
+
+    def to_dict(self) -> dict:
+        return {
+            'ts': self.started,
+            'name': self.name,
+            'pid': os.getpid(),
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'sections': {k: round(v, 3) for k, v in self.sections.items()},
+            'cache': {k: {**v, 'hits': v['calls'] - v['misses']} for k, v in self.cache.items()},
+            'layer_bytes': dict(self.layer_bytes),
+            'counters': dict(self.counters),
+        }
+
+
+def start(name: str = 'Dashboard', detailed: bool = False) -> Rerun:
+    rerun = Rerun(name, detailed=detailed or bool(os.environ.get(LOG_ENV)))
+    _current.set(rerun)
+    return rerun
+
+
+def current() -> Rerun | None:
+    return _current.get()
+
+
+@contextmanager
+def section(name: str):
+    """Adds the wall time of the block to ``name`` in the current rerun."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun = current()
+        if rerun is not None:
+            rerun.sections[name] += (time.perf_counter() - start_time) * 1000
+
+
+def count(name: str, n: int = 1):
+    rerun = current()
+    if rerun is not None:
+        rerun.counters[name] += n
+
+
+def tracked_cache(cache_decorator):
+    """Wraps a caching decorator (e.g. ``st.cache_data``) to count calls and cache misses.
+
+    The function body only runs on a miss, so misses are counted inside the cache and
+    calls outside it. Time spent in the call, hit or miss, is added to ``load:<name>``.
+    """
+    def decorate(fn):
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def on_miss(*args, **kwargs):
+            rerun = current()
+            if rerun is not None:
+                rerun.cache[name]['misses'] += 1
+            return fn(*args, **kwargs)
+
+        cached = cache_decorator(on_miss)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            rerun = current()
+            if rerun is not None:
+                rerun.cache[name]['calls'] += 1
+            with section(f'load:{name}'):
+                return cached(*args, **kwargs)
+
+        call.clear = getattr(cached, 'clear', None)
+        return call
+    return decorate
+
+
+def payload_bytes(data) -> int:
+    """Size of ``data`` serialised as JSON, the way pydeck sends it to the browser.
+
+    Strings are taken to be JSON already.
+    """
+    if isinstance(data, str):
+        return len(data.encode())
+    if isinstance(data, pd.DataFrame):
+        data = data.to_dict('records')
+    return len(json.dumps(data, default=str))
+
+
+def record_payload(name: str, data):
+    """Records the payload size of a map layer's data. Skipped unless the rerun is detailed."""
+    rerun = current()
+    if rerun is not None and rerun.detailed:
+        rerun.layer_bytes[name] = payload_bytes(data)
+
+
+def _log_handler() -> logging.Handler | None:
+    target = os.environ.get(LOG_ENV)
+    if not target:
+        return None
+    with _logger_lock:
+        if not _logger.handlers:
+            handler = logging.StreamHandler(sys.stderr) if target == '-' else logging.FileHandler(target)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False
+    return _logger.handlers[0]
+
+
+def finish(rerun: Rerun | None = None) -> dict:
+    """Ends the rerun, logs it as a JSON line if configured, and returns it as a dict."""
+    rerun = rerun or current()
+    record = rerun.to_dict()
+    if _log_handler() is not None:
+        _logger.info(json.dumps(record))
+    _current.set(None)
+    return record
+
+
+def summarize(records) -> pd.DataFrame:
+    """p50/p95/max wall time per section (and in total) over a sequence of rerun records."""
+    times = defaultdict(list)
+    for record in records:
+        times['total'].append(record['total_ms'])
+        for name, ms in record['sections'].items():
+            times[name].append(ms)
+    rows = [
+        {'section': name, 'count': len(v), 'p50_ms': np.percentile(v, 50), 'p95_ms': np.percentile(v, 95), 'max_ms': max(v)}
+        for name, v in times.items()
+    ]
+    return pd.DataFrame(rows).sort_values('p95_ms', ascending=False, ignore_index=True)
+
+
+def read_log(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a FREIGHT_PERF_LOG file.")
+    parser.add_argument("filename", type=str, help="JSON lines written by freight.instrument")
+    args = parser.parse_args(argv)
+    print(summarize(read_log(args.filename)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Every map layer the dashboard offers: its dataset, how it's drawn and what colours it.
+
+``LAYERS`` is the one place a dataset is added to the map, in drawing order. Nothing is
+read until its layer is selected: line layers are served as vector tiles once
+``freight.tiles`` has built them; otherwise line and point layers are read by
+``spatial.SpatialIndex`` on first use. The index keeps a size-bounded cache of them and
+sends each render at the finest level of detail that fits the layer's payload budget.
+
+The budget and coarser levels only apply to layers sent as GeoJSON: points, and lines
+whose tiles haven't been built. Tiled lines are simplified per zoom by the tile builder
+instead, and the airport arcs are a small table drawn in full.
+"""
+
+from typing import NamedTuple
+
+# Bytes of GeoJSON a layer may send per render before it falls back to a coarser level of detail.
+PAYLOAD_BUDGET = 512 * 1024
+
+
+class LayerSpec(NamedTuple):
+    label: str  # option in the layer picker
+    # GeoJSON file of a line or point layer; None for the arcs, which freight.airports builds.
+    source: str | None
+    # 'lines' and 'points' are GeoJSON read through SpatialIndex (lines also as tiles),
+    # 'arcs' the airport arc table from freight.airports.
+    kind: str
+    # Network whose score colours the layer, 'nltn' for the NLTN's mix of urban and
+    # interstate scores, or None for a fixed ``color``.
+    network: str | None = None
+    color: tuple = (200, 200, 200)
+    default: bool = False
+    budget: int = PAYLOAD_BUDGET  # only used when the layer is sent as GeoJSON
+    # Deepest zoom freight.tiles builds for a line layer. The national layers are already
+    # simplified to about a kilometre, so zooming past 7 only adds tiles.
+    max_zoom: int = 10
+
+
+LAYERS = {
+    'geometries_2020': LayerSpec('Roads (Local)', 'data/simplified/geometries_2020.geojson', 'lines', 'road_urban', default=True),
+    'airport_arcs': LayerSpec('Air', None, 'arcs', 'air', default=True),
+    'key_rail_freight_route': LayerSpec('Rail', 'data/simplified/key_rail_freight_route_simplified.geojson', 'lines', 'rail', default=True, max_zoom=7),
+    'key_road_freight_route': LayerSpec(
+        'Roads (Interstate)', 'data/simplified/key_road_freight_route_simplified.geojson', 'lines', 'road_interstate', default=True, max_zoom=7,
+    ),
+    'nltn_road': LayerSpec('Roads (NLTN)', 'data/simplified/nltn_road_simplified.geojson', 'lines', 'nltn', max_zoom=7),
+    'secondary_freight': LayerSpec('Roads (Secondary)', 'data/raw/secondary_freight.geojson', 'lines', 'road_interstate'),
+    'rail_map': LayerSpec('Rail (All lines)', 'data/simplified/rail_map_simplified.geojson', 'lines', 'rail', max_zoom=7),
+    'road_train_assembly': LayerSpec('Road train assembly', 'data/raw/road_train_ass.geojson', 'points', 'road_interstate'),
+    'intermodal_terminals': LayerSpec('Intermodal terminals', 'data/raw/intermodal_terminals.geojson', 'points', color=(190, 120, 255)),
+    'seaports': LayerSpec('Seaports', 'data/raw/seaports.geojson', 'points', color=(0, 160, 255)),
+    'airports': LayerSpec('Airports', 'data/raw/airports.geojson', 'points', 'air'),
+}
+
+
+def labels() -> list[str]:
+    return [spec.label for spec in LAYERS.values()]
+
+
+def default_labels() -> list[str]:
+    return [spec.label for spec in LAYERS.values() if spec.default]
+
+
+def geojson_sources() -> dict[str, str]:
+    """Layer name -> GeoJSON source of the layers read through SpatialIndex."""
+    return {name: spec.source for name, spec in LAYERS.items() if spec.kind in ('lines', 'points')}
+
+
+def tilesets() -> list[str]:
+    """Layers that are drawn from vector tiles when freight.tiles has built them."""
+    return [name for name, spec in LAYERS.items() if spec.kind == 'lines']
@@ -0,0 +1,226 @@
+"""Load test of concurrent dashboard sessions, with a local stand-in LLM.
+
+Each simulated session is a headless ``AppTest`` of ``Dashboard.py`` with its own session
+state, run on its own thread of this process, as Streamlit runs concurrent sessions, so
+they share the ``st.cache_resource`` objects and the model graph. Sessions start together
+and replay a random mix of typical interactions: scaling and adoption sliders, map layers,
+region, the hourly congestion map and Freight-GPT prompts (answered from the data, the
+answer cache or ``FakeLLM`` in place of OpenAI, with the answer cache in memory).
+
+A warm-up round of sessions runs first; the report has rerun latency percentiles per
+interaction in the second round, and the resident memory each of its sessions adds. Run
+from the repository root:
+
+    python -m freight.loadtest --sessions 8 --interactions 20 -o load.json
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from freight.bench import ROOT, fake_openai, peak_rss_mb, widget
+
+PERCENTILES = (50, 95, 99)
+
+# Prompts answered from route_metrics, and ones only the LLM answers (the first time).
+DIRECT_PROMPTS = [
+    "What is the max median travel time on 32 - Derrimut to Montrose?",
+    "What is the min median travel time for 55 - Hume Freeway to Montague St?",
+]
+LLM_PROMPTS = [
+    "Which route has the most observations?",
+    "Which city has the highest mean excess travel time?",
+]
+
+# Interaction name -> (widget type, label, values to pick from), weighted as they're used.
+INTERACTIONS = {
+    'gco2_slider': ('slider', 'GCO2 Scaling Factor', [0.5, 0.8, 1.2, 1.5]),
+    'tonne_km_slider': ('slider', 'Tonne KM/H Scaling Factor', [0.5, 0.8, 1.2, 1.5]),
+    'adoption_slider': ('slider', '✈️ Air', [0, 25, 50, 100]),
+    'generation_slider': ('slider', 'Electrolysis', [2, 40, 80]),
+    'layers_multiselect': ('multiselect', 'What layers would you like to show', [
+        ['Air', 'Rail'], ['Air', 'Roads (Local)', 'Rail', 'Roads (Interstate)'], ['Roads (NLTN)', 'Rail'],
+        ['Rail (All lines)', 'Seaports', 'Intermodal terminals'],
+    ]),
+    'region_selectbox': ('selectbox', 'Region', ['Victoria', 'New South Wales', 'Australia']),
+    'hourly_toggle': ('toggle', 'Animate local road congestion by hour', [True, False]),
+    'prompt': ('text_input', 'Prompt:', DIRECT_PROMPTS + LLM_PROMPTS),
+}
+WEIGHTS = {
+    'gco2_slider': 3, 'tonne_km_slider': 3, 'adoption_slider': 3, 'generation_slider': 2,
+    'layers_multiselect': 2, 'region_selectbox': 2, 'hourly_toggle': 1, 'prompt': 2,
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size, or the peak where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except OSError:
+        return peak_rss_mb()
+
+
+def prepare_process():
+    """Process-wide setup that AppTest otherwise swaps in and out around every run.
+
+    AppTest patches the config, ``st.secrets`` and the ``Runtime`` singleton for the
+    duration of each run and resets them afterwards, which breaks runs that overlap.
+    Setting them once, and keeping the last runtime once a run clears it, keeps concurrent
+    sessions consistent, as they are in a real server.
+    """
+    import pandasai.llm
+    import streamlit as st
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    # Dashboard.py does `from pandasai.llm import OpenAI`; keep the run offline and the real answer cache untouched.
+    pandasai.llm.OpenAI = fake_openai
+    os.environ['FREIGHT_GPT_CACHE'] = ':memory:'
+
+    config.set_option('global.appTest', True)
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+    # One compiled script for every session, as the server keeps (compiling per run isn't thread-safe).
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    runtime = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            runtime[:] = [cls._instance]
+        if not runtime:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(runtime))
+
+    secrets = Secrets()
+    secrets._secrets = {'OPEN_AI_API_KEY': 'sk-loadtest'}
+    st.secrets = secrets
+
+
+def new_session():
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(os.path.join(ROOT, 'Dashboard.py'), default_timeout=300)
+
+
+def run(at) -> float:
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f'Dashboard.py raised: {at.exception[0].message}')
+    return seconds
+
+
+def simulate_session(session: int, interactions: int, seed: int, barrier: threading.Barrier) -> tuple[object, list]:
+    """Opens the dashboard and replays random interactions; returns its session state and (name, seconds) rows."""
+    rng = np.random.default_rng([seed, session])
+    names = list(INTERACTIONS)
+    p = np.array([WEIGHTS[name] for name in names], dtype=float)
+    at = new_session()
+    barrier.wait()
+    timings = [('session_start', run(at))]
+    for name in rng.choice(names, size=interactions, p=p / p.sum()):
+        kind, label, values = INTERACTIONS[name]
+        value = values[rng.integers(len(values))]
+        if name == 'prompt' and rng.random() < 0.5:
+            # Half the prompts are new, so some always reach the LLM.
+            value = f"{value} (session {session})"
+        widget(at, kind, label).set_value(value)
+        timings.append((name, run(at)))
+    # A server keeps a session's state between reruns, but not the messages it sent.
+    return at.session_state, timings
+
+
+def percentiles(seconds) -> dict:
+    return {f'p{q}_s': float(np.percentile(seconds, q)) for q in PERCENTILES}
+
+
+def run_round(sessions: int, interactions: int, seed: int) -> tuple[list, float]:
+    """Runs ``sessions`` concurrent sessions; returns their results and the wall time."""
+    barrier = threading.Barrier(sessions)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda i: simulate_session(i, interactions, seed, barrier), range(sessions)))
+    return results, time.perf_counter() - start
+
+
+def load_test(sessions: int, interactions: int, seed: int = 0) -> dict:
+    prepare_process()
+    warmup = new_session()
+    metrics = {'loadtest.sessions': sessions, 'loadtest.interactions': interactions, 'loadtest.cold_start_s': run(warmup)}
+
+    # A first round fills the shared caches, lazy imports and allocator arenas, so the
+    # memory the measured round adds is what its sessions keep.
+    warm_sessions = run_round(sessions, interactions, seed + 1)
+    gc.collect()
+    base_mb = rss_mb()
+    results, wall = run_round(sessions, interactions, seed)
+    gc.collect()
+    # Both rounds' session states are still referenced here, so they count.
+    added_mb = rss_mb() - base_mb
+    del warm_sessions
+
+    timings = [row for _, rows in results for row in rows]
+    by_name = {}
+    for name, seconds in timings:
+        by_name.setdefault(name, []).append(seconds)
+    for name, seconds in by_name.items():
+        metrics[f'loadtest.{name}.count'] = len(seconds)
+        metrics.update({f'loadtest.{name}.{key}': value for key, value in percentiles(seconds).items()})
+    reruns = [seconds for name, seconds in timings if name != 'session_start']
+    metrics.update({f'loadtest.rerun.{key}': value for key, value in percentiles(reruns).items()})
+    metrics['loadtest.reruns_per_s'] = len(timings) / wall
+    metrics['loadtest.base_rss_mb'] = base_mb
+    metrics['loadtest.rss_mb'] = base_mb + added_mb
+    metrics['loadtest.per_session_mb'] = added_mb / sessions
+    return metrics
+
+
+def print_report(metrics: dict, out=sys.stderr):
+    names = sorted({key.split('.')[1] for key in metrics if key.endswith('.p50_s')})
+    print(f"{metrics['loadtest.sessions']} sessions x {metrics['loadtest.interactions']} interactions", file=out)
+    print(f"{'interaction':<20}{'count':>7}" + ''.join(f"{f'p{q} ms':>10}" for q in PERCENTILES), file=out)
+    for name in names:
+        count = metrics.get(f'loadtest.{name}.count', '')
+        row = ''.join(f"{metrics[f'loadtest.{name}.p{q}_s'] * 1000:>10.0f}" for q in PERCENTILES)
+        print(f"{name:<20}{count:>7}{row}", file=out)
+    print(f"{metrics['loadtest.reruns_per_s']:.1f} reruns/s, {metrics['loadtest.base_rss_mb']:.0f} MB after the warm-up round, "
+          f"+{metrics['loadtest.per_session_mb']:.1f} MB per session", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions with a stand-in LLM.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--interactions", type=int, default=20, help="Interactions per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=str, default=None, help="Write metrics as JSON (default: stdout)")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    metrics = load_test(args.sessions, args.interactions, args.seed)
+    print_report(metrics)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(metrics, f, indent=2)
+    else:
+        json.dump(metrics, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""The dashboard's scenario model and map as a graph of memoized nodes.
+
+    generation -> generation_share -> generation_pie
+    generation -> h2_mult -> gco2 -> gco2_score -> network_colors -> color:<name> -> layer:<name>
+    tonne_scaling_factor -> tonne_km_score ----------^
+    bbox, tile_zooms, spatial_index, ... -> data:<name>
+    *_knots, scaling factors -> projection -> projection_charts
+    data:geometries_2020, hourly_colors, view -> hourly_map
+
+Map layers are serialised in two halves: ``layer:<name>`` is the layer's JSON with a
+placeholder for its data, and ``data:<name>`` is the data's JSON. A colour change only
+rebuilds the small ``layer:`` half, and a region change only the ``data:`` half. ``deck``
+splices the halves into one deck.gl spec, which ``SerializedDeck`` hands to
+``st.pydeck_chart`` without serialising the geometry again. The nodes of each layer are
+added from its entry in ``freight.layers.LAYERS``.
+"""
+
+import functools
+import json
+
+import plotly.express as px
+import plotly.graph_objects as go
+import pydeck as pdk
+
+from freight import hourly, scenario, spatial
+from freight.assumptions import NETWORKS
+from freight.graph import Graph
+from freight.layers import LAYERS, LayerSpec, tilesets
+from freight.projection import indices, project
+
+DATA_PLACEHOLDER = '@@freight:data'
+LAYERS_PLACEHOLDER = '@@freight:layers'
+MAP_STYLE = 'mapbox://styles/mapbox/dark-v9'
+
+TILESETS = tuple(tilesets())
+NETWORK_LABELS = dict(zip(NETWORKS, ('Air', 'Rail', 'Roads (Interstate)', 'Roads (Local)')))
+# Pixel width of the airport arc with the least and the most cargo.
+AIRPORT_ARC_WIDTH = (2, 16)
+
+graph = Graph()
+
+
+@graph.node
+def generation_share(generation):
+    total = max(sum(generation), 1)
+    return tuple(s / total for s in generation)
+
+
+@graph.node
+def generation_pie(generation_share, generation_labels):
+    fig = px.pie(None, values=list(generation_share), names=list(generation_labels), hole=0.3)
+    fig.update_layout(margin=dict(l=20, r=20, t=30, b=0), showlegend=False)
+    return fig
+
+
+@graph.node
+def h2_mult(generation):
+    return float(scenario.hydrogen_mult([generation])[0])
+
+
+@graph.node
+def gco2(adoption, h2_mult):
+    return scenario.network_gco2([adoption], h2_mult)[0]
+
+
+@graph.node
+def tonne_km_score(tonne_scaling_factor):
+    return scenario.network_tonne_km(tonne_scaling_factor)[0]
+
+
+@graph.node
+def gco2_score(gco2, gco2_scaling_factor):
+    return scenario.network_gco2_score(gco2, gco2_scaling_factor)[0]
+
+
+@graph.node
+def network_colors(tonne_km_score, gco2_score):
+    colors = scenario.score_color((tonne_km_score + gco2_score) / 2)
+    return {network: colors[i].tolist() for i, network in enumerate(NETWORKS)}
+
+
+@graph.node
+def nltn_color(tonne_km_score, gco2, gco2_scaling_factor):
+    """The NLTN layer is scored as urban road but with interstate emissions."""
+    interstate_score = scenario.network_gco2_score(gco2[NETWORKS.index('road_interstate')], gco2_scaling_factor)[0, 0]
+    return scenario.score_color((tonne_km_score[NETWORKS.index('road_urban')] + interstate_score) / 2).tolist()
+
+
+@graph.node(name='projection')
+def projected(adoption_knots, generation_knots, fleet_knots, commodity_knots, gco2_scaling_factor, tonne_scaling_factor):
+    return project(adoption_knots, generation_knots, fleet_knots, commodity_knots, gco2_scaling_factor, tonne_scaling_factor)
+
+
+@graph.node
+def projection_charts(projection):
+    """Index lines of freight task vs emissions, and stacked emissions per network."""
+    years = projection.years
+    margin = dict(l=20, r=20, t=30, b=0)
+    growth = go.Figure([go.Scatter(x=years, y=values, name=name, mode='lines') for name, values in indices(projection).items()])
+    growth.add_hline(y=100, line_dash='dot', line_color='grey')
+    growth.update_layout(margin=margin, yaxis_title='% of 2016', legend=dict(orientation='h', y=-0.15))
+    emissions = go.Figure([
+        go.Scatter(x=years, y=projection.emissions[:, i], name=NETWORK_LABELS[network], mode='lines', stackgroup='emissions')
+        for i, network in enumerate(NETWORKS)
+    ])
+    emissions.update_layout(margin=margin, yaxis_title='t CO2 / year', legend=dict(orientation='h', y=-0.15))
+    return growth, emissions
+
+
+def layer_json(layer_type: str, layer_id: str, **props) -> str:
+    """Serialises a layer with a placeholder in place of its data."""
+    return pdk.Layer(layer_type, id=layer_id, data=DATA_PLACEHOLDER, **props).to_json()
+
+
+def tile_url(tileset: str) -> str:
+    return f"./app/static/tiles/{tileset}/{{z}}/{{x}}/{{y}}.pbf"
+
+
+def geojson_data(name: str, tile_zooms, spatial_index, bbox) -> str:
+    """Vector tiles if the layer's tileset is built, else its features inside ``bbox`` within its payload budget."""
+    if tile_zooms.get(name) is not None:
+        return json.dumps(tile_url(name))
+    return spatial_index.cull_json(name, bbox, LAYERS[name].budget)
+
+
+def line_layer(tileset: str, tile_zooms, color) -> str:
+    max_zoom = tile_zooms.get(tileset)
+    if max_zoom is None:
+        return layer_json("GeoJsonLayer", tileset, get_line_color=color, line_width_min_pixels=1)
+    return layer_json("MVTLayer", tileset, line_width_min_pixels=1, get_line_color=color, max_zoom=max_zoom)
+
+
+def point_layer(name: str, color) -> str:
+    return layer_json(
+        "GeoJsonLayer",
+        name,
+        get_fill_color=color,
+        get_line_color=[255, 255, 255],
+        line_width_min_pixels=1,
+        point_radius_min_pixels=5,
+        pickable=True,
+        auto_highlight=True,
+    )
+
+
+def _add_color(name: str, spec: LayerSpec):
+    """``color:<name>``: the score colour of the layer's network, or its fixed colour."""
+    if spec.network is None:
+        graph.add(f'color:{name}', lambda: list(spec.color), deps=())
+    elif spec.network == 'nltn':
+        graph.add(f'color:{name}', lambda color: color, deps=('nltn_color',))
+    else:
+        graph.add(f'color:{name}', lambda colors: colors[spec.network], deps=('network_colors',))
+
+
+def _add_geojson_layer(name: str, spec: LayerSpec):
+    graph.add(f'data:{name}', functools.partial(geojson_data, name), deps=('tile_zooms', 'spatial_index', 'bbox'), maxsize=16)
+    if spec.kind == 'lines':
+        graph.add(f'layer:{name}', functools.partial(line_layer, name), deps=('tile_zooms', f'color:{name}'))
+    else:
+        graph.add(f'layer:{name}', functools.partial(point_layer, name), deps=(f'color:{name}',))
+
+
+for _name, _spec in LAYERS.items():
+    _add_color(_name, _spec)
+    if _spec.kind in ('lines', 'points'):
+        _add_geojson_layer(_name, _spec)
+
+
+@graph.node(name='data:airport_arcs', maxsize=16)
+def airport_arc_data(arcs_by_origin, airport, bbox):
+    if airport not in arcs_by_origin:
+        return '[]'
+    return spatial.cull_arcs(arcs_by_origin[airport], bbox).to_json(orient='records')
+
+
+def airport_arc_layer(color):
+    """Arcs as wide and opaque as their share of the largest pair's cargo (``weight``)."""
+    r, g, b = color[:3]
+    return layer_json(
+        "ArcLayer",
+        'airport_arcs',
+        pickable=True,
+        get_width=f"{AIRPORT_ARC_WIDTH[0]} + {AIRPORT_ARC_WIDTH[1] - AIRPORT_ARC_WIDTH[0]} * weight",
+        get_source_position="[from_lng, from_lat]",
+        get_target_position="[to_lng, to_lat]",
+        get_source_color=f"[{r * 0.6:g}, {g * 0.6:g}, {b * 0.6:g}, 60 + 195 * weight]",
+        get_target_color=f"[{r:g}, {g:g}, {b:g}, 60 + 195 * weight]",
+        auto_highlight=True,
+    )
+
+
+graph.add('layer:airport_arcs', airport_arc_layer, deps=('color:airport_arcs',))
+
+
+def hourly_map_html(data, tile_zooms, hourly_colors, view):
+    """The local roads' hourly congestion map, on the same data as their map layer."""
+    routes, ratios, colors = hourly_colors
+    return hourly.map_html(data, view, routes, ratios, colors, tile_zooms.get('geometries_2020'))
+
+
+graph.add('hourly_map', hourly_map_html, deps=('data:geometries_2020', 'tile_zooms', 'hourly_colors', 'view'), maxsize=16)
+
+
+def map_layers(layer_names, **inputs) -> list[tuple[str, str, str]]:
+    """(id, layer JSON, data JSON) for each selected layer, in drawing order."""
+    names = [name for name, spec in LAYERS.items() if spec.label in layer_names]
+    values = graph.compute([f'{half}:{name}' for name in names for half in ('layer', 'data')], **inputs)
+    return [(name, values[f'layer:{name}'], values[f'data:{name}']) for name in names]
+
+
+@functools.lru_cache(maxsize=32)
+def _deck_spec(view: tuple, layers: tuple) -> str:
+    # Memoized strings keep their hash, so a repeated call costs a lookup, not a splice.
+    skeleton = pdk.Deck(map_style=MAP_STYLE, initial_view_state=pdk.ViewState(**dict(view)), layers=[])
+    spec = json.loads(skeleton.to_json())
+    spec['layers'] = LAYERS_PLACEHOLDER
+    spliced = ', '.join(layer.replace(json.dumps(DATA_PLACEHOLDER), data, 1) for _, layer, data in layers)
+    return json.dumps(spec).replace(json.dumps(LAYERS_PLACEHOLDER), f'[{spliced}]', 1)
+
+
+class SerializedDeck(pdk.Deck):
+    """A Deck whose JSON spec was built ahead of time."""
+
+    def __init__(self, spec: str):
+        super().__init__(map_style=MAP_STYLE)
+        self.spec = spec
+
+    def to_json(self):
+        return self.spec
+
+
+def deck(view: dict, layers) -> SerializedDeck:
+    return SerializedDeck(_deck_spec(tuple(sorted(view.items())), tuple(layers)))
@@ -0,0 +1,94 @@
+"""Hourly travel-time profiles for every congestion route.
+
+``HourlyProfiles`` packs ``route_times`` into one dense (routes x 24 x 3) array of LQ,
+median and UQ travel-time estimates in seconds, keyed by route name. Every query takes a
+batch of routes and is evaluated with array operations over that batch, e.g.
+
+    profiles = HourlyProfiles.from_congestion(congestion.connect())
+    profiles.summary(['32 - Derrimut to Montrose', '32 - Montrose to Derrimut'])
+"""
+
+import numpy as np
+import pandas as pd
+
+from freight import congestion
+
+HOURS = 24
+# Third axis of HourlyProfiles.times. LQ is the travel time at the lower quartile of
+# speeds, so it is the slowest of the three.
+STATS = ('lq', 'med', 'uq')
+
+
+class HourlyProfiles:
+
+    def __init__(self, routes, times: np.ndarray):
+        self.routes = np.asarray(routes, dtype=object)
+        self.times = times
+        self.times.setflags(write=False)
+        self.index = {route: i for i, route in enumerate(self.routes)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'HourlyProfiles':
+        """Builds the index from route_name, hour and lq_est/med_est/uq_est columns.
+
+        Hours with no estimate are NaN and are ignored by the queries.
+        """
+        codes, routes = pd.factorize(df['route_name'], sort=True)
+        times = np.full((len(routes), HOURS, len(STATS)), np.nan)
+        times[codes, df['hour'].to_numpy(dtype=np.int64)] = df[[f'{s}_est' for s in STATS]].to_numpy(dtype=float)
+        return cls(routes, times)
+
+    @classmethod
+    def from_congestion(cls, con) -> 'HourlyProfiles':
+        return cls.from_frame(congestion.query(con, 'route_times', limit=None))
+
+    def indices(self, routes) -> np.ndarray:
+        """Row of each route in ``times``. Raises KeyError for unknown routes."""
+        if isinstance(routes, str):
+            routes = [routes]
+        return np.fromiter((self.index[r] for r in routes), dtype=np.int64, count=len(routes))
+
+    def _stat(self, routes, stat: str) -> np.ndarray:
+        """(n_routes, 24) travel times for one statistic."""
+        return self.times[self.indices(routes), :, STATS.index(stat)]
+
+    def at_hour(self, routes, hours) -> np.ndarray:
+        """(n_routes, 3) LQ/median/UQ travel times, each route at its own hour (or a shared one)."""
+        idx = self.indices(routes)
+        return self.times[idx, np.broadcast_to(np.asarray(hours, dtype=np.int64), idx.shape)]
+
+    def best_hour(self, routes, stat: str = 'med') -> np.ndarray:
+        """Departure hour with the shortest travel time, per route."""
+        return np.nanargmin(self._stat(routes, stat), axis=1)
+
+    def worst_hour(self, routes, stat: str = 'med') -> np.ndarray:
+        """Departure hour with the longest travel time, per route."""
+        return np.nanargmax(self._stat(routes, stat), axis=1)
+
+    def peak_to_best_ratio(self, routes, stat: str = 'med') -> np.ndarray:
+        times = self._stat(routes, stat)
+        return np.nanmax(times, axis=1) / np.nanmin(times, axis=1)
+
+    def relative_to_best(self, routes=None, stat: str = 'med') -> np.ndarray:
+        """(n_routes, 24) travel time at each hour over the route's best hour; NaN where unknown."""
+        times = self.times[:, :, STATS.index(stat)] if routes is None else self._stat(routes, stat)
+        return times / np.nanmin(times, axis=1, keepdims=True)
+
+    def percentiles(self, routes, q=(10, 50, 90), stat: str = 'med') -> np.ndarray:
+        """(n_routes, len(q)) percentiles of travel time across the hours of the day."""
+        return np.nanpercentile(self._stat(routes, stat), q, axis=1).T
+
+    def summary(self, routes=None, stat: str = 'med') -> pd.DataFrame:
+        """Best/worst hour, their travel times and the peak-to-best ratio for each route."""
+        routes = self.routes if routes is None else routes
+        times = self._stat(routes, stat)
+        best, worst = np.nanargmin(times, axis=1), np.nanargmax(times, axis=1)
+        rows = np.arange(len(times))
+        return pd.DataFrame({
+            'route_name': list(routes),
+            'best_hour': best,
+            'best_time': times[rows, best],
+            'worst_hour': worst,
+            'worst_time': times[rows, worst],
+            'peak_to_best_ratio': times[rows, worst] / times[rows, best],
+        })
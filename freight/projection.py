@@ -0,0 +1,185 @@
+"""Year-by-year projection of freight activity and emissions, 2016 to 2056.
+
+Inputs are given at a few knot years (the dashboard's 2016/2036/2056 presets, or
+2023/2036/2056 for the generation mix) and linearly interpolated to every year, clamped
+outside the knots. For each year and network:
+
+- tonne-km = baseline tonne.km/hr x tonne scaling x fleet demand x commodity demand x
+  hours per year, where fleet demand is a percentage of the 2016 fleet per network and
+  commodity demand is the mean percentage increase over 2016 across commodities;
+- gCO2/tonne.km = baseline x (non-hydrogen share x gCO2 scaling + the hydrogen share's
+  emissions), with the hydrogen share's emissions read off the adoption curves in
+  ``hydrogen_emission_pct.json`` for each generation source and weighted by the mix;
+- emissions (t CO2/year) = tonne-km x gCO2/tonne.km / 1e6.
+
+Every input may carry leading batch dimensions, so ``project`` evaluates one trajectory
+or many in a single vectorized pass.
+"""
+
+import functools
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from freight import artifacts
+from freight.assumptions import GENERATION_SOURCES, NETWORKS
+from freight.scenario import BASELINE_GCO2, BASELINE_TONNE_KM
+
+YEARS = np.arange(2016, 2057)
+PRESET_YEARS = (2016, 2036, 2056)
+GENERATION_YEARS = (2023, 2036, 2056)
+HOURS_PER_YEAR = 24 * 365
+
+# Dashboard presets: year -> slider values. Adoption and fleet demand are per network (the
+# trailing values are unused), generation per source and commodity demand per commodity.
+ADOPTION_PRESETS = {
+    2016: (0, 0, 0, 0, 0, 0),
+    2036: (0, 0, 0, 0, 0, 0),
+    2056: (0, 0, 0, 0, 0, 0),
+}
+GENERATION_PRESETS = {
+    2023: (23, 76, 2, 0),
+    2036: (0, 0, 0, 0),
+    2056: (0, 0, 0, 0),
+}
+FLEET_PRESETS = {
+    2016: (100, 100, 100, 100, 0, 0),
+    2036: (100, 100, 100, 100, 0, 0),
+    2056: (100, 100, 100, 100, 0, 0),
+}
+COMMODITIES = ('General manufactures', 'Household consumables', 'Construction materials', 'Fuel', 'Vehicles', 'Waste')
+COMMODITY_PRESETS = {
+    2016: (0, 0, 0, 0, 0, 0),
+    2036: (41, 66, 20, 29, 30, 43),
+    2056: (96, 161, 53, 54, 60, 78),
+}
+
+# GENERATION_SOURCES -> column of hydrogen_emission_pct.json (sic).
+CURVE_COLUMNS = {
+    'fossil_fuels': 'fossil_fuel',
+    'natural_gas': 'natural_gas',
+    'electrolysis': 'electroylsis',
+    'biomass': 'biomass',
+}
+
+
+class Projection(NamedTuple):
+    """Trajectories shaped (..., len(years), len(NETWORKS))."""
+    years: np.ndarray
+    tonne_km: np.ndarray
+    gco2: np.ndarray
+    emissions: np.ndarray
+
+
+def knots(presets: dict, year=None, values=None, width: int | None = None) -> tuple:
+    """Preset values in year order, with ``year`` replaced by ``values`` (e.g. the sliders).
+
+    Rows are truncated to ``width`` values. Returns nested tuples, so the result can be a
+    cache key.
+    """
+    rows = {**presets, **({int(year): values} if year is not None else {})}
+    return tuple(tuple(rows[y][:width]) for y in sorted(presets))
+
+
+@functools.lru_cache(maxsize=16)
+def interpolation_matrix(knot_years: tuple, years: tuple) -> np.ndarray:
+    """(len(years), len(knot_years)) weights that linearly interpolate knot values to each year."""
+    return np.stack([np.interp(years, knot_years, np.eye(len(knot_years))[k]) for k in range(len(knot_years))], axis=1)
+
+
+def interpolate(values, knot_years, years=YEARS) -> np.ndarray:
+    """Interpolates (..., len(knot_years), n) knot values to (..., len(years), n)."""
+    weights = interpolation_matrix(tuple(int(y) for y in knot_years), tuple(int(y) for y in years))
+    return np.einsum('yk,...kn->...yn', weights, np.asarray(values, dtype=float))
+
+
+@functools.lru_cache(maxsize=1)
+def emission_curves() -> tuple[np.ndarray, np.ndarray]:
+    """Adoption percentages and (len(GENERATION_SOURCES), n) emissions relative to no hydrogen."""
+    table = artifacts.load_table('hydrogen_emission_pct')
+    table.index = table.index.astype(int)
+    table = table.sort_index()
+    curves = table[[CURVE_COLUMNS[s] for s in GENERATION_SOURCES]].to_numpy(dtype=float).T
+    return table.index.to_numpy(dtype=float), curves
+
+
+def hydrogen_emissions(adoption, generation_share) -> np.ndarray:
+    """Emissions of the hydrogen share of the fleet, relative to an all-fossil fleet.
+
+    ``adoption`` is (..., n) percentages, ``generation_share`` (..., len(GENERATION_SOURCES))
+    fractions, broadcast over ``adoption``'s last axis.
+    """
+    pct, curves = emission_curves()
+    adoption = np.asarray(adoption, dtype=float)
+    # Each curve is (100 - a)% fossil plus a% hydrogen, so subtract the fossil part.
+    by_source = np.stack([np.interp(adoption, pct, curve) for curve in curves], axis=-1) - (1 - adoption / 100)[..., None]
+    return np.einsum('...ns,...s->...n', by_source, np.asarray(generation_share, dtype=float))
+
+
+def generation_shares(generation) -> np.ndarray:
+    """Normalises mixes by their total, or by 1 if the total is smaller (as the dashboard does)."""
+    generation = np.asarray(generation, dtype=float)
+    return generation / np.maximum(generation.sum(axis=-1, keepdims=True), 1)
+
+
+def project(
+    adoption,
+    generation,
+    fleet,
+    commodity,
+    gco2_scaling_factor=1.0,
+    tonne_scaling_factor=1.0,
+    adoption_years=PRESET_YEARS,
+    generation_years=GENERATION_YEARS,
+    years=YEARS,
+    baseline_gco2=BASELINE_GCO2,
+    baseline_tonne_km=BASELINE_TONNE_KM,
+) -> Projection:
+    """Projects every network for every year.
+
+    adoption: (..., len(adoption_years), 4) hydrogen adoption percentage per network.
+    generation: (..., len(generation_years), 4) generation mix, in GENERATION_SOURCES order.
+    fleet: (..., len(adoption_years), 4) fleet demand per network, as a percentage of 2016.
+    commodity: (..., len(adoption_years), n) commodity demand increase over 2016, percent.
+    gco2_scaling_factor, tonne_scaling_factor: scalars or (...,).
+    baseline_gco2, baseline_tonne_km: (..., 4).
+    """
+    years = np.asarray(years)
+    adoption = np.clip(interpolate(adoption, adoption_years, years), 0, 100)
+    shares = interpolate(generation_shares(generation), generation_years, years)
+    fleet = interpolate(fleet, adoption_years, years) / 100
+    commodity = 1 + interpolate(commodity, adoption_years, years).mean(axis=-1, keepdims=True) / 100
+
+    gco2_scaling_factor = np.asarray(gco2_scaling_factor, dtype=float)[..., None, None]
+    tonne_scaling_factor = np.asarray(tonne_scaling_factor, dtype=float)[..., None, None]
+    baseline_gco2 = np.asarray(baseline_gco2, dtype=float)[..., None, :]
+    baseline_tonne_km = np.asarray(baseline_tonne_km, dtype=float)[..., None, :]
+
+    gco2 = baseline_gco2 * ((1 - adoption / 100) * gco2_scaling_factor + hydrogen_emissions(adoption, shares))
+    tonne_km = baseline_tonne_km * tonne_scaling_factor * fleet * commodity * HOURS_PER_YEAR
+    return Projection(years, tonne_km, gco2, tonne_km * gco2 / 1e6)
+
+
+def to_frame(projection: Projection) -> pd.DataFrame:
+    """One row per year and network of a single (unbatched) projection."""
+    n_years, n_networks = len(projection.years), len(NETWORKS)
+    return pd.DataFrame({
+        'year': np.repeat(projection.years, n_networks),
+        'network': np.tile(NETWORKS, n_years),
+        'tonne_km': projection.tonne_km.reshape(-1),
+        'gco2_per_tonne_km': projection.gco2.reshape(-1),
+        'emissions_t': projection.emissions.reshape(-1),
+    })
+
+
+def indices(projection: Projection) -> dict[str, np.ndarray]:
+    """Total freight task, total emissions and emissions intensity per year, as % of the first year."""
+    tonne_km = projection.tonne_km.sum(axis=-1)
+    emissions = projection.emissions.sum(axis=-1)
+    intensity = emissions / tonne_km
+    return {
+        'Freight task (tonne-km)': 100 * tonne_km / tonne_km[..., :1],
+        'Emissions (t CO2)': 100 * emissions / emissions[..., :1],
+        'Emissions intensity (gCO2/tonne-km)': 100 * intensity / intensity[..., :1],
+    }
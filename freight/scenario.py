@@ -0,0 +1,179 @@
+"""Vectorized scoring of freight network scenarios.
+
+Each scenario is one row of slider values: hydrogen adoption per network, the
+hydrogen generation mix and the two scaling factors. ``evaluate`` scores any
+number of scenarios for every network in one pass, and the CLI streams a
+scenario CSV through a process pool:
+
+    python -m freight.scenario scenarios.csv -o results.csv --workers 8
+"""
+
+import argparse
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from freight.assumptions import ASSUMPTIONS, GENERATION_GCO2, GENERATION_SOURCES, LIMITS, NETWORKS
+
+BASELINE_TONNE_KM = np.array([float(ASSUMPTIONS['tonne.km/hr'][n]) for n in NETWORKS])
+BASELINE_GCO2 = np.array([float(ASSUMPTIONS['gco2/tonne.km'][n]) for n in NETWORKS])
+
+ADOPTION_COLUMNS = [f'h2_{n}' for n in NETWORKS]
+GENERATION_COLUMNS = [f'gen_{s}' for s in GENERATION_SOURCES]
+SCALING_COLUMNS = ['gco2_scaling_factor', 'tonne_scaling_factor']
+
+
+class ScenarioResult(NamedTuple):
+    """Per-scenario, per-network outputs. Arrays are (n_scenarios, len(NETWORKS))."""
+    gco2: np.ndarray
+    tonne_km_score: np.ndarray
+    gco2_score: np.ndarray
+    score: np.ndarray
+    color: np.ndarray  # (n_scenarios, len(NETWORKS), 3) RGB
+
+
+def hydrogen_mult(generation_mix, generation_gco2=GENERATION_GCO2) -> np.ndarray:
+    """Returns the gCO2 multiplier of hydrogen relative to all fossil fuel generation.
+
+    ``generation_mix`` is (n, 4) in GENERATION_SOURCES order, in any units; rows are
+    normalised by their total (or 1 if the total is smaller). ``generation_gco2`` is (4,)
+    or (n, 4).
+    """
+    mix = np.atleast_2d(np.asarray(generation_mix, dtype=float))
+    totals = np.maximum(mix.sum(axis=1, keepdims=True), 1)
+    generation_gco2 = np.asarray(generation_gco2, dtype=float)
+    return ((mix / totals) * generation_gco2).sum(axis=-1) / generation_gco2[..., 0]
+
+
+def network_gco2(adoption, mult, baseline=BASELINE_GCO2) -> np.ndarray:
+    """Returns gCO2/tonne.km for each network given hydrogen adoption percentages (n, 4)."""
+    adoption = np.atleast_2d(np.asarray(adoption, dtype=float))
+    mult = np.asarray(mult, dtype=float).reshape(-1, 1)
+    # Truncated to an integer before dividing, as in the original dashboard formula.
+    return np.trunc((100 - adoption) * baseline + adoption * baseline * mult) / 100
+
+
+def network_tonne_km(tonne_scaling_factor, baseline=BASELINE_TONNE_KM, limit=LIMITS['tonne.km/hr']) -> np.ndarray:
+    """Returns the normalised tonne.km/hr score for each network, (n, 4). ``limit`` may be (n,)."""
+    tonne_scaling_factor = np.asarray(tonne_scaling_factor, dtype=float).reshape(-1, 1)
+    limit = np.asarray(limit, dtype=float).reshape(-1, 1)
+    scaled = np.log2(baseline) * tonne_scaling_factor
+    return np.clip(scaled, 0, limit) / limit
+
+
+def network_gco2_score(gco2, gco2_scaling_factor, limit=LIMITS['gco2/tonne.km']) -> np.ndarray:
+    """Returns the normalised gCO2 score (1 is cleanest) for each network, (n, 4). ``limit`` may be (n,)."""
+    gco2_scaling_factor = np.asarray(gco2_scaling_factor, dtype=float).reshape(-1, 1)
+    limit = np.asarray(limit, dtype=float).reshape(-1, 1)
+    adj_gco2 = np.asarray(gco2, dtype=float) * gco2_scaling_factor
+    return 1 - np.clip(adj_gco2, 0, limit) / limit
+
+
+def score_color(score) -> np.ndarray:
+    """Maps scores in [0, 1] to a red (bad) to green (good) RGB colour."""
+    score = np.asarray(score, dtype=float)
+    color = np.zeros(score.shape + (3,), dtype=np.int64)
+    color[..., 0] = np.trunc((1 - score) * 255)
+    color[..., 1] = np.trunc(score * 255)
+    return color
+
+
+def evaluate(
+    adoption,
+    generation_mix,
+    gco2_scaling_factor,
+    tonne_scaling_factor,
+    baseline_gco2=BASELINE_GCO2,
+    baseline_tonne_km=BASELINE_TONNE_KM,
+    generation_gco2=GENERATION_GCO2,
+    tonne_km_limit=LIMITS['tonne.km/hr'],
+    gco2_limit=LIMITS['gco2/tonne.km'],
+) -> ScenarioResult:
+    """Scores every network for a batch of scenarios.
+
+    adoption: (n, 4) hydrogen adoption percentage per network, in NETWORKS order.
+    generation_mix: (n, 4) hydrogen generation mix, in GENERATION_SOURCES order.
+    gco2_scaling_factor, tonne_scaling_factor: (n,) or scalars.
+    The assumptions default to ASSUMPTIONS, GENERATION_GCO2 and LIMITS and may also be
+    given per scenario: baselines and generation_gco2 as (n, 4), limits as (n,).
+    """
+    gco2 = network_gco2(adoption, hydrogen_mult(generation_mix, generation_gco2), baseline_gco2)
+    tonne_km_score = network_tonne_km(tonne_scaling_factor, baseline_tonne_km, tonne_km_limit)
+    n = max(gco2.shape[0], tonne_km_score.shape[0])
+    gco2 = np.broadcast_to(gco2, (n, len(NETWORKS)))
+    tonne_km_score = np.broadcast_to(tonne_km_score, (n, len(NETWORKS)))
+    gco2_score = network_gco2_score(gco2, gco2_scaling_factor, gco2_limit)
+    score = (tonne_km_score + gco2_score) / 2
+    return ScenarioResult(gco2, tonne_km_score, gco2_score, score, score_color(score))
+
+
+def evaluate_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Scores a frame of scenarios with ADOPTION, GENERATION and SCALING columns."""
+    result = evaluate(
+        df[ADOPTION_COLUMNS].to_numpy(dtype=float),
+        df[GENERATION_COLUMNS].to_numpy(dtype=float),
+        df['gco2_scaling_factor'].to_numpy(dtype=float),
+        df['tonne_scaling_factor'].to_numpy(dtype=float),
+    )
+    out = {}
+    for i, network in enumerate(NETWORKS):
+        out[f'score_{network}'] = result.score[:, i]
+        out[f'gco2_{network}'] = result.gco2[:, i]
+        out[f'red_{network}'] = result.color[:, i, 0]
+        out[f'green_{network}'] = result.color[:, i, 1]
+    return pd.DataFrame(out, index=df.index)
+
+
+def stream_results(chunks, workers: int = 1, max_pending: int | None = None):
+    """Yields ``evaluate_frame`` of each chunk, in order, using up to ``workers`` processes.
+
+    At most ``max_pending`` chunks are in flight at once so memory stays bounded.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, evaluate_frame(chunk)
+        return
+
+    max_pending = max_pending or workers * 2
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(evaluate_frame, chunk)))
+            if len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of freight scenarios.")
+    parser.add_argument("filename", type=str, help="Scenario CSV with columns: " + ", ".join(
+        ADOPTION_COLUMNS + GENERATION_COLUMNS + SCALING_COLUMNS))
+    parser.add_argument("-o", "--output", type=str, default=None, help="Output CSV (default: stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Scenarios per chunk")
+    parser.add_argument("--keep-inputs", action="store_true", help="Include the input columns in the output")
+    args = parser.parse_args(argv)
+
+    chunks = pd.read_csv(args.filename, chunksize=args.chunksize)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        header = True
+        for chunk, result in stream_results(chunks, workers=args.workers):
+            if args.keep_inputs:
+                result = pd.concat([chunk, result], axis=1)
+            result.to_csv(out, header=header, index=False)
+            header = False
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Read-only views of data shared by every session in the process.
+
+The dashboard keeps its immutable inputs in ``st.cache_resource``, which hands every
+session the same object rather than a copy. ``readonly`` marks the arrays behind them as
+non-writeable, so a session that tries to modify shared data in place fails loudly instead
+of changing it for everyone; operations that return new frames or arrays are unaffected.
+Object (e.g. string) columns stay writeable, as pandas 1.5 can't compare read-only ones.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def readonly(value):
+    """Marks the arrays in ``value`` (and in dicts, lists and tuples of them) read-only, in place."""
+    if isinstance(value, np.ndarray):
+        if value.dtype != object:
+            value.setflags(write=False)
+    elif isinstance(value, pd.DataFrame):
+        for block in value._mgr.blocks:
+            readonly(block.values)
+    elif isinstance(value, pd.Series):
+        readonly(value.values)
+    elif isinstance(value, dict):
+        for item in value.values():
+            readonly(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            readonly(item)
+    return value
+
@@ -0,0 +1,239 @@
+"""Spatial index over the freight layers and facilities, for culling and nearby queries.
+
+``SpatialIndex`` keeps an STRtree per map layer and one over every facility point
+(airports from ``au-airport-locations.csv``, seaports and intermodal terminals), so the
+dashboard can send only the features inside a region's bounding box and answer
+"what's within 50 km of here" without scanning every feature.
+
+Layers are read on first use, not when the index is built, and kept in least recently
+used order within a budget of estimated bytes, so datasets nobody selects cost nothing.
+Each layer is read by the first session that asks for it while the others wait for that
+read, without holding up sessions using other layers. ``cull_json`` falls back to coarser
+levels of detail (simplified on first use and cached in the same budget) while a layer's
+features in the region exceed its payload budget.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from freight import artifacts, geo, instrument
+from freight.geo import load_json
+
+# Estimated bytes (see ``layer_nbytes``) of loaded layers and their levels of detail kept
+# before the least recently used is dropped.
+CACHE_BYTES = 64 << 20
+# (simplify tolerance, minimum extent) in degrees of each coarser level of detail, finest
+# first: the zoom bands of geo.DETAIL_LEVELS. Points are never dropped.
+DETAIL_LEVELS = tuple((tolerance, extent) for _, _, tolerance, extent in reversed(geo.DETAIL_LEVELS))
+AIRPORT_TYPES = ('large_airport', 'medium_airport', 'small_airport')
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+# Bounding boxes (min lng, min lat, max lng, max lat).
+REGIONS = {
+    'Australia': (112.0, -44.0, 154.0, -10.0),
+    'New South Wales': (140.99, -37.51, 153.64, -28.16),
+    'Victoria': (140.96, -39.16, 149.98, -33.98),
+    'Queensland': (137.99, -29.18, 153.55, -10.05),
+    'South Australia': (129.0, -38.06, 141.0, -25.99),
+    'Western Australia': (112.92, -35.13, 129.0, -13.69),
+    'Tasmania': (143.82, -43.65, 148.48, -39.57),
+    'Northern Territory': (129.0, -26.0, 138.0, -10.97),
+    'Australian Capital Territory': (148.76, -35.92, 149.4, -35.12),
+}
+
+
+def region_view(bbox) -> dict:
+    """Centre and zoom that fit ``bbox`` in a roughly 2:1 map."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    span = max(max_lng - min_lng, (max_lat - min_lat) * 1.5, 0.1)
+    return {
+        'longitude': (min_lng + max_lng) / 2,
+        'latitude': (min_lat + max_lat) / 2,
+        'zoom': float(np.clip(np.log2(360 / span) - 0.1, 3, 10)),
+    }
+
+
+def haversine_km(lng1, lat1, lng2, lat2) -> np.ndarray:
+    lng1, lat1, lng2, lat2 = (np.radians(np.asarray(v, dtype=float)) for v in (lng1, lat1, lng2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def load_facilities() -> pd.DataFrame:
+    """Airports, seaports and intermodal terminals as (kind, name, state, lng, lat) rows."""
+    airports = pd.read_csv(artifacts.AIRPORTS_CSV, usecols=['name', 'type', 'local_region', 'longitude_deg', 'latitude_deg'])
+    airports = airports[airports['type'].isin(AIRPORT_TYPES)]
+    frames = [pd.DataFrame({
+        'kind': 'airport',
+        'name': airports['name'],
+        'state': airports['local_region'],
+        'lng': airports['longitude_deg'],
+        'lat': airports['latitude_deg'],
+    })]
+    for kind, path in artifacts.FACILITY_GEOJSON.items():
+        features = load_json(path)['features']
+        frames.append(pd.DataFrame({
+            'kind': kind,
+            'name': [f['properties'].get('name') for f in features],
+            'state': [f['properties'].get('state') for f in features],
+            'lng': [f['geometry']['coordinates'][0] for f in features],
+            'lat': [f['geometry']['coordinates'][1] for f in features],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def layer_nbytes(geoms: np.ndarray, properties: list[str]) -> int:
+    """Estimated memory of a layer: 16 bytes per coordinate pair plus the property text."""
+    return int(shapely.get_num_coordinates(geoms).sum()) * 16 + sum(map(len, properties))
+
+
+class LoadedLayer(NamedTuple):
+    properties: list[str]  # each feature's properties as JSON text
+    geoms: np.ndarray
+    tree: shapely.STRtree
+    nbytes: int
+
+
+def coarser(layer: LoadedLayer, tolerance: float, min_extent: float) -> LoadedLayer:
+    """``layer`` simplified to ``tolerance``, without lines and areas smaller than ``min_extent``."""
+    bounds = shapely.bounds(layer.geoms)
+    keep = np.flatnonzero(
+        (bounds[:, 2] - bounds[:, 0] >= min_extent) | (bounds[:, 3] - bounds[:, 1] >= min_extent)
+        | (shapely.get_type_id(layer.geoms) == shapely.GeometryType.POINT)
+    )
+    geoms = shapely.simplify(layer.geoms[keep], tolerance)
+    properties = [layer.properties[i] for i in keep]
+    return LoadedLayer(properties, geoms, shapely.STRtree(geoms), layer_nbytes(geoms, properties))
+
+
+def _query(layer: LoadedLayer, bbox) -> np.ndarray:
+    return np.sort(layer.tree.query(shapely.box(*bbox), predicate='intersects'))
+
+
+def _feature_collection_json(layer: LoadedLayer, idx: np.ndarray) -> str:
+    """The features at ``idx`` as a GeoJSON FeatureCollection, written from the stored JSON pieces."""
+    geometries = shapely.to_geojson(layer.geoms[idx]) if len(idx) else []
+    features = ', '.join(
+        f'{{"type": "Feature", "properties": {layer.properties[i]}, "geometry": {g}}}' for i, g in zip(idx, geometries)
+    )
+    return f'{{"type": "FeatureCollection", "features": [{features}]}}'
+
+
+class SpatialIndex:
+
+    def __init__(self, sources: dict[str, str], facilities: pd.DataFrame, max_bytes: int = CACHE_BYTES):
+        self.sources = sources
+        self.max_bytes = max_bytes
+        self._layers = OrderedDict()  # (layer, level) -> LoadedLayer
+        self._loading = {}  # (layer, level) -> Future of a LoadedLayer being read by another thread
+        self._lock = threading.Lock()  # guards the two dicts only; layers are read outside it
+        self.facilities = facilities.reset_index(drop=True)
+        self.facility_tree = shapely.STRtree(shapely.points(self.facilities[['lng', 'lat']].to_numpy()))
+
+    @classmethod
+    def build(cls, sources: dict[str, str], max_bytes: int = CACHE_BYTES) -> 'SpatialIndex':
+        """An index over the layer name -> GeoJSON path ``sources``, none of them read yet."""
+        return cls(sources, load_facilities(), max_bytes)
+
+    def _load(self, layer: str) -> LoadedLayer:
+        path = self.sources[layer]
+        geoms, properties = artifacts.features(path)
+        return LoadedLayer(properties, geoms, shapely.STRtree(geoms), layer_nbytes(geoms, properties))
+
+    def layer(self, layer: str, level: int | None = None) -> LoadedLayer:
+        """The features and tree of ``layer`` at a level of detail (None for full), read on first use."""
+        key = (layer, level)
+        with self._lock:
+            if key in self._layers:
+                self._layers.move_to_end(key)
+                return self._layers[key]
+            pending = self._loading.get(key)
+            if pending is None:
+                future = self._loading[key] = Future()
+        if pending is not None:
+            return pending.result()
+
+        try:
+            instrument.count(f'layer_load:{layer}' if level is None else f'layer_load:{layer}@{level}')
+            # A level of detail is simplified from the full layer.
+            loaded = self._load(layer) if level is None else coarser(self.layer(layer), *DETAIL_LEVELS[level])
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._layers[key] = loaded
+            while len(self._layers) > 1 and self.loaded_bytes() > self.max_bytes:
+                self._layers.popitem(last=False)
+        future.set_result(loaded)
+        return loaded
+
+    def loaded(self) -> list[tuple[str, int | None]]:
+        """(layer, level) of everything in memory, least recently used first."""
+        with self._lock:
+            return list(self._layers)
+
+    def loaded_bytes(self) -> int:
+        return sum(entry.nbytes for entry in self._layers.values())
+
+    def query(self, layer: str, bbox, level: int | None = None) -> np.ndarray:
+        """Sorted indices of the features in ``layer`` that intersect ``bbox``."""
+        return _query(self.layer(layer, level), bbox)
+
+    def cull(self, layer: str, bbox, level: int | None = None) -> dict:
+        """A FeatureCollection of only the features in ``layer`` that intersect ``bbox``."""
+        return json.loads(self._cull_json(layer, bbox, level))
+
+    def _cull_json(self, layer: str, bbox, level: int | None = None) -> str:
+        loaded = self.layer(layer, level)
+        return _feature_collection_json(loaded, _query(loaded, bbox))
+
+    def cull_json(self, layer: str, bbox, budget: int | None = None) -> str:
+        """``cull`` as JSON at the finest level of detail within ``budget`` bytes, or else the coarsest."""
+        for level in (None, *range(len(DETAIL_LEVELS))):
+            data = self._cull_json(layer, bbox, level)
+            if budget is None or len(data) <= budget:
+                break
+        if level is not None:
+            instrument.count(f'detail_level:{layer}@{level}')
+        return data
+
+    def facilities_in(self, bbox, kinds=None) -> pd.DataFrame:
+        idx = np.sort(self.facility_tree.query(shapely.box(*bbox), predicate='intersects'))
+        found = self.facilities.iloc[idx]
+        return found if kinds is None else found[found['kind'].isin(kinds)]
+
+    def nearest(self, lng: float, lat: float, radius_km: float, kinds=None, limit: int | None = None) -> pd.DataFrame:
+        """Facilities within ``radius_km`` of a point, nearest first, with a distance_km column."""
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        candidates = self.facilities_in((lng - dlng, lat - dlat, lng + dlng, lat + dlat), kinds)
+        distance = haversine_km(lng, lat, candidates['lng'], candidates['lat'])
+        found = candidates.assign(distance_km=distance)[distance <= radius_km].sort_values('distance_km')
+        return found if limit is None else found.head(limit)
+
+
+def arcs_by_origin(arcs: pd.DataFrame, column: str = 'from_name') -> dict[str, pd.DataFrame]:
+    """Splits the airport arcs into one frame per origin, in order of first appearance."""
+    return {name: group.reset_index(drop=True) for name, group in arcs.groupby(column, sort=False)}
+
+
+def cull_arcs(arcs: pd.DataFrame, bbox) -> pd.DataFrame:
+    """Arcs with at least one end inside ``bbox``."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+
+    def inside(lng, lat):
+        return arcs[lng].between(min_lng, max_lng) & arcs[lat].between(min_lat, max_lat)
+
+    return arcs[inside('from_lng', 'from_lat') | inside('to_lng', 'to_lat')]
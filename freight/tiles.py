@@ -0,0 +1,254 @@
+"""Mapbox Vector Tile pyramids for the map layers.
+
+Builds ``<output_dir>/{z}/{x}/{y}.pbf`` from any GeoJSON in ``data/simplified`` or
+``data/raw`` and writes ``<output_dir>/manifest.json`` with the extent, size and content
+key of every tile. Tile encoding is spread across a process pool, and by default only
+tiles whose source features changed since the last manifest are re-encoded:
+
+    python -m freight.tiles data/raw/secondary_freight.geojson -o static/tiles/secondary_freight --workers 4
+
+``python -m freight.tiles --all`` rebuilds the tiles of every line layer in
+``freight.layers`` under static/tiles, which is where the dashboard loads them from.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import mapbox_vector_tile
+import numpy as np
+import shapely
+
+from freight.geo import load_features, tile_bounds, tile_size, tiles_covering, to_mercator
+from freight.layers import LAYERS, tilesets
+
+EXTENT = 4096
+BUFFER = 64 / EXTENT  # fraction of a tile added around each tile when clipping
+MIN_ZOOM = 0
+MAX_ZOOM = 10
+MANIFEST = "manifest.json"
+TILES_DIR = "static/tiles"
+
+# Decimal places source coordinates are rounded to before hashing (about a centimetre).
+KEY_PRECISION = 7
+
+# Tileset name -> (source, max zoom) of every line layer in freight.layers.
+TILESETS = {name: (LAYERS[name].source, LAYERS[name].max_zoom) for name in tilesets()}
+
+# Per-process source geometry, set by _init_worker so tasks don't pickle it again.
+_source = {}
+
+
+def feature_keys(lng_lat: np.ndarray, properties: list[dict]) -> list[str]:
+    """Returns a content hash per feature, used to detect which tiles changed.
+
+    Hashes the source lng/lat rounded to KEY_PRECISION rather than the projected geometry,
+    so keys don't change with the platform's floating point or the projection code.
+    """
+    rounded = shapely.transform(lng_lat, lambda coords: np.round(coords, KEY_PRECISION))
+    keys = []
+    for wkb, props in zip(shapely.to_wkb(rounded, output_dimension=2, byte_order=1), properties):
+        h = hashlib.sha1(wkb)
+        h.update(json.dumps(props, sort_keys=True, default=str).encode())
+        keys.append(h.hexdigest()[:16])
+    return keys
+
+
+def tile_key(zoom: int, feature_keys_in_tile, options: dict) -> str:
+    h = hashlib.sha1(json.dumps([zoom, options], sort_keys=True).encode())
+    for key in sorted(feature_keys_in_tile):
+        h.update(key.encode())
+    return h.hexdigest()[:16]
+
+
+def index_tiles(geoms: np.ndarray, min_zoom: int, max_zoom: int, buffer: float = BUFFER) -> dict:
+    """Maps each zoom to (x, y, feature) arrays of every tile/feature pair that intersects.
+
+    Pairs are found top-down: a feature is only tested against the children of tiles it
+    touched at the zoom above, so long features don't enumerate their whole bounding box.
+    """
+    bounds = shapely.bounds(geoms)
+    x0, y0, x1, y1 = tiles_covering(min_zoom, bounds)
+    xs, ys, feats = [], [], []
+    for i in range(len(geoms)):
+        tx, ty = np.meshgrid(np.arange(x0[i], x1[i] + 1), np.arange(y0[i], y1[i] + 1))
+        xs.append(tx.ravel())
+        ys.append(ty.ravel())
+        feats.append(np.full(tx.size, i))
+    x, y, feat = (np.concatenate(a) if a else np.empty(0, dtype=np.int64) for a in (xs, ys, feats))
+
+    index = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        if zoom > min_zoom:
+            x = (np.repeat(x, 4) * 2 + np.tile([0, 1, 0, 1], len(x)))
+            y = (np.repeat(y, 4) * 2 + np.tile([0, 0, 1, 1], len(y)))
+            feat = np.repeat(feat, 4)
+        boxes = shapely.box(*tile_bounds(zoom, x, y, buffer))
+        hit = shapely.intersects(geoms[feat], boxes)
+        x, y, feat = x[hit], y[hit], feat[hit]
+        index[zoom] = (x, y, feat)
+    return index
+
+
+def group_tiles(x: np.ndarray, y: np.ndarray, feat: np.ndarray) -> list[tuple[int, int, np.ndarray]]:
+    """Groups tile/feature pairs into (x, y, feature indices) per tile."""
+    order = np.lexsort((feat, y, x))
+    x, y, feat = x[order], y[order], feat[order]
+    starts = np.flatnonzero(np.r_[True, (x[1:] != x[:-1]) | (y[1:] != y[:-1])])
+    ends = np.r_[starts[1:], len(x)]
+    return [(int(x[s]), int(y[s]), feat[s:e]) for s, e in zip(starts, ends)]
+
+
+def mvt_properties(props: dict) -> dict:
+    """MVT attributes must be strings, numbers or booleans."""
+    out = {}
+    for k, v in props.items():
+        if v is None:
+            continue
+        out[k] = v if isinstance(v, (str, int, float, bool)) else json.dumps(v)
+    return out
+
+
+def _init_worker(geoms: np.ndarray, properties: list[dict], layer: str, output_dir: str):
+    _source.update(geoms=geoms, properties=properties, layer=layer, output_dir=output_dir, simplified={})
+
+
+def _simplified(zoom: int) -> np.ndarray:
+    cache = _source["simplified"]
+    if zoom not in cache:
+        cache.clear()
+        cache[zoom] = shapely.simplify(_source["geoms"], tile_size(zoom) / EXTENT)
+    return cache[zoom]
+
+
+def encode_tiles(zoom: int, tiles: list[tuple[int, int, np.ndarray]]) -> list[tuple[str, int, int]]:
+    """Encodes and writes tiles at one zoom. Returns (z/x/y, bytes, feature count) per tile."""
+    geoms = _simplified(zoom)
+    written = []
+    for x, y, feats in tiles:
+        bounds = tile_bounds(zoom, x, y)
+        clipped = shapely.clip_by_rect(geoms[feats], *tile_bounds(zoom, x, y, BUFFER))
+        keep = ~shapely.is_empty(clipped)
+        features = [
+            {"geometry": g, "properties": mvt_properties(_source["properties"][i])}
+            for g, i in zip(clipped[keep], feats[keep])
+        ]
+        data = mapbox_vector_tile.encode(
+            [{"name": _source["layer"], "features": features}],
+            default_options={"quantize_bounds": tuple(float(b) for b in bounds), "extents": EXTENT},
+        )
+        path = os.path.join(_source["output_dir"], str(zoom), str(x), f"{y}.pbf")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append((f"{zoom}/{x}/{y}", len(data), len(features)))
+    return written
+
+
+def load_manifest(output_dir: str) -> dict | None:
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_tiles(source: str, output_dir: str, layer: str | None = None, min_zoom: int = MIN_ZOOM,
+                max_zoom: int = MAX_ZOOM, workers: int = 1, incremental: bool = True, batch_size: int = 64) -> dict:
+    """Builds (or incrementally updates) the tile pyramid for ``source``. Returns the manifest."""
+    layer = layer or os.path.splitext(os.path.basename(source))[0]
+    options = {"layer": layer, "extent": EXTENT, "buffer": BUFFER}
+    lng_lat, properties = load_features(source)
+    geoms = to_mercator(lng_lat)
+    keys = feature_keys(lng_lat, properties)
+
+    previous = load_manifest(output_dir) if incremental else None
+    if previous is None or previous.get("options") != options:
+        previous = {"tiles": {}}
+
+    tiles = {}
+    jobs = []
+    for zoom, pairs in index_tiles(geoms, min_zoom, max_zoom).items():
+        todo = []
+        for x, y, feats in group_tiles(*pairs):
+            name = f"{zoom}/{x}/{y}"
+            key = tile_key(zoom, (keys[i] for i in feats), options)
+            old = previous["tiles"].get(name)
+            if old and old["key"] == key and os.path.exists(os.path.join(output_dir, f"{name}.pbf")):
+                tiles[name] = old
+            else:
+                tiles[name] = {"key": key}
+                todo.append((x, y, feats))
+        jobs += [(zoom, todo[i:i + batch_size]) for i in range(0, len(todo), batch_size)]
+
+    init_args = (geoms, properties, layer, output_dir)
+    if workers <= 1:
+        _init_worker(*init_args)
+        results = [encode_tiles(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            results = list(pool.map(encode_tiles, *zip(*jobs))) if jobs else []
+    for name, size, count in (entry for batch in results for entry in batch):
+        tiles[name].update(bytes=size, features=count)
+
+    for name in previous["tiles"].keys() - tiles.keys():
+        path = os.path.join(output_dir, f"{name}.pbf")
+        if os.path.exists(path):
+            os.remove(path)
+
+    zooms = {}
+    for name, entry in tiles.items():
+        z, x, y = (int(v) for v in name.split("/"))
+        stats = zooms.setdefault(str(z), {"min_x": x, "max_x": x, "min_y": y, "max_y": y, "tiles": 0, "bytes": 0})
+        stats.update(min_x=min(stats["min_x"], x), max_x=max(stats["max_x"], x),
+                     min_y=min(stats["min_y"], y), max_y=max(stats["max_y"], y))
+        stats["tiles"] += 1
+        stats["bytes"] += entry["bytes"]
+
+    manifest = {
+        "source": source,
+        "options": options,
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "bounds": shapely.total_bounds(lng_lat).tolist() if len(lng_lat) else None,
+        "encoded": sum(len(batch) for batch in results),
+        "total_bytes": sum(entry["bytes"] for entry in tiles.values()),
+        "zooms": zooms,
+        "tiles": dict(sorted(tiles.items())),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a vector tile pyramid from a GeoJSON file.")
+    parser.add_argument("filename", type=str, nargs="?", help="Source GeoJSON")
+    parser.add_argument("-o", "--output-dir", type=str, help="Directory for {z}/{x}/{y}.pbf and manifest.json")
+    parser.add_argument("--all", action="store_true", help=f"Build every tileset in TILESETS under {TILES_DIR}")
+    parser.add_argument("--layer", type=str, default=None, help="MVT layer name (default: source file stem)")
+    parser.add_argument("--minzoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--maxzoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--full", action="store_true", help="Re-encode every tile instead of only changed ones")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        builds = [(source, os.path.join(TILES_DIR, name), name, max_zoom) for name, (source, max_zoom) in TILESETS.items()]
+    elif args.filename and args.output_dir:
+        builds = [(args.filename, args.output_dir, args.layer, args.maxzoom)]
+    else:
+        parser.error("either --all or a filename and --output-dir are required")
+
+    for source, output_dir, layer, max_zoom in builds:
+        manifest = build_tiles(source, output_dir, layer, args.minzoom, max_zoom, args.workers, incremental=not args.full)
+        print(f"{output_dir}: {len(manifest['tiles'])} tiles ({manifest['encoded']} encoded), "
+              f"{manifest['total_bytes']} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Monte Carlo uncertainty and sensitivity analysis of the network scores.
+
+Every assumption (baseline gCO2/tonne.km and tonne.km/hr per network, gCO2 of each
+hydrogen generation source and the normalisation limits) is a triangular distribution
+around its point value. ``simulate`` draws the assumptions in chunks, scores each chunk
+of draws with ``scenario.evaluate`` as one batch and folds the outputs into fixed-size
+histograms, so memory stays bounded however many draws are taken; chunks can be spread
+across processes. ``tornado`` ranks the assumptions by how far each one alone moves the
+outputs between its 10th and 90th percentiles.
+
+    python -m freight.uncertainty --samples 10000000 --workers 4
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from freight import scenario
+from freight.assumptions import GENERATION_GCO2, GENERATION_SOURCES, LIMITS, NETWORKS
+
+GCO2_SPREAD = 0.2
+TONNE_KM_SPREAD = 0.3
+CHUNK_SIZE = 100_000
+BINS = 4096
+PERCENTILES = (5, 25, 50, 75, 95)
+TORNADO_QUANTILES = (0.1, 0.9)
+
+# Assumption -> (low, mode, high) of its triangular distribution.
+PARAMETERS = {
+    **{f'gCO2/tonne.km ({n})': (g * (1 - GCO2_SPREAD), g, g * (1 + GCO2_SPREAD)) for n, g in zip(NETWORKS, scenario.BASELINE_GCO2)},
+    **{f'tonne.km/hr ({n})': (t * (1 - TONNE_KM_SPREAD), t, t * (1 + TONNE_KM_SPREAD)) for n, t in zip(NETWORKS, scenario.BASELINE_TONNE_KM)},
+    'H2 gCO2 (fossil_fuels)': (22, GENERATION_GCO2[0], 32),
+    'H2 gCO2 (natural_gas)': (9, GENERATION_GCO2[1], 15),
+    'H2 gCO2 (electrolysis)': (GENERATION_GCO2[2], GENERATION_GCO2[2], 3),
+    'H2 gCO2 (biomass)': (-4, GENERATION_GCO2[3], 0),
+    'Limit tonne.km/hr (log2)': (np.log2(500_000), LIMITS['tonne.km/hr'], np.log2(2_000_000)),
+    'Limit gCO2/tonne.km': (80, LIMITS['gco2/tonne.km'], 120),
+}
+OUTPUTS = [f'gco2_{n}' for n in NETWORKS] + [f'score_{n}' for n in NETWORKS]
+
+
+class Scenario(NamedTuple):
+    """Dashboard inputs the uncertainty is evaluated at."""
+    adoption: tuple = (0, 0, 0, 0)
+    generation_mix: tuple = (23, 76, 2, 0)
+    gco2_scaling_factor: float = 1.0
+    tonne_scaling_factor: float = 1.0
+
+
+def distribution_arrays(parameters=PARAMETERS) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    low, mode, high = (np.array(v, dtype=float) for v in zip(*parameters.values()))
+    return low, mode, high
+
+
+def sample(rng: np.random.Generator, n: int, parameters=PARAMETERS) -> np.ndarray:
+    """(n, len(parameters)) draws, by inverting the triangular CDF of uniform draws."""
+    low, mode, high = distribution_arrays(parameters)
+    return triangular_quantile(rng.random((n, len(mode))), low, mode, high)
+
+
+def triangular_quantile(q, low, mode, high) -> np.ndarray:
+    """Inverse CDF of triangular distributions, elementwise. Degenerate ones (low == high) are constant."""
+    q = np.asarray(q, dtype=float)
+    low, mode, high = (np.asarray(v, dtype=float) for v in (low, mode, high))
+    span = np.where(high > low, high - low, 1)
+    split = (mode - low) / span
+    left = low + np.sqrt(q * (span * (mode - low)))
+    right = high - np.sqrt((1 - q) * (span * (high - mode)))
+    return np.where(q < split, left, right)
+
+
+def evaluate_draws(draws: np.ndarray, inputs: Scenario) -> np.ndarray:
+    """(n, len(OUTPUTS)) gCO2 and score of each network for each row of assumption draws."""
+    n_networks = len(NETWORKS)
+    result = scenario.evaluate(
+        adoption=[inputs.adoption],
+        generation_mix=[inputs.generation_mix],
+        gco2_scaling_factor=inputs.gco2_scaling_factor,
+        tonne_scaling_factor=inputs.tonne_scaling_factor,
+        baseline_gco2=draws[:, :n_networks],
+        baseline_tonne_km=draws[:, n_networks:2 * n_networks],
+        generation_gco2=draws[:, 2 * n_networks:2 * n_networks + len(GENERATION_SOURCES)],
+        tonne_km_limit=draws[:, -2],
+        gco2_limit=draws[:, -1],
+    )
+    return np.concatenate([result.gco2, result.score], axis=1)
+
+
+class Histograms:
+    """Fixed-bin histograms of each output column, with exact min, max and mean."""
+
+    def __init__(self, low: np.ndarray, high: np.ndarray, bins: int = BINS):
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.maximum(np.asarray(high, dtype=float), self.low + 1e-9)
+        self.counts = np.zeros((len(self.low), bins), dtype=np.int64)
+        self.min = np.full(len(self.low), np.inf)
+        self.max = np.full(len(self.low), -np.inf)
+        self.sum = np.zeros(len(self.low))
+        self.n = 0
+
+    @classmethod
+    def around(cls, values: np.ndarray, bins: int = BINS, margin: float = 0.25) -> 'Histograms':
+        """Histograms spanning a pilot sample's range plus ``margin`` of it on each side."""
+        low, high = values.min(axis=0), values.max(axis=0)
+        pad = (high - low) * margin
+        return cls(low - pad, high + pad, bins)
+
+    def add(self, values: np.ndarray):
+        bins = self.counts.shape[1]
+        idx = np.clip(((values - self.low) / (self.high - self.low) * bins).astype(np.int64), 0, bins - 1)
+        offsets = np.arange(len(self.low)) * bins
+        self.counts += np.bincount((idx + offsets).ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        self.sum += values.sum(axis=0)
+        self.n += len(values)
+
+    def merge(self, other: 'Histograms'):
+        self.counts += other.counts
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.sum += other.sum
+        self.n += other.n
+
+    def percentiles(self, q=PERCENTILES) -> np.ndarray:
+        """(len(q), n_outputs) percentiles, interpolated within bins and clamped to the exact range."""
+        bins = self.counts.shape[1]
+        edges = self.low[:, None] + (self.high - self.low)[:, None] * np.arange(bins + 1) / bins
+        cdf = np.concatenate([np.zeros((len(self.low), 1)), np.cumsum(self.counts, axis=1)], axis=1) / max(self.n, 1)
+        out = np.array([[np.interp(p / 100, cdf[i], edges[i]) for i in range(len(self.low))] for p in q])
+        return np.clip(out, self.min, self.max)
+
+
+def _chunk_histograms(seed, n: int, inputs: Scenario, low: np.ndarray, high: np.ndarray) -> Histograms:
+    histograms = Histograms(low, high)
+    histograms.add(evaluate_draws(sample(np.random.default_rng(seed), n), inputs))
+    return histograms
+
+
+class Simulation(NamedTuple):
+    samples: int
+    bands: pd.DataFrame  # percentile columns, one row per output
+    point: pd.Series  # outputs at the point assumptions
+
+
+def simulate(inputs: Scenario = Scenario(), samples: int = 100_000, chunk_size: int = CHUNK_SIZE,
+             workers: int = 1, seed: int = 0) -> Simulation:
+    """Percentile bands of every output over ``samples`` draws of the assumptions.
+
+    The first chunk fixes the histogram ranges; results depend only on ``seed``,
+    ``samples`` and ``chunk_size``, not on ``workers``.
+    """
+    if samples < 1:
+        raise ValueError(f'samples must be at least 1, got {samples}')
+    if chunk_size < 1:
+        raise ValueError(f'chunk_size must be at least 1, got {chunk_size}')
+    sizes = [chunk_size] * (samples // chunk_size) + ([samples % chunk_size] if samples % chunk_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    pilot = evaluate_draws(sample(np.random.default_rng(seeds[0]), sizes[0]), inputs)
+    histograms = Histograms.around(pilot)
+    histograms.add(pilot)
+    rest = list(zip(seeds[1:], sizes[1:]))
+
+    if workers <= 1:
+        for chunk_seed, n in rest:
+            histograms.merge(_chunk_histograms(chunk_seed, n, inputs, histograms.low, histograms.high))
+    else:
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_seed, n in rest:
+                pending.append(pool.submit(_chunk_histograms, chunk_seed, n, inputs, histograms.low, histograms.high))
+                if len(pending) >= workers * 2:
+                    histograms.merge(pending.popleft().result())
+            while pending:
+                histograms.merge(pending.popleft().result())
+
+    bands = pd.DataFrame(histograms.percentiles().T, index=OUTPUTS, columns=[f'p{q}' for q in PERCENTILES])
+    bands.insert(0, 'mean', histograms.sum / histograms.n)
+    _, mode, _ = distribution_arrays()
+    point = pd.Series(evaluate_draws(mode[None, :], inputs)[0], index=OUTPUTS)
+    return Simulation(samples, bands, point)
+
+
+def tornado(inputs: Scenario = Scenario(), output: str = 'score', quantiles=TORNADO_QUANTILES) -> pd.DataFrame:
+    """One-at-a-time sensitivity of an output to each assumption, largest swing first.
+
+    ``output`` is a column of OUTPUTS, or 'score'/'gco2' for the mean over networks. Each
+    assumption is moved to its low and high quantile with the others at their point values.
+    """
+    low, mode, high = distribution_arrays()
+    n = len(mode)
+    q_low, q_high = (triangular_quantile(q, low, mode, high) for q in quantiles)
+    draws = np.tile(mode, (2 * n + 1, 1))
+    draws[np.arange(n), np.arange(n)] = q_low
+    draws[n + np.arange(n), np.arange(n)] = q_high
+    values = evaluate_draws(draws, inputs)
+    if output in OUTPUTS:
+        values = values[:, OUTPUTS.index(output)]
+    else:
+        values = values[:, [i for i, name in enumerate(OUTPUTS) if name.startswith(f'{output}_')]].mean(axis=1)
+
+    frame = pd.DataFrame({
+        'assumption': list(PARAMETERS),
+        'low_value': q_low,
+        'high_value': q_high,
+        'output_at_low': values[:n],
+        'output_at_high': values[n:2 * n],
+    })
+    frame['swing'] = (frame['output_at_high'] - frame['output_at_low']).abs()
+    frame.attrs['point'] = values[-1]
+    return frame.sort_values('swing', ascending=False, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo uncertainty of the network scores.")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--adoption", type=float, nargs=4, default=Scenario().adoption, metavar=NETWORKS)
+    parser.add_argument("--generation-mix", type=float, nargs=4, default=Scenario().generation_mix, metavar=GENERATION_SOURCES)
+    args = parser.parse_args(argv)
+
+    inputs = Scenario(tuple(args.adoption), tuple(args.generation_mix))
+    result = simulate(inputs, args.samples, args.chunksize, args.workers, args.seed)
+    print(result.bands.assign(point=result.point).to_string())
+    print()
+    print(tornado(inputs).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
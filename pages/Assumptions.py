@@ -1,28 +1,93 @@
 import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
 
-# GCO2: https://www.ecta.com/wp-content/uploads/2021/03/ECTA-CEFIC-GUIDELINE-FOR-MEASURING-AND-MANAGING-CO2-ISSUE-1.pdf
-
-ASSUMPTIONS = {
-    "tonne.km/hr": {
-      "air": "100000",
-      "rail": "300000",
-      "road_interstate": "1500",
-      "road_urban": "180"
-    },
-    "gco2/tonne.km": {
-      "air": "602",
-      "rail": "22",
-      "road_interstate": "62",
-      "road_urban": "50"
-    }
-}
+from freight import uncertainty
+from freight.assumptions import ASSUMPTIONS, NETWORKS
 
 assumptions_df = pd.DataFrame(ASSUMPTIONS)
 assumptions_df.columns = ["(Tonne KM) / Hour", "GCO2 / (Tonne KM)"]
 assumptions_df.index = ["Air", "Rail", "Road (Interstate)", "Road (Urban)"]
 
-if __name__ == "__main__": 
+NETWORK_LABELS = dict(zip(NETWORKS, assumptions_df.index))
+# Capped so a rerun stays interactive; `python -m freight.uncertainty` runs larger sample counts.
+SAMPLE_BUDGETS = [25_000, 50_000, 100_000, 200_000]
+# Used when the dashboard hasn't been opened in this session.
+DEFAULT_SCENARIO = uncertainty.Scenario(adoption=(50, 50, 50, 50))
+
+
+@st.cache_data
+def run_simulation(inputs: tuple, samples: int):
+    return uncertainty.simulate(uncertainty.Scenario(*inputs), samples)
+
+
+@st.cache_data
+def run_tornado(inputs: tuple, output: str):
+    return uncertainty.tornado(uncertainty.Scenario(*inputs), output)
+
+
+def score_bands_chart(bands: pd.DataFrame, point: pd.Series):
+    """Box per network drawn from the precomputed percentiles, whiskers at p5 and p95."""
+    rows = [f'score_{n}' for n in NETWORKS]
+    fig = go.Figure(go.Box(
+        x=[NETWORK_LABELS[n] for n in NETWORKS],
+        lowerfence=bands.loc[rows, 'p5'], q1=bands.loc[rows, 'p25'], median=bands.loc[rows, 'p50'],
+        q3=bands.loc[rows, 'p75'], upperfence=bands.loc[rows, 'p95'], mean=point[rows],
+        name='Score', boxmean=True,
+    ))
+    fig.update_layout(margin=dict(l=20, r=20, t=30, b=0), yaxis_title='Score (p5 to p95)')
+    return fig
+
+
+def tornado_chart(frame: pd.DataFrame, top: int = 10):
+    frame = frame.head(top).iloc[::-1]
+    point = frame.attrs['point']
+    fig = go.Figure([
+        go.Bar(y=frame['assumption'], x=frame['output_at_low'] - point, base=point, orientation='h', name='Assumption at p10'),
+        go.Bar(y=frame['assumption'], x=frame['output_at_high'] - point, base=point, orientation='h', name='Assumption at p90'),
+    ])
+    fig.update_layout(barmode='overlay', margin=dict(l=20, r=20, t=30, b=0), legend=dict(orientation='h', y=-0.15))
+    return fig
+
+
+if __name__ == "__main__":
   st.title('Assumptions')
   st.dataframe(assumptions_df, use_container_width=True)
 
+  st.subheader('Uncertainty')
+  st.write("Each assumption is treated as a triangular distribution around its point value, and the network "
+           "scores are recomputed for every draw.")
+  st.dataframe(
+      pd.DataFrame(uncertainty.PARAMETERS, index=['Low', 'Point value', 'High']).T,
+      use_container_width=True,
+  )
+
+  dashboard_inputs = st.session_state.get('scenario_inputs')
+  if dashboard_inputs is None:
+    inputs = DEFAULT_SCENARIO
+    st.caption(f"Evaluated at {inputs.adoption[0]}% hydrogen adoption on every network. "
+               "Open the dashboard to use its scenario instead.")
+  else:
+    inputs = uncertainty.Scenario(
+        tuple(dashboard_inputs['adoption']), tuple(dashboard_inputs['generation']),
+        dashboard_inputs['gco2_scaling_factor'], dashboard_inputs['tonne_scaling_factor'],
+    )
+    st.caption("Evaluated at the scenario selected on the dashboard.")
+
+  samples = st.select_slider(
+    'Samples', SAMPLE_BUDGETS, value=SAMPLE_BUDGETS[-1], format_func=lambda n: f'{n:,}',
+    help='For more samples, run `python -m freight.uncertainty --samples N`.',
+  )
+  simulation = run_simulation(tuple(inputs), samples)
+
+  u1, u2 = st.columns(2)
+  u1.write('###### Score by network')
+  u1.plotly_chart(score_bands_chart(simulation.bands, simulation.point), use_container_width=True)
+  u2.write('###### Percentile bands')
+  u2.dataframe(simulation.bands.assign(point=simulation.point).round(3), use_container_width=True)
+
+  st.write('###### Sensitivity')
+  outputs = {'score': 'Mean score', 'gco2': 'Mean gCO2/tonne.km', **{o: o for o in uncertainty.OUTPUTS}}
+  output = st.selectbox('Output', list(outputs), format_func=outputs.get)
+  st.plotly_chart(tornado_chart(run_tornado(tuple(inputs), output)), use_container_width=True)
+  st.caption("Each bar moves one assumption to its 10th or 90th percentile with the others at their point values.")
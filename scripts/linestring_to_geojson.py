@@ -1,42 +1,139 @@
 #!/usr/bin/python3
 
+"""Designed specifically to convert the geometries_2020.csv file to GeoJSON.
+
+Rows are streamed through a CSV reader and written out one feature at a time, so memory
+stays flat regardless of input size. Every column other than the geometry column
+(e.g. route_name) is kept as a feature property, with numeric fields as numbers.
+"""
+
 import argparse
+import csv
+import json
+import math
 import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+GEOMETRY_COLUMN = "route_geom"
+WKT_PREFIX = "LINESTRING"
+# Plain numeric literals only: Python's int() and float() also accept '1_000', padding and
+# 'nan'. Zero-padded integers such as postcodes stay strings.
+INT_LITERAL = re.compile(r"-?(0|[1-9][0-9]*)")
+FLOAT_LITERAL = re.compile(r"-?((0|[1-9][0-9]*)(\.[0-9]*)?|\.[0-9]+)([eE][-+]?[0-9]+)?")
+
+# Route geometries are single, very long fields.
+csv.field_size_limit(sys.maxsize)
+
+
+def read_rows(filename: str):
+    """Yields each CSV row as a dict, without reading the whole file."""
+    with open(filename, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def linestring_coordinates(wkt: str) -> str | None:
+    """Converts 'LINESTRING (lng lat, lng lat)' to a GeoJSON coordinate array, keeping the
+    original number formatting. Returns None if the value isn't a LINESTRING."""
+    wkt = wkt.strip()
+    if not wkt.startswith(WKT_PREFIX):
+        return None
+    start, end = wkt.find("("), wkt.rfind(")")
+    if start < 0 or end < start:
+        return None
+    points = wkt[start + 1:end].strip()
+    if not points:
+        return None
+    # Any Z or M value after lng and lat is dropped.
+    pairs = (point.split()[:2] for point in points.split(","))
+    return "[" + ", ".join(f"[{lng}, {lat}]" for lng, lat in pairs) + "]"
+
+
+def parse_value(value: str):
+    """Converts a CSV field to an int or float where it's a plain numeric literal; empty fields become None."""
+    if value is None or value == "":
+        return None
+    if INT_LITERAL.fullmatch(value):
+        return int(value)
+    if not FLOAT_LITERAL.fullmatch(value):
+        return value
+    number = float(value)
+    # Overflowing exponents would give 'inf', which is invalid JSON.
+    return number if math.isfinite(number) else value
+
+
+def to_feature(row: dict, geometry_column: str = GEOMETRY_COLUMN) -> str | None:
+    coordinates = linestring_coordinates(row.get(geometry_column) or "")
+    if coordinates is None:
+        return None
+    properties = {k: parse_value(v) for k, v in row.items() if k != geometry_column}
+    return (
+        '{ "type": "Feature", "properties": ' + json.dumps(properties)
+        + ', "geometry": { "type": "LineString", "coordinates": ' + coordinates + "}}"
+    )
+
+
+def to_features(rows, geometry_column: str = GEOMETRY_COLUMN) -> list[str]:
+    features = (to_feature(row, geometry_column) for row in rows)
+    return [f for f in features if f is not None]
+
+
+def chunked(iterable, size: int):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def iter_features(rows, geometry_column: str = GEOMETRY_COLUMN, workers: int = 1, chunksize: int = 500):
+    """Yields GeoJSON feature strings in input order.
+
+    With more than one worker, rows are converted in chunks across a process pool with a
+    bounded number of chunks in flight.
+    """
+    if workers <= 1:
+        for row in rows:
+            feature = to_feature(row, geometry_column)
+            if feature is not None:
+                yield feature
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunked(rows, chunksize):
+            pending.append(pool.submit(to_features, chunk, geometry_column))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_geojson(features, out) -> int:
+    """Writes features as a FeatureCollection to a text stream. Returns the feature count."""
+    out.write('{"type": "FeatureCollection", "features": [\n')
+    count = 0
+    for feature in features:
+        if count:
+            out.write(",\n")
+        out.write(feature)
+        count += 1
+    out.write("]}\n")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filename", type=str, help="Filename of the input CSV")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Output GeoJSON file (default: stdout)")
+    parser.add_argument("--geometry-column", type=str, default=GEOMETRY_COLUMN, help="Column holding the WKT LINESTRING")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=500, help="Rows per worker chunk")
+    args = parser.parse_args()
 
-"""Designed specifically to convert the geometries_2020.csv file to GeoJSON."""
-
-
-def load_file(filename: str):
-    with open(filename) as f:
-        return f.readlines()
-
-
-def to_geojson(lines):
-    output = '{"type": "FeatureCollection", "features": [\n'
-    pattern = re.compile(".*LINESTRING \((.*)\)")
-    lines_printed = 0
-    for line in lines:
-        m = pattern.match(line)
-        if m:
-            if lines_printed == 0:
-                output += "\n"
-            else:
-                output += ",\n"
-            lines_printed += 1
-            output += '{ "type": "Feature", "properties": {}, "geometry": { "type": "LineString", "coordinates": ['
-            points = m.group(1).split(", ")
-            for i, point in enumerate(points):
-                lng, lat = point.split(" ")
-                if i != 0:
-                    output += ", "
-                output += f"[{lng}, {lat}]"
-            output += "]}}"
-    output += "]}\n"
-    return output
-
-
-parser = argparse.ArgumentParser()
-parser.add_argument("filename", type=str, help="Filename of the input CSV")
-args = parser.parse_args()
-
-print(to_geojson(load_file(args.filename)))
+    features = iter_features(read_rows(args.filename), args.geometry_column, args.workers, args.chunksize)
+    if args.output:
+        with open(args.output, "w") as out:
+            write_geojson(features, out)
+    else:
+        write_geojson(features, sys.stdout)
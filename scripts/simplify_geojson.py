@@ -1,28 +1,131 @@
 #!/usr/bin/python3
 
+"""Builds level-of-detail simplifications of a GeoJSON file, one per zoom band.
+
+The source is parsed once, small geometries are filtered and the remaining ones are
+simplified with shapely's vectorized array functions, optionally split across a process
+pool. Feature properties are kept. For every level a FeatureCollection is written to
+``<output_dir>/<stem>_z<min>-<max>.geojson`` along with a ``<stem>_levels.json`` manifest,
+and the vertex and size reduction per level is reported.
+"""
+
 import argparse
-from shapely import from_geojson, to_geojson, GeometryCollection
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+
+# Importable when run as a script, from the repository root or elsewhere.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from freight.geo import DETAIL_LEVELS, load_features  # noqa: E402
+
+# (min_zoom, max_zoom, simplify tolerance, bound threshold) in degrees, shared with the
+# dashboard's spatial index.
+LEVELS = DETAIL_LEVELS
+SIMPLIFY_TOLERANCE, BOUND_THRESHOLD = LEVELS[0][2:]
+
+
+def large_enough(geoms: np.ndarray, threshold: float = BOUND_THRESHOLD) -> np.ndarray:
+    """Returns a mask of geometries with some dimension bigger than ``threshold``."""
+    bounds = shapely.bounds(geoms)
+    return (np.abs(bounds[:, 2] - bounds[:, 0]) >= threshold) | (np.abs(bounds[:, 3] - bounds[:, 1]) >= threshold)
+
+
+def simplify_levels(geoms: np.ndarray, levels=LEVELS) -> list[np.ndarray]:
+    """Simplifies ``geoms`` for each level. Geometries dropped at a level are None."""
+    outputs = []
+    for _, _, tolerance, threshold in levels:
+        simplified = np.full(len(geoms), None, dtype=object)
+        mask = large_enough(geoms, threshold)
+        simplified[mask] = shapely.simplify(geoms[mask], tolerance)
+        outputs.append(simplified)
+    return outputs
+
+
+def simplify_levels_parallel(geoms: np.ndarray, levels=LEVELS, workers: int = 1) -> list[np.ndarray]:
+    if workers <= 1 or len(geoms) < workers * 2:
+        return simplify_levels(geoms, levels)
+    chunks = np.array_split(geoms, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(simplify_levels, chunks, [levels] * len(chunks)))
+    return [np.concatenate([r[i] for r in results]) for i in range(len(levels))]
+
+
+def write_features(geoms: np.ndarray, properties: list[dict], out) -> int:
+    """Writes non-empty geometries as a FeatureCollection. Returns the feature count."""
+    keep = np.flatnonzero(~(shapely.is_missing(geoms) | shapely.is_empty(geoms)))
+    geometries = shapely.to_geojson(geoms[keep])
+    out.write('{"type": "FeatureCollection", "features": [\n')
+    for n, (i, geometry) in enumerate(zip(keep, geometries)):
+        if n:
+            out.write(",\n")
+        out.write('{"type": "Feature", "properties": ' + json.dumps(properties[i]) + ', "geometry": ' + geometry + "}")
+    out.write("]}\n")
+    return len(keep)
+
+
+def vertex_count(geoms: np.ndarray) -> int:
+    return int(shapely.get_num_coordinates(geoms[~shapely.is_missing(geoms)]).sum())
+
+
+def build_levels(filename: str, output_dir: str, levels=LEVELS, workers: int = 1) -> list[dict]:
+    """Writes one simplified file per level and a manifest. Returns per-level stats."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    source_bytes = os.path.getsize(filename)
+    geoms, properties = load_features(filename)
+    source_vertices = vertex_count(geoms)
+
+    os.makedirs(output_dir, exist_ok=True)
+    stats = []
+    for (min_zoom, max_zoom, tolerance, threshold), simplified in zip(levels, simplify_levels_parallel(geoms, levels, workers)):
+        path = os.path.join(output_dir, f"{stem}_z{min_zoom}-{max_zoom}.geojson")
+        with open(path, "w") as out:
+            features = write_features(simplified, properties, out)
+        vertices = vertex_count(simplified)
+        size = os.path.getsize(path)
+        stats.append({
+            "path": os.path.basename(path),
+            "min_zoom": min_zoom,
+            "max_zoom": max_zoom,
+            "tolerance": tolerance,
+            "bound_threshold": threshold,
+            "features": features,
+            "vertices": vertices,
+            "bytes": size,
+            "vertex_reduction": 1 - vertices / max(source_vertices, 1),
+            "size_reduction": 1 - size / max(source_bytes, 1),
+        })
 
-BOUND_THRESHOLD = 0.1
-SIMPLIFY_TOLERANCE = 1
+    manifest = {
+        "source": os.path.basename(filename),
+        "source_features": len(geoms),
+        "source_vertices": source_vertices,
+        "source_bytes": source_bytes,
+        "levels": stats,
+    }
+    with open(os.path.join(output_dir, f"{stem}_levels.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return stats
 
-def load_file(filename: str) -> str:
-    with open(filename) as f:
-        return f.read()
 
-def large_enough(geom) -> bool:
-    """Returns whether a geometry has some dimension bigger than BOUND_THRESHOLD."""
-    bounds = geom.bounds
-    return abs(bounds[2] - bounds[0]) >= BOUND_THRESHOLD or abs(bounds[3] - bounds[1]) >= BOUND_THRESHOLD
+def print_report(stats: list[dict], out=sys.stderr):
+    print(f"{'level':<12}{'features':>10}{'vertices':>12}{'bytes':>12}{'-vertices':>11}{'-bytes':>9}", file=out)
+    for s in stats:
+        print(
+            f"z{s['min_zoom']}-{s['max_zoom']:<9}{s['features']:>10}{s['vertices']:>12}{s['bytes']:>12}"
+            f"{s['vertex_reduction']:>11.1%}{s['size_reduction']:>9.1%}",
+            file=out,
+        )
 
-def simplify(geojson: str) -> str:
-    geometry = from_geojson(geojson)
-    # Filter out any geometries smaller than BOUND_THRESHOLD, and simplify remaining geometries.
-    simplified = [g.simplify(SIMPLIFY_TOLERANCE) for g in geometry.geoms if large_enough(g)]
-    return to_geojson(GeometryCollection(simplified))
 
-parser = argparse.ArgumentParser()
-parser.add_argument("filename", type=str, help="Filename of the input GeoJSON")
-args = parser.parse_args()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filename", type=str, help="Filename of the input GeoJSON")
+    parser.add_argument("-o", "--output-dir", type=str, default="data/simplified", help="Directory for the simplified levels")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args()
 
-print(simplify(load_file(args.filename)))
+    print_report(build_levels(args.filename, args.output_dir, workers=args.workers))
@@ -0,0 +1,54 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from freight import airports
+from freight.artifacts import AIRPORTS_CSV, read_meta
+
+
+def test_gravity_flows_send_half_of_each_airports_tonnes_elsewhere():
+    tonnes = np.array([100.0, 50.0, 25.0, 0.0, 10.0])
+    flows = airports.gravity_flows(tonnes)
+    np.testing.assert_allclose(flows.sum(axis=1), tonnes / 2)
+    np.testing.assert_array_equal(np.diag(flows), 0)
+    # Each origin's tonnes are split in proportion to the destinations' own tonnes.
+    np.testing.assert_allclose(flows[0, 1] / flows[0, 2], 2)
+
+
+def test_pair_table_has_no_self_pairs():
+    pairs = airports.pair_table(np.arange(1.0, 6.0))
+    assert len(pairs) == 5 * 4
+    assert (pairs['origin'] != pairs['destination']).all()
+    assert pairs['weight'].max() == 1
+
+
+@pytest.fixture
+def sources(tmp_path):
+    locations, cargo = tmp_path / 'locations.csv', tmp_path / 'cargo.csv'
+    shutil.copy(AIRPORTS_CSV, locations)
+    shutil.copy(airports.CARGO_CSV, cargo)
+    return str(tmp_path / 'compiled'), str(locations), str(cargo)
+
+
+def test_cargo_change_rebuilds_only_the_pairs(sources):
+    artifacts_dir, locations, cargo = sources
+    assert airports.build(artifacts_dir, locations, cargo) == ['airports', 'pairs']
+    assert airports.build(artifacts_dir, locations, cargo) == []
+
+    with open(cargo, 'a') as f:
+        f.write('999,2099,1,1,1,1,1,1,10\n')
+    meta = read_meta(airports.NAME, artifacts_dir)
+    assert airports.stale_stages(meta, locations, cargo) == ['pairs']
+    assert airports.build(artifacts_dir, locations, cargo) == ['pairs']
+    assert read_meta(airports.NAME, artifacts_dir)['period'][-1] == '2099-01'
+
+
+def test_unknown_cargo_city_is_rejected(sources):
+    _, _, cargo = sources
+    with open(cargo, encoding='utf-8-sig') as f:
+        header, *rows = f.read().splitlines()
+    with open(cargo, 'w') as f:
+        f.write('\n'.join([header + ',Darwin', *(row + ',1' for row in rows)]) + '\n')
+    with pytest.raises(KeyError, match='Darwin'):
+        airports.read_cargo(cargo)
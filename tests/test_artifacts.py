@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+import shapely
+
+from freight import artifacts
+from freight.geo import load_features
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """Copies of one table and two GeoJSON sources, registered as the only artifacts."""
+    table = tmp_path / 'metric_tonnekm.json'
+    shutil.copy('data/raw/metric_tonnekm.json', table)
+    geojson = [tmp_path / 'seaports.geojson', tmp_path / 'airports.geojson']
+    for path in geojson:
+        shutil.copy(f'data/raw/{path.name}', path)
+    monkeypatch.setattr(artifacts, 'TABLES', {'metric_tonnekm': (str(table), pd.read_json)})
+    monkeypatch.setattr(artifacts, 'GEOJSON', [str(path) for path in geojson])
+    return str(tmp_path / 'compiled'), table, geojson
+
+
+def rewrite(path, old: str, new: str):
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new, 1))
+
+
+def test_build_skips_fresh_artifacts_and_rebuilds_changed_ones(sources):
+    compiled, table, (seaports, _) = sources
+    assert artifacts.build(compiled) == ['metric_tonnekm', 'seaports', 'airports']
+    assert artifacts.build(compiled) == []
+
+    # A new mtime with the same contents is still fresh, by hash.
+    os.utime(seaports, ns=(0, 0))
+    assert artifacts.build(compiled) == []
+
+    # A same-size edit is caught by the hash, not just the size.
+    text = seaports.read_text()
+    digit = next(c for c in text if c.isdigit() and c != '9')
+    rewrite(seaports, digit, str(int(digit) + 1))
+    assert artifacts.build(compiled) == ['seaports']
+    rewrite(table, '"180"', '"181"')
+    assert artifacts.build(compiled) == ['metric_tonnekm']
+
+
+def test_stale_artifact_falls_back_to_the_source(sources):
+    compiled, _, (seaports, _) = sources
+    artifacts.build(compiled)
+    assert artifacts.load_geometry(str(seaports), compiled) is not None
+    geoms, _ = load_features(str(seaports))
+    assert shapely.equals_exact(artifacts.geometries(str(seaports), compiled), geoms, 0).all()
+
+    moved = shapely.get_coordinates(geoms[0])[0]
+    rewrite(seaports, repr(float(moved[0])), repr(float(moved[0]) + 1))
+    assert not artifacts.is_fresh(artifacts.read_meta('seaports', compiled), str(seaports))
+    assert artifacts.load_geometry(str(seaports), compiled) is None
+    assert shapely.get_coordinates(artifacts.geometries(str(seaports), compiled)[0])[0][0] == moved[0] + 1
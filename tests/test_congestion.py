@@ -0,0 +1,73 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from freight import congestion
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    directory = tmp_path / 'csv'
+    directory.mkdir()
+    for filename in ('route_metrics_2020.csv', 'citywide_indices_2020.csv', 'route_times_2020.csv'):
+        shutil.copy(os.path.join(congestion.CONGESTION_DIR, filename), directory / filename)
+    return str(directory)
+
+
+def row_count(con, table):
+    return con.execute(f'SELECT count(*) FROM {table}').fetchone()[0]
+
+
+def test_connect_builds_then_reuses_the_database(tmp_path, csv_dir):
+    db_path = str(tmp_path / 'congestion.db')
+    with congestion.connect(db_path, csv_dir) as con:
+        assert congestion.tables(con) == ['citywide_indices', 'route_metrics', 'route_times']
+    built = os.stat(db_path).st_mtime_ns
+    with congestion.connect(db_path, csv_dir) as con:
+        assert congestion.is_fresh(con, csv_dir)
+    assert os.stat(db_path).st_mtime_ns == built
+
+
+def test_connect_rebuilds_when_a_csv_changes(tmp_path, csv_dir):
+    db_path = str(tmp_path / 'congestion.db')
+    with congestion.connect(db_path, csv_dir) as con:
+        cities = row_count(con, 'citywide_indices')
+    path = os.path.join(csv_dir, 'citywide_indices_2020.csv')
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, 'w') as f:
+        f.writelines(lines[:-1])
+    with congestion.connect(db_path, csv_dir) as con:
+        assert row_count(con, 'citywide_indices') == cities - 1
+
+
+def test_connect_rebuilds_when_a_csv_is_removed(tmp_path, csv_dir):
+    db_path = str(tmp_path / 'congestion.db')
+    congestion.connect(db_path, csv_dir).close()
+    os.remove(os.path.join(csv_dir, 'citywide_indices_2020.csv'))
+    with congestion.connect(db_path, csv_dir) as con:
+        assert 'citywide_indices' not in congestion.tables(con)
+
+
+def test_concurrent_builds_leave_one_complete_database(tmp_path, csv_dir):
+    db_path = str(tmp_path / 'congestion.db')
+    errors = []
+
+    def build():
+        try:
+            congestion.build(db_path, csv_dir)
+        except Exception as e:  # noqa: BLE001 - reported by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert sorted(os.listdir(tmp_path)) == ['congestion.db', 'csv']
+    with congestion.connect(db_path, csv_dir) as con:
+        assert congestion.is_fresh(con, csv_dir)
+        assert row_count(con, 'route_times') > 0
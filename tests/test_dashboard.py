@@ -0,0 +1,49 @@
+import os
+
+import pandasai.llm
+import pytest
+import streamlit as st
+from pandasai.llm.fake import FakeLLM
+from streamlit.testing.v1 import AppTest
+
+from freight import gpt
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Dashboard.py')
+
+
+@pytest.fixture
+def chats(monkeypatch):
+    """Runs the dashboard against an LLM that always fails, and records the prompts it's asked."""
+    asked = []
+    chat = gpt.FreightGPT.chat
+
+    def counting_chat(self, prompt):
+        asked.append(prompt)
+        return chat(self, prompt)
+
+    monkeypatch.setattr(gpt.FreightGPT, 'chat', counting_chat)
+    monkeypatch.setattr(pandasai.llm, 'OpenAI', lambda api_key: FakeLLM(output="raise RuntimeError('boom')"))
+    monkeypatch.setenv('FREIGHT_GPT_CACHE', ':memory:')
+    monkeypatch.chdir(os.path.dirname(DASHBOARD))  # the dashboard reads data/ relative to the repository
+    monkeypatch.syspath_prepend(os.path.dirname(DASHBOARD))
+    st.cache_resource.clear()
+    yield asked
+    st.cache_resource.clear()
+
+
+def test_unchanged_failing_prompt_is_asked_once(chats):
+    at = AppTest.from_file(DASHBOARD, default_timeout=300)
+    at.secrets['OPEN_AI_API_KEY'] = 'sk-test'
+    at.run()
+    prompt = next(w for w in at.text_input if w.label == 'Prompt:')
+    prompt.input('Which route has the most congestion?').run()
+    assert not at.exception
+    assert 'try again' in at.caption[-1].value
+
+    at.slider[0].set_value(1.5).run()
+    at.checkbox[0].check().run()
+    assert not at.exception
+    assert chats == ['Which route has the most congestion?']
+
+    at.button[0].click().run()
+    assert len(chats) == 2
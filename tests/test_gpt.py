@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+from pandasai.llm.fake import FakeLLM
+
+from freight import gpt
+
+ROUTE_METRICS = pd.DataFrame({
+    'route_name': ['32 - Derrimut to Montrose', '32 - Montrose to Derrimut', 'A14 - Port Road to Southern Expressway'],
+    'max_median_travel_time': [5074, 4800, 1900],
+    'max_median_travel_hour': [15, 8, 17],
+    'min_median_travel_time': [4198, 4000, 1500],
+    'min_median_travel_hour': [4, 3, 2],
+    'max_iq_travel_time': [5179, 5000, 2000],
+    'max_iq_travel_hour': [15, 8, 17],
+    'min_iq_travel_time': [2680, 2500, 900],
+    'min_iq_travel_hour': [4, 3, 2],
+    'peak_time_to_best_ratio': [1.209, 1.2, 1.267],
+})
+ANSWER = "result = {'type': 'string', 'value': 'Stand-in answer'}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(gpt, 'time', clock)
+    return clock
+
+
+@pytest.mark.parametrize('prompt, expected', [
+    ('What is the max median travel time for 32 - Derrimut to Montrose?',
+     'The max median travel time for 32 - Derrimut to Montrose is 01:24:34, at 15:00.'),
+    ('lowest median travel time on 32 - montrose to derrimut',
+     'The min median travel time for 32 - Montrose to Derrimut is 01:06:40, at 03:00.'),
+    ('Peak time to best ratio of A14 - Port Road to Southern Expressway',
+     'The peak time to best ratio for A14 - Port Road to Southern Expressway is 1.267.'),
+])
+def test_answer_directly(prompt, expected):
+    assert gpt.answer_directly(prompt, ROUTE_METRICS) == expected
+
+
+@pytest.mark.parametrize('prompt', [
+    'What is the max median travel time for 32 - Derrimut to Montrose at 8am?',
+    'max median travel time for 32 - Derrimut to Montrose in winter',
+    'What is the max median travel time on route 99?',
+    'What is the max median travel time for 32?',  # names neither direction in full
+    'How many routes are there?',
+])
+def test_answer_directly_leaves_other_questions_to_the_llm(prompt):
+    assert gpt.answer_directly(prompt, ROUTE_METRICS) is None
+
+
+def test_find_route_prefers_the_longest_name():
+    names = ['A1 - X to Y', 'A1 - X to Y Extended']
+    assert gpt.find_route('travel time on a1 - x to y extended', names) == 'A1 - X to Y Extended'
+
+
+def test_cache_key_ignores_case_and_punctuation():
+    assert gpt.AnswerCache.key('Max  travel time?', 'f') == gpt.AnswerCache.key('max travel time', 'f')
+    assert gpt.AnswerCache.key('max travel time', 'f') != gpt.AnswerCache.key('max travel time', 'g')
+
+
+def test_cache_expires_entries_after_ttl(clock):
+    cache = gpt.AnswerCache(':memory:', ttl=60)
+    cache.put('a', 'answer')
+    clock.now += 59
+    assert cache.get('a') == 'answer'
+    clock.now += 2
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = gpt.AnswerCache(':memory:', max_entries=2)
+    for key in ('a', 'b'):
+        cache.put(key, key.upper())
+        clock.now += 1
+    assert cache.get('a') == 'A'
+    clock.now += 1
+    cache.put('c', 'C')
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
+
+
+@pytest.fixture
+def frames(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # pandasai writes its log and exports to the working directory
+    return {'route_metrics': ROUTE_METRICS}
+
+
+def test_ask_answers_from_data_then_cache(frames):
+    freight_gpt = gpt.FreightGPT(frames, FakeLLM(output=ANSWER), gpt.AnswerCache(':memory:'))
+    prompt = 'max median travel time for 32 - Derrimut to Montrose'
+    assert freight_gpt.ask(prompt)[1] == 'data'
+    assert freight_gpt.ask(prompt.upper() + '?')[1] == 'cache'
+
+
+def test_ask_answers_from_llm_then_cache(frames):
+    freight_gpt = gpt.FreightGPT(frames, FakeLLM(output=ANSWER), gpt.AnswerCache(':memory:'))
+    assert freight_gpt.ask('Which route is longest?') == ('Stand-in answer', 'llm')
+    assert freight_gpt.ask('Which route is longest?') == ('Stand-in answer', 'cache')
+    assert len(freight_gpt.datalake.memory.all()) == 2  # this question and its answer only
+
+
+def test_ask_does_not_cache_failures(frames):
+    cache = gpt.AnswerCache(':memory:')
+    failing = gpt.FreightGPT(frames, FakeLLM(output="raise RuntimeError('boom')"), cache)
+    answer, source = failing.ask('Which route is longest?')
+    assert source == 'error'
+    assert answer.startswith('Unfortunately')
+    assert len(cache) == 0
+
+    working = gpt.FreightGPT(frames, FakeLLM(output=ANSWER), cache)
+    assert working.ask('Which route is longest?') == ('Stand-in answer', 'llm')
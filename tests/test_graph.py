@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from freight.graph import Graph, Keyed, fingerprint
+
+
+def counting_graph():
+    graph, calls = Graph(), []
+
+    @graph.node
+    def total(values):
+        calls.append('total')
+        return float(np.sum(values))
+
+    @graph.node
+    def rows(table):
+        calls.append('rows')
+        return len(table)
+
+    return graph, calls
+
+
+def test_changed_input_invalidates_node():
+    graph, calls = counting_graph()
+    values = np.arange(10.0)
+    assert graph.value('total', values=values) == 45
+    assert graph.value('total', values=values.copy()) == 45
+    assert calls == ['total']
+
+    values = values.copy()
+    values[0] = 100
+    assert graph.value('total', values=values) == 145
+    assert calls == ['total', 'total']
+
+
+def test_keyed_inputs_are_compared_by_key():
+    graph, calls = counting_graph()
+    table = pd.DataFrame({'a': range(1000)})
+    assert graph.value('rows', table=Keyed(fingerprint(table), table)) == 1000
+    assert graph.value('rows', table=Keyed(fingerprint(table.copy()), table.copy())) == 1000
+    assert calls == ['rows']
+
+    changed = table.iloc[:10]
+    assert graph.value('rows', table=Keyed(fingerprint(changed), changed)) == 10
+    assert calls == ['rows', 'rows']
+
+
+def test_unkeyed_opaque_input_is_rejected():
+    graph, _ = counting_graph()
+    with pytest.raises(TypeError, match="'table'"):
+        graph.value('rows', table=pd.DataFrame({'a': range(1000)}))
+    with pytest.raises(TypeError, match="'values'"):
+        graph.value('total', values=np.arange(100_000.0))
+
+
+def test_fingerprint_follows_content():
+    frame = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    value = (['route 1', 'route 2'], np.ones((2, 24)), {'arcs': frame})
+    assert fingerprint(value) == fingerprint((['route 1', 'route 2'], np.ones((2, 24)), {'arcs': frame.copy()}))
+    assert fingerprint(value) != fingerprint((['route 1', 'route 3'], np.ones((2, 24)), {'arcs': frame}))
+    assert fingerprint(np.ones(4)) != fingerprint(np.ones(4, dtype=np.float32))
+    with pytest.raises(TypeError):
+        fingerprint(object())
@@ -0,0 +1,46 @@
+import base64
+import re
+
+import numpy as np
+import pandas as pd
+
+from freight import hourly
+from freight.profiles import HOURS, HourlyProfiles
+
+
+def test_color_table_shape_and_range():
+    ratios = np.array([[1.0, 1.25, hourly.RATIO_LIMIT, 3.0, np.nan, 0.9]])
+    table = hourly.color_table(ratios)
+    assert table.shape == (1, 6, 4) and table.dtype == np.uint8
+    np.testing.assert_array_equal(table[0, 0], (0, 255, 0, 255))  # the best hour is green
+    np.testing.assert_array_equal(table[0, 1], (127, 127, 0, 255))
+    np.testing.assert_array_equal(table[0, 2], (255, 0, 0, 255))  # red from the limit on
+    np.testing.assert_array_equal(table[0, 3], (255, 0, 0, 255))
+    np.testing.assert_array_equal(table[0, 4], hourly.MISSING_COLOR)
+    np.testing.assert_array_equal(table[0, 5], (0, 255, 0, 255))
+
+    ramp = hourly.color_table(np.linspace(1, hourly.RATIO_LIMIT, 50)[None])[0]
+    assert (np.diff(ramp[:, 0].astype(int)) >= 0).all() and (np.diff(ramp[:, 1].astype(int)) <= 0).all()
+    assert (ramp[:, 0].astype(int) + ramp[:, 1] >= 254).all() and (ramp[:, 2:] == (0, 255)).all()
+
+
+def test_congestion_colors_cover_every_route_and_hour():
+    hours = np.arange(HOURS)
+    frame = pd.DataFrame({
+        'route_name': ['b'] * HOURS + ['a'] * 3,
+        'hour': np.concatenate([hours, [0, 8, 17]]),
+        'lq_est': 1.0, 'uq_est': 1.0,
+        'med_est': np.concatenate([600 + 30 * np.abs(hours - 8), [100, 200, 100]]),
+    })
+    routes, ratios, colors = hourly.congestion_colors(HourlyProfiles.from_frame(frame))
+    assert routes == ['a', 'b']
+    assert ratios.shape == (2, HOURS) and colors.shape == (2, HOURS, 4)
+    assert np.nanmin(ratios, axis=1).tolist() == [1, 1]
+    assert np.isnan(ratios[0]).sum() == HOURS - 3
+    np.testing.assert_array_equal(colors[0, 1], hourly.MISSING_COLOR)
+    np.testing.assert_array_equal(colors[1, 8], (0, 255, 0, 255))
+
+    html = hourly.map_html('"tiles/{z}/{x}/{y}.pbf"', {'latitude': -37.8, 'longitude': 145, 'zoom': 9}, routes, ratios, colors)
+    shipped = base64.b64decode(re.search(r'atob\("([^"]*)"\)', html).group(1))
+    np.testing.assert_array_equal(np.frombuffer(shipped, dtype=np.uint8).reshape(colors.shape), colors)
+    assert 'const ROUTES = {"a": 0, "b": 1};' in html
@@ -0,0 +1,65 @@
+import functools
+import json
+
+import pytest
+
+from freight import instrument
+
+
+@pytest.fixture
+def perf_log(tmp_path, monkeypatch):
+    path = tmp_path / 'perf.jsonl'
+    monkeypatch.setenv(instrument.LOG_ENV, str(path))
+    yield path
+    for handler in list(instrument._logger.handlers):
+        instrument._logger.removeHandler(handler)
+        handler.close()
+
+
+def test_tracked_cache_counts_hits_and_misses():
+    runs = []
+
+    @instrument.tracked_cache(functools.lru_cache)
+    def square(x):
+        runs.append(x)
+        return x * x
+
+    rerun = instrument.start()
+    assert [square(x) for x in (2, 3, 2, 2)] == [4, 9, 4, 4]
+    assert square.clear is None  # lru_cache has cache_clear, not clear
+    record = instrument.finish(rerun)
+    assert runs == [2, 3]
+    assert record['cache'] == {'square': {'calls': 4, 'misses': 2, 'hits': 2}}
+    assert 'load:square' in record['sections']
+
+    # Outside a rerun calls still go through the cache, uncounted.
+    assert square(3) == 9 and runs == [2, 3]
+    assert instrument.current() is None
+
+
+def test_finish_logs_records_that_summarize_parses(perf_log, capsys):
+    for ms in range(1, 21):
+        rerun = instrument.start(detailed=False)
+        assert rerun.detailed  # logging turns on payload sizing
+        rerun.sections['layers'] += ms
+        rerun.sections['deck'] += 0.5
+        instrument.count('graph:gco2')
+        instrument.record_payload('airport_arcs', [{'tonnes': ms}])
+        instrument.finish(rerun)
+
+    records = instrument.read_log(str(perf_log))
+    assert len(records) == 20
+    assert records[0]['counters'] == {'graph:gco2': 1}
+    assert records[0]['layer_bytes'] == {'airport_arcs': len(json.dumps([{'tonnes': 1}]))}
+
+    summary = instrument.summarize(records).set_index('section')
+    assert summary['p95_ms'].is_monotonic_decreasing
+    assert summary.loc['total', 'count'] == 20
+    assert summary.loc['layers', 'count'] == 20
+    assert summary.loc['layers', 'p50_ms'] == pytest.approx(10.5)
+    assert summary.loc['layers', 'p95_ms'] == pytest.approx(19.05)
+    assert summary.loc['layers', 'max_ms'] == 20
+    assert summary.loc['deck', 'p95_ms'] == 0.5
+
+    instrument.main([str(perf_log)])
+    assert 'layers' in capsys.readouterr().out
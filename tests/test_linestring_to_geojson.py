@@ -0,0 +1,49 @@
+import csv
+import importlib.util
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SOURCE = ROOT / 'data/raw/congestion_2020/geometries_2020.csv'
+COMMITTED = ROOT / 'data/simplified/geometries_2020.geojson'
+
+spec = importlib.util.spec_from_file_location('linestring_to_geojson', ROOT / 'scripts/linestring_to_geojson.py')
+script = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = script  # so the process pool can unpickle its functions
+spec.loader.exec_module(script)
+
+
+def convert(rows, **kwargs) -> str:
+    out = io.StringIO()
+    script.write_geojson(script.iter_features(rows, **kwargs), out)
+    return out.getvalue()
+
+
+def test_output_matches_committed_geojson():
+    assert convert(script.read_rows(SOURCE)) == COMMITTED.read_text()
+
+
+def test_process_pool_keeps_order(tmp_path):
+    fixture = tmp_path / 'geometries.csv'
+    with open(SOURCE, newline='') as f, open(fixture, 'w', newline='') as out:
+        reader = csv.reader(f)
+        csv.writer(out).writerows([next(reader) for _ in range(8)])
+        # A row without a LINESTRING is skipped.
+        csv.writer(out).writerow(['no geometry', 'POINT (1 2)'])
+
+    features = json.loads(convert(script.read_rows(fixture), workers=2, chunksize=3))['features']
+    assert features == json.loads(COMMITTED.read_text())['features'][:7]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('', None), ('0', 0), ('-12', -12), ('1.5', 1.5), ('-.5', -0.5), ('2e3', 2000.0), ('0.25E-1', 0.025),
+    ('1_000', '1_000'), (' 7', ' 7'), ('7 ', '7 '), ('nan', 'nan'), ('inf', 'inf'), ('1e999', '1e999'),
+    ('0800', '0800'), ('+5', '+5'), ('32 - Derrimut to Montrose', '32 - Derrimut to Montrose'),
+])
+def test_parse_value_accepts_plain_numeric_literals_only(value, expected):
+    parsed = script.parse_value(value)
+    assert parsed == expected and type(parsed) is type(expected)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from freight import congestion
+from freight.profiles import STATS, HourlyProfiles
+
+
+@pytest.fixture(scope='module')
+def route_times(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp('congestion') / 'congestion.db')
+    with congestion.connect(db_path) as con:
+        return congestion.query(con, 'route_times', limit=None)
+
+
+@pytest.fixture(scope='module')
+def profiles(route_times):
+    return HourlyProfiles.from_frame(route_times)
+
+
+def test_profile_cells_are_the_route_times_rows(route_times, profiles):
+    columns = [f'{s}_est' for s in STATS]
+    np.testing.assert_array_equal(profiles.at_hour(route_times['route_name'], route_times['hour']),
+                                  route_times[columns].to_numpy(dtype=float))
+    # Every other cell is an hour with no estimate.
+    assert np.isfinite(profiles.times).all(axis=2).sum() == len(route_times)
+    assert sorted(profiles.routes) == sorted(route_times['route_name'].unique())
+
+
+def test_summary_agrees_with_grouped_rows(route_times, profiles):
+    routes = list(profiles.routes[::7])
+    summary = profiles.summary(routes).set_index('route_name')
+    for route, rows in route_times[route_times['route_name'].isin(routes)].groupby('route_name'):
+        rows = rows.sort_values('hour')
+        best, worst = rows.loc[rows['med_est'].idxmin()], rows.loc[rows['med_est'].idxmax()]
+        assert summary.loc[route, 'best_hour'] == best['hour']
+        assert summary.loc[route, 'worst_hour'] == worst['hour']
+        assert summary.loc[route, 'best_time'] == best['med_est']
+        assert summary.loc[route, 'peak_to_best_ratio'] == pytest.approx(worst['med_est'] / best['med_est'])
+        np.testing.assert_allclose(profiles.percentiles([route], q=(10, 50, 90))[0],
+                                   np.percentile(rows['med_est'], (10, 50, 90)))
+    np.testing.assert_array_equal(profiles.best_hour(routes), summary['best_hour'])
+    np.testing.assert_array_equal(profiles.worst_hour(routes), summary['worst_hour'])
+    np.testing.assert_allclose(np.nanmin(profiles.relative_to_best(routes), axis=1), 1)
+
+
+def test_unknown_route_raises(profiles):
+    with pytest.raises(KeyError):
+        profiles.summary(['no such route'])
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from freight import projection
+from freight.scenario import BASELINE_GCO2, BASELINE_TONNE_KM
+
+ADOPTION = ((0, 0, 0, 0), (30, 50, 10, 20), (80, 100, 40, 60))
+GENERATION = ((23, 76, 2, 0), (10, 20, 60, 10), (0, 0, 100, 0))
+FLEET = ((100, 100, 100, 100), (120, 90, 150, 110), (140, 80, 200, 130))
+COMMODITY = projection.knots(projection.COMMODITY_PRESETS)
+
+
+def expected_at_knot(k, gco2_scaling=1.0, tonne_scaling=1.0):
+    """gCO2/tonne.km and tonne-km of each network straight from the knot values."""
+    adoption = np.array(ADOPTION[k], dtype=float)
+    shares = projection.generation_shares(GENERATION[k])
+    gco2 = np.array(BASELINE_GCO2) * ((1 - adoption / 100) * gco2_scaling + projection.hydrogen_emissions(adoption, shares))
+    demand = np.array(FLEET[k]) / 100 * (1 + np.mean(COMMODITY[k]) / 100)
+    return gco2, np.array(BASELINE_TONNE_KM) * tonne_scaling * demand * projection.HOURS_PER_YEAR
+
+
+@pytest.mark.parametrize('gco2_scaling, tonne_scaling', [(1.0, 1.0), (0.8, 1.3)])
+def test_knot_years_equal_the_knots(gco2_scaling, tonne_scaling):
+    result = projection.project(ADOPTION, GENERATION, FLEET, COMMODITY, gco2_scaling, tonne_scaling)
+    assert result.years[0] == 2016 and result.years[-1] == 2056
+    # The generation mix is clamped to its 2023 knot before then, so every preset year sees knot k.
+    for k, year in enumerate(projection.PRESET_YEARS):
+        i = year - 2016
+        gco2, tonne_km = expected_at_knot(k, gco2_scaling, tonne_scaling)
+        np.testing.assert_allclose(result.gco2[i], gco2, rtol=1e-12)
+        np.testing.assert_allclose(result.tonne_km[i], tonne_km, rtol=1e-12)
+        np.testing.assert_allclose(result.emissions[i], tonne_km * gco2 / 1e6, rtol=1e-12)
+
+
+def test_between_and_outside_knots():
+    fleet = projection.interpolate(FLEET, projection.PRESET_YEARS)
+    np.testing.assert_allclose(fleet[10], np.mean(FLEET[:2], axis=0), rtol=1e-12)
+    np.testing.assert_allclose(fleet[30], np.mean(FLEET[1:], axis=0), rtol=1e-12)
+    # The generation mix is clamped to its 2023 knot before 2023.
+    shares = projection.interpolate(projection.generation_shares(GENERATION), projection.GENERATION_YEARS)
+    np.testing.assert_array_equal(shares[:8], np.broadcast_to(shares[7], shares[:8].shape))
+    np.testing.assert_allclose(shares[7], projection.generation_shares(GENERATION[0]))
+
+
+def test_batched_projection_matches_each_trajectory():
+    adoption = np.stack([ADOPTION, np.array(ADOPTION) / 2])
+    batch = projection.project(adoption, GENERATION, FLEET, COMMODITY, gco2_scaling_factor=[1.0, 0.9])
+    for b, scaling in enumerate((1.0, 0.9)):
+        single = projection.project(adoption[b], GENERATION, FLEET, COMMODITY, scaling)
+        np.testing.assert_allclose(batch.gco2[b], single.gco2)
+        np.testing.assert_allclose(batch.emissions[b], single.emissions)
+    assert all(index[..., 0] == pytest.approx(100) for index in projection.indices(batch).values())
@@ -0,0 +1,87 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from freight import scenario
+from freight.assumptions import ASSUMPTIONS, LIMITS, NETWORKS
+
+# The dashboard's original scalar formulas, which ``scenario.evaluate`` replaced.
+
+
+def baseline_hydrogen_mult(sizes):
+    sizes_total = max(sum(sizes), 1)
+    sizes_norm = [s / sizes_total for s in sizes]
+    return (sizes_norm[0] * 27 + sizes_norm[1] * 12 + sizes_norm[2] * 0 + sizes_norm[3] * -2) / 27
+
+
+def baseline_gco2(network, adoption, hydrogen_mult):
+    baseline = int(ASSUMPTIONS['gco2/tonne.km'][network])
+    return int(((100 - adoption) * baseline) + (adoption * baseline * hydrogen_mult)) / 100
+
+
+def baseline_score(network, gco2, gco2_scaling_factor, tonne_scaling_factor):
+    tonne_km = np.log2(float(ASSUMPTIONS['tonne.km/hr'][network])) * tonne_scaling_factor
+    score_1 = np.clip(tonne_km, 0, LIMITS['tonne.km/hr']) / LIMITS['tonne.km/hr']
+    score_2 = 1 - np.clip(gco2 * gco2_scaling_factor, 0, LIMITS['gco2/tonne.km']) / LIMITS['gco2/tonne.km']
+    return np.mean([score_1, score_2])
+
+
+def baseline_color(score):
+    return [int((1 - score) * 255), int(score * 255), 0]
+
+
+ADOPTIONS = [(0, 0, 0, 0), (100, 100, 100, 100), (37, 5, 63, 91), (50, 50, 50, 50), (1, 99, 12, 77)]
+MIXES = [(23, 76, 2, 0), (100, 0, 0, 0), (0, 0, 100, 0), (0, 0, 0, 100), (10, 20, 30, 40), (0, 0, 0, 0), (1, 0, 0, 0)]
+SCALING = [0.0, 0.3, 1.0, 1.3, 2.0]
+GRID = list(itertools.product(ADOPTIONS, MIXES, SCALING, SCALING))
+
+
+def test_evaluate_matches_the_scalar_formulas():
+    adoption, mix, gco2_scaling, tonne_scaling = (np.array(column, dtype=float) for column in zip(*GRID))
+    result = scenario.evaluate(adoption, mix, gco2_scaling, tonne_scaling)
+    for row, (adopt, sizes, gco2_factor, tonne_factor) in enumerate(GRID):
+        mult = baseline_hydrogen_mult(sizes)
+        for i, network in enumerate(NETWORKS):
+            gco2 = baseline_gco2(network, adopt[i], mult)
+            score = baseline_score(network, gco2, gco2_factor, tonne_factor)
+            assert result.gco2[row, i] == gco2
+            assert result.score[row, i] == pytest.approx(score, abs=1e-12)
+            assert result.color[row, i].tolist() == baseline_color(score)
+
+
+def test_network_gco2_truncates_before_dividing():
+    # 99 * 22 + 1 * 22 * (12 / 27) = 2187.77..., which the dashboard truncated to 2187.
+    gco2 = scenario.network_gco2([[0, 1, 0, 0]], [12 / 27])
+    assert gco2[0, 1] == 21.87
+
+
+@pytest.mark.parametrize('score, color', [
+    (0.0, [255, 0, 0]), (1.0, [0, 255, 0]), (0.5, [127, 127, 0]), (0.999, [0, 254, 0]), (0.001, [254, 0, 0]),
+])
+def test_score_color_band_edges(score, color):
+    assert scenario.score_color(score).tolist() == color
+    assert baseline_color(score) == color
+
+
+def scenario_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {c: rng.integers(0, 101, n) for c in scenario.ADOPTION_COLUMNS + scenario.GENERATION_COLUMNS}
+    columns.update({c: rng.uniform(0, 2, n) for c in scenario.SCALING_COLUMNS})
+    return pd.DataFrame(columns)
+
+
+def test_evaluate_frame_is_row_by_row():
+    df = scenario_frame(50)
+    whole = scenario.evaluate_frame(df)
+    rows = pd.concat([scenario.evaluate_frame(df.iloc[[i]]) for i in range(len(df))])
+    pd.testing.assert_frame_equal(whole, rows)
+
+
+def test_stream_results_with_a_pool_keeps_chunk_order():
+    df = scenario_frame(1000, seed=1)
+    chunks = [df.iloc[i:i + 64] for i in range(0, len(df), 64)]
+    streamed = list(scenario.stream_results(iter(chunks), workers=2, max_pending=3))
+    assert [chunk.index[0] for chunk, _ in streamed] == [chunk.index[0] for chunk in chunks]
+    pd.testing.assert_frame_equal(pd.concat([result for _, result in streamed]), scenario.evaluate_frame(df))
@@ -0,0 +1,48 @@
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SOURCE = ROOT / 'data/raw/secondary_freight.geojson'
+
+spec = importlib.util.spec_from_file_location('simplify_geojson', ROOT / 'scripts/simplify_geojson.py')
+script = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = script  # so the process pool can unpickle its functions
+spec.loader.exec_module(script)
+
+
+def read_features(path):
+    with open(path) as f:
+        return json.load(f)['features']
+
+
+def test_levels_keep_properties_and_shrink_with_zoom(tmp_path):
+    stats = script.build_levels(str(SOURCE), str(tmp_path), workers=2)
+    source = [feature['properties'] for feature in read_features(SOURCE)]
+    assert [(s['min_zoom'], s['max_zoom']) for s in stats] == [level[:2] for level in script.LEVELS]
+
+    for level in stats:
+        properties = [feature['properties'] for feature in read_features(tmp_path / level['path'])]
+        assert len(properties) == level['features']
+        # Dropped features leave the rest in source order, with their properties untouched.
+        remaining = iter(source)
+        assert all(any(p == q for q in remaining) for p in properties)
+
+    # Levels run coarsest first: none is larger than the next finer level, or the source.
+    manifest = json.loads((tmp_path / 'secondary_freight_levels.json').read_text())
+    finer = stats[1:] + [{'features': manifest['source_features'], 'vertices': manifest['source_vertices'],
+                          'bytes': os.path.getsize(SOURCE)}]
+    for level, next_level in zip(stats, finer):
+        for measure in ('features', 'vertices', 'bytes'):
+            assert level[measure] <= next_level[measure], (level['path'], measure)
+
+
+def test_parallel_levels_match_serial():
+    geoms, _ = script.load_features(str(SOURCE))
+    serial = script.simplify_levels(geoms)
+    parallel = script.simplify_levels_parallel(geoms, workers=2)
+    for a, b in zip(serial, parallel):
+        assert len(a) == len(b) == len(geoms)
+        assert all((x is None and y is None) or x.equals_exact(y, 0) for x, y in zip(a, b))
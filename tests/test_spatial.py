@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from freight import spatial
+
+SOURCES = {
+    'rail_map': 'data/simplified/rail_map_simplified.geojson',
+    'seaports': 'data/raw/seaports.geojson',
+}
+FACILITIES = pd.DataFrame({'kind': ['seaport'], 'name': ['Port'], 'state': ['VIC'], 'lng': [145.0], 'lat': [-38.0]})
+
+
+@pytest.fixture
+def index():
+    return spatial.SpatialIndex(SOURCES, FACILITIES)
+
+
+def test_layers_are_read_once_while_other_threads_wait(index, monkeypatch):
+    reads = []
+    load = index._load
+
+    def slow_load(layer):
+        reads.append(layer)
+        time.sleep(0.05)
+        return load(layer)
+
+    monkeypatch.setattr(index, '_load', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.layer('rail_map'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert reads == ['rail_map']
+    assert all(result is results[0] for result in results)
+
+
+def test_failed_reads_are_retried(index, monkeypatch):
+    load = index._load
+    monkeypatch.setattr(index, '_load', lambda layer: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        index.layer('seaports')
+    monkeypatch.setattr(index, '_load', load)
+    assert len(index.layer('seaports').geoms) > 0
+    assert index.loaded() == [('seaports', None)]
+
+
+def test_least_recently_used_layer_is_dropped(index):
+    seaports = index.layer('seaports').nbytes
+    index.max_bytes = seaports + 1
+    index.layer('rail_map')
+    assert index.loaded() == [('rail_map', None)]
+
+
+def test_coarser_levels_are_smaller_and_keep_points(index):
+    full = index.layer('rail_map')
+    coarsest = index.layer('rail_map', len(spatial.DETAIL_LEVELS) - 1)
+    assert coarsest.nbytes < full.nbytes
+    assert len(index.layer('seaports', 0).geoms) == len(index.layer('seaports').geoms)
+
+
+def test_cull_json_falls_back_to_a_coarser_level(index):
+    bbox = spatial.REGIONS['Australia']
+    full = index.cull_json('rail_map', bbox)
+    assert index.cull_json('rail_map', bbox, budget=len(full)) == full
+    coarsest = index.cull_json('rail_map', bbox, budget=1)
+    assert len(coarsest) < len(full)
+    assert ('rail_map', len(spatial.DETAIL_LEVELS) - 1) in index.loaded()
+    assert index.cull('seaports', spatial.REGIONS['Tasmania'])['features']
@@ -0,0 +1,46 @@
+import json
+
+from freight import tiles
+
+SOURCE = 'data/raw/secondary_freight.geojson'
+
+
+def pbf_mtimes(directory):
+    return {path.relative_to(directory).as_posix(): path.stat().st_mtime_ns for path in directory.rglob('*.pbf')}
+
+
+def write_source(path, edit=None):
+    with open(SOURCE) as f:
+        collection = json.load(f)
+    if edit:
+        edit(collection['features'])
+    with open(path, 'w') as f:
+        json.dump(collection, f)
+    return str(path)
+
+
+def test_unchanged_source_writes_no_tiles(tmp_path):
+    source, output = write_source(tmp_path / 'roads.geojson'), tmp_path / 'tiles'
+    first = tiles.build_tiles(source, str(output), max_zoom=5)
+    assert first['encoded'] == len(first['tiles']) == len(pbf_mtimes(output))
+    before = pbf_mtimes(output)
+
+    # Rewriting the source with coordinates moved well under KEY_PRECISION changes nothing.
+    def nudge(features):
+        for feature in features:
+            feature['geometry']['coordinates'][0][0] += 1e-9
+    second = tiles.build_tiles(write_source(tmp_path / 'roads.geojson', nudge), str(output), max_zoom=5, workers=2)
+    assert second['encoded'] == 0
+    assert second['tiles'] == first['tiles']
+    assert pbf_mtimes(output) == before
+
+
+def test_changed_feature_reencodes_only_its_tiles(tmp_path):
+    output = tmp_path / 'tiles'
+    first = tiles.build_tiles(write_source(tmp_path / 'roads.geojson'), str(output), max_zoom=5)
+
+    def rename(features):
+        features[0]['properties']['name'] = 'renamed'
+    second = tiles.build_tiles(write_source(tmp_path / 'roads.geojson', rename), str(output), max_zoom=5)
+    changed = {name for name in first['tiles'] if first['tiles'][name]['key'] != second['tiles'][name]['key']}
+    assert 0 < second['encoded'] == len(changed) < len(first['tiles'])
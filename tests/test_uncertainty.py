@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from freight import uncertainty
+
+INPUTS = uncertainty.Scenario(adoption=(50, 50, 50, 50))
+
+
+def test_triangular_quantile_endpoints_and_mode():
+    low, mode, high = np.array([1.0, 0.0, 5.0]), np.array([2.0, 0.0, 5.0]), np.array([4.0, 3.0, 5.0])
+    np.testing.assert_allclose(uncertainty.triangular_quantile(0, low, mode, high), low)
+    np.testing.assert_allclose(uncertainty.triangular_quantile(1, low, mode, high), high)
+    # The mode sits at the quantile (mode - low) / (high - low).
+    np.testing.assert_allclose(uncertainty.triangular_quantile(1 / 3, low[0], mode[0], high[0]), mode[0])
+    # Degenerate distributions are constant.
+    assert uncertainty.triangular_quantile(0.7, 5, 5, 5) == 5
+
+
+def test_triangular_quantile_matches_numpy_sampler():
+    rng = np.random.default_rng(0)
+    draws = uncertainty.triangular_quantile(rng.random(200_000), 1, 2, 4)
+    expected = np.random.default_rng(1).triangular(1, 2, 4, 200_000)
+    np.testing.assert_allclose(np.percentile(draws, [10, 50, 90]), np.percentile(expected, [10, 50, 90]), rtol=0.01)
+
+
+@pytest.mark.parametrize('kwargs', [{'samples': 0}, {'samples': -5}, {'chunk_size': 0}])
+def test_simulate_rejects_empty_runs(kwargs):
+    with pytest.raises(ValueError):
+        uncertainty.simulate(INPUTS, **{'samples': 1000, **kwargs})
+
+
+def test_simulate_is_reproducible_with_a_seed():
+    first = uncertainty.simulate(INPUTS, samples=30_000, chunk_size=10_000, seed=3)
+    second = uncertainty.simulate(INPUTS, samples=30_000, chunk_size=10_000, seed=3)
+    pd.testing.assert_frame_equal(first.bands, second.bands)
+    other = uncertainty.simulate(INPUTS, samples=30_000, chunk_size=10_000, seed=4)
+    assert not first.bands.equals(other.bands)
+
+
+def test_simulate_does_not_depend_on_workers():
+    serial = uncertainty.simulate(INPUTS, samples=30_000, chunk_size=10_000, seed=3)
+    parallel = uncertainty.simulate(INPUTS, samples=30_000, chunk_size=10_000, seed=3, workers=2)
+    pd.testing.assert_frame_equal(serial.bands, parallel.bands)
+
+
+def test_simulate_agrees_across_chunk_sizes():
+    whole = uncertainty.simulate(INPUTS, samples=200_000, chunk_size=200_000)
+    chunked = uncertainty.simulate(INPUTS, samples=200_000, chunk_size=30_000)
+    pd.testing.assert_series_equal(whole.point, chunked.point)
+    np.testing.assert_allclose(chunked.bands.to_numpy(), whole.bands.to_numpy(), rtol=0.01, atol=1e-3)
+
+
+def test_tornado_is_ordered_by_swing():
+    frame = uncertainty.tornado(INPUTS, 'score_rail')
+    assert frame['swing'].is_monotonic_decreasing
+    assert set(frame['assumption']) == set(uncertainty.PARAMETERS)
+    # Each assumption's swing is the output at its high quantile minus at its low one, alone.
+    _, mode, _ = uncertainty.distribution_arrays()
+    column = uncertainty.OUTPUTS.index('score_rail')
+    for row in frame.itertuples():
+        i = list(uncertainty.PARAMETERS).index(row.assumption)
+        draws = np.tile(mode, (2, 1))
+        draws[:, i] = row.low_value, row.high_value
+        low, high = uncertainty.evaluate_draws(draws, INPUTS)[:, column]
+        assert row.swing == pytest.approx(abs(high - low))
+    # Other networks' assumptions don't move rail's score.
+    assert frame.set_index('assumption').loc['gCO2/tonne.km (air)', 'swing'] == 0
+
+
+def test_tornado_ignores_hydrogen_without_adoption():
+    frame = uncertainty.tornado(uncertainty.Scenario(), 'score').set_index('assumption')
+    assert (frame.loc[[a for a in frame.index if a.startswith('H2 ')], 'swing'] == 0).all()